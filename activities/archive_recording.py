@@ -1,7 +1,8 @@
 import os
-from services.onedrive import move_file_to_archive
 from services.local_inbox import move_file_to_local_archive
+from services.telemetry import instrumented_activity
 
+@instrumented_activity("archive")
 def archive_recording_onedrive_activity(ctx, input: dict) -> dict:
     """
     Archive implementation for OneDrive.
@@ -15,14 +16,38 @@ def archive_recording_onedrive_activity(ctx, input: dict) -> dict:
         raise ValueError("archive_recording_onedrive_activity requires 'archive_folder' in input.")
     if not inbox_folder:
         raise ValueError("archive_recording_onedrive_activity requires 'inbox_folder' in input.")
+    from services.onedrive import move_file_to_archive  # Graph stack loaded on first use
+
     move_file_to_archive(file_id=file_id, file_name=file_name, inbox_folder=inbox_folder, archive_folder=archive_folder)
     return {'status': 'archived', 'file_id': file_id, 'archive_folder': archive_folder}
 
 
+@instrumented_activity("archive")
+def archive_recordings_onedrive_batch_activity(ctx, input: dict) -> dict:
+    """
+    Batch archive implementation for OneDrive (Graph $batch, up to 20 moves per request).
+    Expects: { 'files': [{ 'file_id': str, 'file_name': str|None }], 'inbox_folder': str|None, 'archive_folder': str|None }
+    """
+    files = input.get('files') or []
+    inbox_folder = input.get('inbox_folder')
+    archive_folder = input.get('archive_folder')
+    if not archive_folder:
+        raise ValueError("archive_recordings_onedrive_batch_activity requires 'archive_folder' in input.")
+    if not inbox_folder:
+        raise ValueError("archive_recordings_onedrive_batch_activity requires 'inbox_folder' in input.")
+    from services.onedrive import move_files_to_archive
+
+    results = move_files_to_archive(files, archive_folder=archive_folder) if files else []
+    return {'archive_folder': archive_folder, 'results': results}
+
+
+@instrumented_activity("archive")
 def archive_recording_local_activity(ctx, input: dict) -> dict:
     """
     Archive implementation for local filesystem.
-    Expects: { 'file_id': str, 'file_name': str|None, 'inbox_folder': str|None, 'archive_folder': str|None }
+    Expects: { 'file_id': str, 'file_name': str|None, 'inbox_folder': str|None, 'archive_folder': str|None,
+               'work_path': str|None }
+    work_path (the hand-off in the work folder) is reused for the archive move when it is a hard link.
     """
     file_id = input['file_id']
     file_name = input.get('file_name')
@@ -33,5 +58,10 @@ def archive_recording_local_activity(ctx, input: dict) -> dict:
     if not inbox_folder:
         raise ValueError("archive_recording_local_activity requires 'inbox_folder' in input.")
     os.makedirs(archive_folder, exist_ok=True)
-    move_file_to_local_archive(file_name=file_name or file_id, inbox_folder=inbox_folder, archive_folder=archive_folder)
+    move_file_to_local_archive(
+        file_name=file_name or file_id,
+        inbox_folder=inbox_folder,
+        archive_folder=archive_folder,
+        work_path=input.get('work_path'),
+    )
     return {'status': 'archived', 'file_id': file_id, 'archive_folder': archive_folder}
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import logging
+
+from services.fast_intent import handle
+from services.telemetry import instrumented_activity, observe_inbox_to_publish
+
+logger = logging.getLogger("fast_intent")
+
+
+@instrumented_activity("intent")
+def fast_intent_activity(ctx, input: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Classify the transcript with one LLM call and create the todo / send the email directly.
+    Input:
+      - correlation_id: str
+      - transcription_text: str
+      - file_name: str
+      - file_created_at: str (optional, ISO 8601; for inbox-to-action latency)
+      - trace_parent: str (optional)
+    Output: { 'handled': bool, 'intent': str | None, 'confidence': float | None, 'reason': str | None }
+    handled=False means the recording still has to go to the IntentOrchestrator.
+    """
+    result = handle(
+        input.get("transcription_text") or "",
+        input.get("file_name") or "",
+        correlation_id=input.get("correlation_id"),
+    )
+    if result["handled"]:
+        # The action is done here, so this is the end of the pipeline for this recording
+        observe_inbox_to_publish(input.get("file_created_at"))
+    logger.info("Fast intent for %s: %s", input.get("correlation_id"), result)
+    return result
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import time
+from models.voice2action import FileRef
+from services.state_store import StateStore
+
+PENDING_PREFIX = "voice_inbox_pending:"  # to avoid duplicates during polling
+DOWNLOADED_PREFIX = "voice_inbox_downloaded:"  # idempotency tracking
+DELTA_PREFIX = "voice_inbox_delta:"  # OneDrive delta cursor per inbox folder
+
+# Markers expire in the state store instead of accumulating forever (0 = keep).
+# Pending markers are claim leases ({'owner', 'expires'}, see StateStore.claim): a file still
+# pending after this is treated as abandoned by a crashed poll and claimed again.
+PENDING_TTL_SECONDS = int(os.getenv("VOICE_PENDING_TTL_SECONDS", str(24 * 3600)))
+# Downloaded files leave the inbox when archived; the marker only has to outlive that
+DOWNLOADED_TTL_SECONDS = int(os.getenv("VOICE_DOWNLOADED_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+def lease_active(raw: Optional[str], now: Optional[float] = None) -> bool:
+    """True for a pending marker that still holds its file (expired leases count as free)."""
+    if not raw:
+        return False
+    try:
+        lease = json.loads(raw)
+    except ValueError:
+        return True
+    if not isinstance(lease, dict):
+        return True  # plain marker from before leases; expires via store TTL only
+    expires = lease.get("expires") or 0
+    return not expires or expires >= (time.time() if now is None else now)
+
+
+def claim_files(state: StateStore, file_ids: List[str], owner: str) -> List[str]:
+    """Claim files for one poll (first write wins); returns the ids this poll may process."""
+    won = state.claim([PENDING_PREFIX + fid for fid in file_ids], owner, PENDING_TTL_SECONDS)
+    return [key[len(PENDING_PREFIX):] for key in won]
+
+
+def filter_new_files(
+    state: StateStore, files: List[FileRef], held: Optional[List[FileRef]] = None
+) -> Tuple[List[FileRef], int, int]:
+    """Drop files already downloaded or pending using a single bulk state lookup.
+
+    Returns (new_files, skipped_downloaded, skipped_pending); files skipped as pending are
+    also appended to `held` when given.
+    """
+    if not files:
+        return [], 0, 0
+    keys: List[str] = []
+    for f in files:
+        keys.append(DOWNLOADED_PREFIX + f.id)
+        keys.append(PENDING_PREFIX + f.id)
+    found = state.get_bulk(keys)
+    filtered: List[FileRef] = []
+    skipped_downloaded = 0
+    skipped_pending = 0
+    for f in files:
+        if found.get(DOWNLOADED_PREFIX + f.id):
+            skipped_downloaded += 1
+            continue
+        if lease_active(found.get(PENDING_PREFIX + f.id)):
+            skipped_pending += 1
+            if held is not None:
+                held.append(f)
+            continue
+        filtered.append(f)
+    return filtered, skipped_downloaded, skipped_pending
+
+
+def mark_downloaded(state: StateStore, file_id: str) -> None:
+    """Mark a file downloaded and clear its pending marker in one transaction."""
+    state.transact(
+        upserts={DOWNLOADED_PREFIX + file_id: "1"},
+        deletes=[PENDING_PREFIX + file_id],
+        ttls={DOWNLOADED_PREFIX + file_id: DOWNLOADED_TTL_SECONDS},
+    )
@@ -1,13 +1,16 @@
 import os
-import shutil
+from datetime import datetime, timezone
 from typing import List
 from models.voice2action import FileRef, ListInboxRequest, ListInboxResult, DownloadRequest
+from services.local_inbox import link_or_copy
+from services.sharding import owned
 from services.state_store import StateStore
+from services.telemetry import instrumented_activity
 
 # Reuse the same prefixes as OneDrive activities for idempotency
-PENDING_PREFIX = "voice_inbox_pending:"
-DOWNLOADED_PREFIX = "voice_inbox_downloaded:"
+from activities.inbox_state import PENDING_PREFIX, DOWNLOADED_PREFIX, filter_new_files, mark_downloaded
 
+@instrumented_activity("list")
 def list_local_inbox_activity(ctx, req: dict) -> dict:
     data = ListInboxRequest.model_validate(req)
     # Use the folder passed from Tier 2 (workflow)
@@ -15,30 +18,37 @@ def list_local_inbox_activity(ctx, req: dict) -> dict:
     if not folder:
         raise ValueError("list_local_inbox_activity requires 'inbox_folder' in request input.")
     os.makedirs(folder, exist_ok=True)
-    # Build file refs from local folder
+    # Build file refs from local folder; the watcher hands over the exact names, so skip the full listdir
+    names = (
+        [os.path.basename(n) for n in data.file_names]
+        if data.file_names is not None
+        else os.listdir(folder)
+    )
     refs: List[FileRef] = []
-    for name in os.listdir(folder):
+    for name in names:
         path = os.path.join(folder, name)
-        if os.path.isfile(path) and (name.lower().endswith('.wav') or name.lower().endswith('.mp3')):
-            refs.append(FileRef(id=name, name=name))
-    # Filter out already downloaded or pending
-    state = StateStore()
-    filtered: List[FileRef] = []
-    for f in refs:
-        if state.get(DOWNLOADED_PREFIX + f.id):
-            continue
-        if state.get(PENDING_PREFIX + f.id):
+        if not owned(name, data.shard_index, data.shard_count):
             continue
-        filtered.append(f)
+        if os.path.isfile(path) and (name.lower().endswith('.wav') or name.lower().endswith('.mp3')):
+            st = os.stat(path)
+            created_at = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).isoformat()
+            # Size and mtime stand in for an eTag: a re-upload under the same name gets a new one
+            etag = f"{st.st_size}-{st.st_mtime_ns}"
+            refs.append(FileRef(id=name, name=name, size=st.st_size, etag=etag, created_at=created_at))
+    # Filter out already downloaded or pending (one bulk state lookup)
+    filtered, _, _ = filter_new_files(StateStore(), refs)
     return ListInboxResult(files=filtered).model_dump()
 
 
+@instrumented_activity("download")
 def prepare_local_file_activity(ctx, req: dict) -> dict:
     """
-    Offline-mode equivalent of download: copies the local inbox file to the download work dir
+    Offline-mode equivalent of download: hands the local inbox file to the download work dir
     and marks it downloaded; also clears pending.
-    Input matches DownloadRequest to keep workflow parity: { file: FileRef, target_dir?: str }
-    Output: { path: str }
+    Input matches DownloadRequest to keep workflow parity: { file: FileRef, target_dir?: str,
+    handoff?: 'link' | 'copy' }. 'link' hard-links (or reflinks) instead of copying the audio and
+    falls back to a copy across filesystems.
+    Output: { path: str, handoff: 'hardlink' | 'reflink' | 'copy' }
     """
     data = DownloadRequest.model_validate(req)
     # Workflow must provide the source directory of the local inbox via 'src_folder'
@@ -52,10 +62,8 @@ def prepare_local_file_activity(ctx, req: dict) -> dict:
     dest_dir = data.download_folder or os.getenv("LOCAL_VOICE_DOWNLOAD_FOLDER", "./.work/voice")
     os.makedirs(dest_dir, exist_ok=True)
     dest_path = os.path.join(dest_dir, data.file.name)
-    # Copy file to workspace to keep parity with OneDrive download
-    shutil.copy2(src_path, dest_path)
+    # Place file in workspace to keep parity with OneDrive download
+    handoff = link_or_copy(src_path, dest_path, mode=req.get("handoff") or "copy")
     # Mark downloaded and clear pending
-    state = StateStore()
-    state.set(DOWNLOADED_PREFIX + data.file.id, "1")
-    state.delete(PENDING_PREFIX + data.file.id)
-    return {"path": dest_path}
+    mark_downloaded(StateStore(), data.file.id)
+    return {"path": dest_path, "handoff": handoff}
@@ -3,63 +3,111 @@ from __future__ import annotations
 import os
 import json
 import logging
-from typing import List
-from models.voice2action import FileRef, ListInboxRequest, ListInboxResult, DownloadRequest, MarkPendingRequest
-from services.onedrive import OneDriveService
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from models.voice2action import FileRef, ListInboxRequest, ListInboxResult, DownloadRequest, MarkPendingRequest, MarkPendingBatchRequest
+from services.sharding import owned, shard_suffix
 from services.state_store import StateStore
-from services.http_client import HttpClient
+from services.telemetry import instrumented_activity
+from activities.inbox_state import (
+    DOWNLOADED_PREFIX,
+    DELTA_PREFIX,
+    claim_files,
+    filter_new_files,
+    mark_downloaded,
+)
+
+# Graph adapter (httpx, msal) is imported on first use to keep worker startup fast
+if TYPE_CHECKING:
+    from services.onedrive import OneDriveService
 
 
 level = os.getenv("DAPR_LOG_LEVEL", "info").upper()
 logger = logging.getLogger("voice2action")
 logger.setLevel(getattr(logging, level, logging.INFO))
 
-PENDING_PREFIX = "voice_inbox_pending:"  # to avoid duplicates during polling
-DOWNLOADED_PREFIX = "voice_inbox_downloaded:"  # idempotency tracking
 
+def _list_incremental(
+    svc: OneDriveService, state: StateStore, folder: str, cursor_suffix: str = ""
+) -> Tuple[List[FileRef], str, Dict[str, Any]]:
+    """
+    List only files changed since the stored delta cursor.
+    Falls back to a paged full scan (and a fresh cursor) on first run or when the token expired.
+    Each shard keeps its own cursor (cursor_suffix); a new shard count starts from a full scan.
+    Files still pending at the last poll (the cursor's 'pending' index) are listed again, so a
+    file whose lease lapsed after a crash is reclaimed even though delta does not report it.
+    Returns (files, cursor key, next cursor without its pending index).
+    """
+    from services.onedrive import DeltaTokenExpired
+
+    key = DELTA_PREFIX + folder + cursor_suffix
+    raw = state.get(key)
+    cursor = json.loads(raw) if raw else {}
+    tracked = [FileRef.model_validate(f) for f in (cursor.get("pending") or {}).values()]
+    if cursor.get("delta_link") and cursor.get("folder_id"):
+        removed: Set[str] = set()
+        try:
+            files, next_link = svc.list_folder_changes(cursor["delta_link"], cursor["folder_id"], removed)
+            logger.info("Delta listing returned %d changed files", len(files))
+            listed = {f.id for f in files} | removed
+            # Deleted or archived files leave the pending index
+            files.extend(f for f in tracked if f.id not in listed)
+            return files, key, {"delta_link": next_link, "folder_id": cursor["folder_id"]}
+        except DeltaTokenExpired as e:
+            logger.warning("OneDrive delta token expired, resyncing with full scan: %s", e)
+    # Take the cursor before scanning so changes during the scan surface on the next poll;
+    # the full scan lists every file still in the inbox, pending ones included
+    delta_link = svc.latest_delta_link(folder)
+    folder_id = svc.resolve_folder_id(folder)
+    files = svc.list_folder(folder)
+    return files, key, {"delta_link": delta_link, "folder_id": folder_id}
+
+
+@instrumented_activity("list")
 def list_onedrive_inbox(ctx, req: dict) -> dict:
     data = ListInboxRequest.model_validate(req)
     folder = data.inbox_folder
     if not folder:
         raise ValueError("list_onedrive_inbox requires 'inbox_folder' in request input.")
     logger.info("Listing OneDrive inbox folder=%s", folder)
-    http = HttpClient()
+    state = StateStore()
+    checkpoint: Optional[Dict[str, str]] = None
+    cursor_key, cursor = "", {}
     try:
-        svc = OneDriveService(http)
-        # Log if MSAL token cache is present
-        cache_raw = svc.state.get(svc.TOKEN_STATE_KEY)
-        logger.info("MSAL token cache present: %s", bool(cache_raw))
-        files = svc.list_folder(folder)
+        from services.onedrive import OneDriveService
+
+        # Process-wide Graph session: token and connection pool are reused across polls
+        svc = OneDriveService()
+        logger.info("MSAL cached account present: %s", svc.session.has_cached_account())
+        if data.incremental:
+            files, cursor_key, cursor = _list_incremental(
+                svc, state, folder, shard_suffix(data.shard_index, data.shard_count)
+            )
+        else:
+            files = svc.list_folder(folder)
         logger.info("Found %d items in OneDrive folder before filtering", len(files))
     except Exception as e:
         logger.error("Exception in OneDriveService.list_folder: %s", e, exc_info=True)
         return {"files": [], "error": str(e)}
-    # Only accept audio/x-wav and audio/mpeg file types
-    AUDIO_EXTS = {".wav", ".mp3"}
-    AUDIO_MIME = {"audio/x-wav", "audio/mpeg"}
+    # Only accept .wav and .mp3 files
     def is_audio_file(f: FileRef) -> bool:
         name = f.name.lower()
         if name.endswith(".wav") or name.endswith(".mp3"):
             return True
         return False
 
-    # Filter out files that were already downloaded or are pending, and by type
-    state = StateStore()
-    filtered: List[FileRef] = []
-    skipped_downloaded = 0
-    skipped_pending = 0
-    skipped_type = 0
-    for f in files:
-        if not is_audio_file(f):
-            skipped_type += 1
-            continue
-        if state.get(DOWNLOADED_PREFIX + f.id):
-            skipped_downloaded += 1
-            continue
-        if state.get(PENDING_PREFIX + f.id):
-            skipped_pending += 1
-            continue
-        filtered.append(f)
+    # Filter by type and shard first, then drop downloaded/pending files with one bulk state lookup
+    audio_files: List[FileRef] = [f for f in files if is_audio_file(f)]
+    skipped_type = len(files) - len(audio_files)
+    audio_files = [f for f in audio_files if owned(f.id, data.shard_index, data.shard_count)]
+    held: List[FileRef] = []
+    filtered, skipped_downloaded, skipped_pending = filter_new_files(state, audio_files, held)
+    if data.incremental:
+        # Remember every file not yet downloaded; the next delta poll re-checks their leases
+        cursor["pending"] = {
+            f.id: f.model_dump(exclude_none=True) for f in filtered + held
+        }
+        checkpoint = {cursor_key: json.dumps(cursor)}
     logger.info(
         "After filtering: %d new files (skipped %d downloaded, %d pending, %d wrong type)",
         len(filtered),
@@ -67,29 +115,51 @@ def list_onedrive_inbox(ctx, req: dict) -> dict:
         skipped_pending,
         skipped_type,
     )
-    return ListInboxResult(files=filtered).model_dump()
+    if checkpoint and not filtered:
+        # Nothing to claim: advance the delta cursor right away
+        state.transact(upserts=checkpoint)
+        checkpoint = None
+    # Otherwise the cursor is persisted by mark_files_pending together with the pending marks,
+    # so a crash between listing and claiming cannot skip files
+    return ListInboxResult(files=filtered, checkpoint=checkpoint).model_dump()
 
+@instrumented_activity("mark_pending")
 def mark_file_pending(ctx, req: dict) -> dict:
+    """Claim one file; ok is False when another poll holds it."""
     data = MarkPendingRequest.model_validate(req)
-    logger.info("Marking file pending id=%s", data.file_id)
+    logger.info("Claiming file id=%s", data.file_id)
+    won = claim_files(StateStore(), [data.file_id], data.owner or uuid.uuid4().hex)
+    return {"ok": bool(won)}
+
+
+@instrumented_activity("mark_pending")
+def mark_files_pending(ctx, req: dict) -> dict:
+    """
+    Claim a whole poll batch (first-write-wins pending leases) and return the file ids this poll
+    won; files claimed by an overlapping poll are left to it.
+    """
+    data = MarkPendingBatchRequest.model_validate(req)
     state = StateStore()
-    state.set(PENDING_PREFIX + data.file_id, "1")
-    return {"ok": True}
+    claimed = claim_files(state, data.file_ids, data.owner or uuid.uuid4().hex)
+    logger.info("Claimed %d of %d files", len(claimed), len(data.file_ids))
+    if data.checkpoint:
+        # After the claims, so a crash in between re-lists (and re-claims) instead of skipping files
+        state.transact(upserts=data.checkpoint)
+    return {"ok": True, "count": len(claimed), "claimed": claimed}
 
 
+@instrumented_activity("download")
 def download_onedrive_file(ctx, req: dict) -> dict:
+    from services.onedrive import OneDriveService
+
     data = DownloadRequest.model_validate(req)
-    http = HttpClient()
-    svc = OneDriveService(http)
-    dl_url = svc.get_download_url(data.file.id)
+    svc = OneDriveService()
     dest_dir = data.download_folder or os.getenv("LOCAL_VOICE_DOWNLOAD_FOLDER", "./.work/voice")
     os.makedirs(dest_dir, exist_ok=True)
     dest_path = os.path.join(dest_dir, data.file.name)
     logger.info("Downloading OneDrive file id=%s name=%s -> %s", data.file.id, data.file.name, dest_path)
-    http.download(dl_url, dest_path)
+    result = svc.download_item(data.file.id, dest_path)
     # Mark downloaded and clear pending
-    state = StateStore()
-    state.set(DOWNLOADED_PREFIX + data.file.id, "1")
-    state.delete(PENDING_PREFIX + data.file.id)
-    logger.info("Downloaded and marked complete id=%s", data.file.id)
-    return {"path": dest_path}
+    mark_downloaded(StateStore(), data.file.id)
+    logger.info("Downloaded %d bytes and marked complete id=%s", result["bytes"], data.file.id)
+    return {"path": dest_path, "sha256": result["sha256"], "bytes": result["bytes"]}
@@ -0,0 +1,48 @@
+import logging
+import os
+
+from services.audio_preprocess import get_preprocess_pool, preprocess_audio
+from services.telemetry import PREPROCESS_BYTES_SAVED, instrumented_activity
+
+logger = logging.getLogger("preprocess_audio")
+
+
+@instrumented_activity("preprocess")
+def preprocess_audio_activity(ctx, input: dict) -> dict:
+    """
+    Optional step between download and transcription: compact mono 16 kHz Opus with silence trimmed.
+    Input: { 'audio_path': str, 'mime_type': str }
+    Output: { 'path': str, 'mime_type': str, 'bytes_in': int, 'bytes_out': int, 'bytes_saved': int,
+              'duration_ms_in': int, 'duration_ms_out': int, 'preprocessed': bool }
+    Falls back to the original file when pydub/ffmpeg are missing or encoding fails,
+    so the recording is still transcribed.
+    """
+    audio_path = input['audio_path']
+    mime_type = input.get('mime_type')
+    dest_dir = os.path.dirname(os.path.abspath(audio_path))
+    try:
+        # Decoding/encoding is CPU bound; keep it off the worker's threads
+        result = get_preprocess_pool().submit(preprocess_audio, audio_path, dest_dir).result()
+    except Exception as e:
+        logger.warning("Audio preprocessing failed for %s; using original: %s", audio_path, e)
+        size = os.path.getsize(audio_path)
+        return {
+            'path': audio_path,
+            'mime_type': mime_type,
+            'bytes_in': size,
+            'bytes_out': size,
+            'bytes_saved': 0,
+            'preprocessed': False,
+        }
+    if PREPROCESS_BYTES_SAVED is not None:
+        PREPROCESS_BYTES_SAVED.inc(result['bytes_saved'])
+    logger.info(
+        "Preprocessed %s -> %s: %d -> %d bytes (saved %d), %d -> %d ms",
+        audio_path, result['path'], result['bytes_in'], result['bytes_out'], result['bytes_saved'],
+        result['duration_ms_in'], result['duration_ms_out'],
+    )
+    return {
+        **result,
+        'mime_type': result['mime_type'] or mime_type,
+        'preprocessed': result['path'] != audio_path,
+    }
@@ -2,12 +2,26 @@ from __future__ import annotations
 import json
 import logging
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from dapr.clients import DaprClient
+from services.telemetry import current_trace_parent, instrumented_activity, observe_inbox_to_publish
 
 logger = logging.getLogger("voice2action")
 
+# Characters of the transcript quoted in the task (agents read the full text from the path)
+INTENT_TASK_EXCERPT_CHARS = int(os.getenv("INTENT_TASK_EXCERPT_CHARS", "300"))
 
+
+def build_intent_task(correlation_id: str, transcription_path: str, text: Optional[str] = None) -> str:
+    """Compact, structured per-file task; the correlation_id also keys token usage in the orchestrator."""
+    excerpt = " ".join((text or "").split())
+    if len(excerpt) > INTENT_TASK_EXCERPT_CHARS:
+        excerpt = excerpt[:INTENT_TASK_EXCERPT_CHARS].rsplit(" ", 1)[0] + " ..."
+    fields = {"correlation_id": correlation_id, "transcription_path": transcription_path, "excerpt": excerpt}
+    return "Process voice transcription: " + json.dumps(fields, ensure_ascii=False)
+
+
+@instrumented_activity("publish")
 def publish_intent_plan_activity(ctx, input: Dict[str, Any]) -> Dict[str, Any]:
     """
     Publish a planning/execution request to the LLM Orchestrator via Dapr pub/sub.
@@ -19,33 +33,39 @@ def publish_intent_plan_activity(ctx, input: Dict[str, Any]) -> Dict[str, Any]:
       - audio_path: str
       - file_name: str
       - metadata: dict (optional)
+      - file_created_at: str (optional, ISO 8601; for inbox-to-publish latency)
+      - trace_parent: str (optional, W3C traceparent to continue)
     """
+    correlation_id = input.get("correlation_id")
+    transcription_path = input.get("transcription_path")
+    if not correlation_id or not transcription_path:
+        raise ValueError("publish_intent_plan_activity requires 'correlation_id' and 'transcription_path'.")
     pubsub_name = os.getenv("DAPR_PUBSUB_NAME", "pubsub")
     # Topic the LLM Orchestrator service listens on; default matches orchestrator name
     topic = os.getenv("DAPR_INTENT_ORCHESTRATOR_TOPIC", "IntentOrchestrator")
 
-    # LLM Orchestrator expects a TriggerAction message format
+    # LLM Orchestrator expects a TriggerAction message format. The instructions live in the
+    # orchestrator's system prompt prefix; the task carries only the per-file fields.
     event_data = {
-        "task": f"Process voice transcription from file [{input.get('transcription_path')}]. "
-                f"Text inside [...] is a file path — preserve it exactly."
-                f"From the first two sentences, extract the user’s intent to plan steps. "
-                f"Treat the rest of the transcription as a note with no further intent. "
-                f"Do not infer any intent that is not explicitly stated. "
-                f"Possible explicit intent: create a todo. "
-                f"If no intent is found, send an email containing the full transcript.",
-        "workflow_instance_id": input.get("correlation_id"),
+        "task": build_intent_task(correlation_id, transcription_path, input.get("transcription_text")),
+        "workflow_instance_id": correlation_id,
     }
 
+    publish_metadata = {"cloudevent.type": "TriggerAction"}
+    # Continue this trace in the LLM Orchestrator instead of starting a new one at the sidecar
+    trace_parent = current_trace_parent()
+    if trace_parent:
+        publish_metadata["cloudevent.traceparent"] = trace_parent
+
     with DaprClient() as d:
         d.publish_event(
             pubsub_name=pubsub_name,
             topic_name=topic,
             data=json.dumps(event_data),
             data_content_type="application/json",
-            publish_metadata={
-                "cloudevent.type": "TriggerAction",
-            },
+            publish_metadata=publish_metadata,
         )
+    observe_inbox_to_publish(input.get("file_created_at"))
 
     logger.info(
         "Published to %s/%s for workflow_instance_id=%s", pubsub_name, topic, event_data["workflow_instance_id"]
@@ -1,58 +1,320 @@
-from services.whisper import transcribe_audio_file
-from models.voice2action import TranscriptionRequest, TranscriptionResult
+from __future__ import annotations
+
+from services.transcription_backends import get_transcription_backend
+from services.transcription_cache import TranscriptionCache, cache_digest, counters as cache_counters, file_sha256
+from services.telemetry import instrumented_activity
+from services.audio_chunker import decode_errors, max_chunk_ms_for, split_lead, split_on_silence, wav_duration_ms
+from services.chunked_transcription import TranscribeFn, stitch_texts, transcribe_chunks
+from models.voice2action import TranscriptionRequest, TranscriptionResult, TranscriptionSegment
+from typing import Optional, Tuple
 import os
 import logging
+import shutil
+import tempfile
+import time
 
 logger = logging.getLogger("transcribe_audio")
 
+# Whisper API rejects uploads above 25 MB; keep a little headroom
+WHISPER_MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+# Streaming mode: default length of the leading segment transcribed before the intent is published
+STREAM_LEAD_SECONDS = 30
+# Lead/rest parts of a streamed recording; a crashed stream is removed by the work-folder sweep
+STREAM_DIR_PREFIX = ".chunks-stream-"
+
+
+def transcribe_with_chunking(
+    req: TranscriptionRequest,
+    chunk_seconds: int = 0,
+    workers: int = 4,
+    transcribe_fn: TranscribeFn | None = None,
+) -> TranscriptionResult:
+    """
+    Transcribe req.audio_path, splitting long recordings on silence into chunks of at most
+    chunk_seconds that are transcribed concurrently by `workers` threads.
+    chunk_seconds <= 0 disables chunking unless the file exceeds the upload limit; a file above
+    the limit is transcoded/chunked so that no upload exceeds it. Files that cannot be decoded
+    here (no ffmpeg for MP3, unreadable audio) are uploaded whole.
+    transcribe_fn defaults to the configured transcription backend.
+    """
+    if transcribe_fn is None:
+        transcribe_fn = get_transcription_backend().transcribe
+    if os.path.getsize(req.audio_path) <= WHISPER_MAX_UPLOAD_BYTES:
+        if chunk_seconds <= 0:
+            return transcribe_fn(req)
+        # WAV headers give the length without decoding; a recording within one chunk is uploaded as is
+        duration_ms = wav_duration_ms(req.audio_path)
+        if duration_ms is not None and duration_ms <= chunk_seconds * 1000:
+            return transcribe_fn(req)
+    # Chunks are mono 16 kHz WAV; cap their length so every chunk stays below the upload limit
+    max_chunk_ms = max_chunk_ms_for(WHISPER_MAX_UPLOAD_BYTES)
+    if chunk_seconds > 0:
+        max_chunk_ms = min(max_chunk_ms, chunk_seconds * 1000)
+    work_dir = os.path.dirname(os.path.abspath(req.audio_path))
+    with tempfile.TemporaryDirectory(prefix=".chunks-", dir=work_dir) as tmp:
+        try:
+            chunks = split_on_silence(
+                req.audio_path, tmp, max_chunk_ms=max_chunk_ms, max_bytes=WHISPER_MAX_UPLOAD_BYTES
+            )
+        except decode_errors() as e:
+            logger.warning("Cannot decode %s for chunking (%s); uploading it whole", req.audio_path, e)
+            return transcribe_fn(req)
+        if not chunks:
+            return transcribe_fn(req)
+        logger.info("Transcribing %s in %d chunks with %d workers", req.audio_path, len(chunks), workers)
+        text, segments = transcribe_chunks(chunks, transcribe_fn, terms_prompt=req.terms_prompt, max_workers=workers)
+    return TranscriptionResult(text=text, segments=segments)
+
+
+def _terms_prompt(terms_file: Optional[str]) -> Optional[str]:
+    """Build the optional prompt that biases transcription towards the terms in terms_file."""
+    if not terms_file:
+        return None
+    try:
+        if os.path.isfile(terms_file):
+            with open(terms_file, "r", encoding="utf-8") as f:
+                # one term per line, ignore blanks and comments
+                terms = [
+                    ln.strip() for ln in f.readlines()
+                    if (ln.strip() and not ln.strip().startswith("#"))
+                ]
+            if terms:
+                # keep prompt concise to avoid oversized inputs
+                max_terms = 200
+                terms_limited = terms[:max_terms]
+                terms_joined = ", ".join(terms_limited)
+                return (
+                    "Important domain terms that may appear in the audio."
+                    " Prefer these spellings when applicable: " + terms_joined
+                )
+        else:
+            logger.warning("terms_file path not found: %s", terms_file)
+    except Exception as e:
+        logger.exception("Failed to read terms_file '%s': %s", terms_file, e)
+    return None
+
+
+def _request(input: dict) -> TranscriptionRequest:
+    """Validate the activity input at the boundary: audio_path is required, the rest has defaults."""
+    audio_path = input.get("audio_path")
+    if not audio_path:
+        raise ValueError("Transcription requires 'audio_path' in activity input.")
+    return TranscriptionRequest(
+        audio_path=audio_path,
+        mime_type=input.get("mime_type") or "audio/mpeg",
+        terms_prompt=_terms_prompt(input.get("terms_file")),
+    )
+
+
+def _cache_lookup(
+    cache: TranscriptionCache, req: TranscriptionRequest, audio_sha256: Optional[str]
+) -> Tuple[str, Optional[TranscriptionResult], Optional[str]]:
+    """Return (cache status, cached result or None, digest to store a fresh result under)."""
+    if not cache.enabled:
+        return "off", None, None
+    audio_sha256 = audio_sha256 or file_sha256(req.audio_path)
+    digest = cache_digest(audio_sha256, get_transcription_backend().model_id, req.terms_prompt)
+    result = None
+    try:
+        result = cache.get(digest)
+    except Exception as e:
+        logger.warning("Transcription cache lookup failed; transcribing: %s", e)
+    return ("hit" if result else "miss"), result, digest
+
+
+def _cache_store(cache: TranscriptionCache, digest: Optional[str], result: TranscriptionResult) -> None:
+    if digest:
+        try:
+            cache.put(digest, result)
+        except Exception as e:
+            logger.warning("Failed to store transcript in cache: %s", e)
+
+
+def _transcript_path(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[0] + '.json'
+
+
+def _write_transcript(json_path: str, result: TranscriptionResult) -> None:
+    # Replace atomically: in streaming mode the agents may read the file while it is completed
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(result.model_dump_json(exclude_none=True))
+    os.replace(tmp_path, json_path)
+
+
+@instrumented_activity("transcribe")
 def transcribe_audio_activity(ctx, input: dict) -> dict:
     """
-    Activity to transcribe an audio file using OpenAI Whisper and save the result as a JSON file next to the audio.
+    Activity to transcribe an audio file with the configured backend (TRANSCRIPTION_BACKEND: OpenAI Whisper
+    or local faster-whisper) and save the result as a JSON file next to the audio.
     Input: {
         'audio_path': str,  # Path to the audio file
         'mime_type': str,  # MIME type of the audio file
         'terms_file': str | None,  # Optional path to common terms file
+        'chunk_seconds': int | None,  # Optional max chunk length; long recordings are split on silence
+        'transcription_workers': int | None,  # Optional concurrent chunk transcriptions (default 4)
+        'audio_sha256': str | None,  # Optional content hash computed during download
     }
     Output: {
         'transcription_path': str,  # Path to the JSON transcription file
         'text': str,               # Transcribed text
+        'cache': str,              # 'hit' | 'miss' | 'off' for the content-hash transcription cache
     }
     """
+    req = _request(input)
+    # Identical audio (re-upload, rename, cleared DOWNLOADED marker) is answered from the cache
+    cache = TranscriptionCache()
+    cache_status, result, digest = _cache_lookup(cache, req, input.get("audio_sha256"))
+    if result is None:
+        result = transcribe_with_chunking(
+            req,
+            chunk_seconds=int(input.get("chunk_seconds") or 0),
+            workers=int(input.get("transcription_workers") or 4),
+        )
+        _cache_store(cache, digest, result)
+    logger.info("Transcription cache %s for %s (totals: %s)", cache_status, req.audio_path, cache_counters.snapshot())
+    # Save transcription as JSON next to audio file (segments carry per-chunk timings)
+    json_path = _transcript_path(req.audio_path)
+    _write_transcript(json_path, result)
+    return {'transcription_path': json_path, 'text': result.text, 'cache': cache_status}
+
 
-    # Build optional prompt from terms file
-    terms_prompt = None
-    terms_file = input.get("terms_file")
-    if terms_file:
+@instrumented_activity("transcribe")
+def transcribe_leading_segment_activity(ctx, input: dict) -> dict:
+    """
+    Streaming mode, step 1: transcribe only the leading segment (cut at a pause within the first
+    lead_seconds) so the intent can be published before the rest of a long memo is transcribed.
+    The JSON file next to the audio holds the leading text marked 'partial' until
+    transcribe_remainder_activity completes it. Short recordings and cache hits are transcribed
+    (or answered) in full right away.
+    Input: the transcribe_audio_activity input plus {
+        'lead_seconds': int | None,  # Optional max length of the leading segment (default 30)
+    }
+    Output: the transcribe_audio_activity output plus {
+        'complete': bool,       # False while the remainder still has to be transcribed
+        'rest_path': str,       # (incomplete only) audio after the leading segment
+        'rest_offset_ms': int,  # (incomplete only) start of rest_path in the recording
+        'rest_end_ms': int,     # (incomplete only) end of the recording
+        'overlapped': bool,     # (incomplete only) rest_path repeats the end of the lead (hard cut)
+        'cache_digest': str | None,  # (incomplete only) key to cache the completed transcript under
+    }
+    """
+    req = _request(input)
+    cache = TranscriptionCache()
+    cache_status, result, digest = _cache_lookup(cache, req, input.get("audio_sha256"))
+    json_path = _transcript_path(req.audio_path)
+    split = None
+    if result is None:
+        lead_ms = int(input.get("lead_seconds") or STREAM_LEAD_SECONDS) * 1000
+        stream_dir = os.path.join(
+            os.path.dirname(os.path.abspath(req.audio_path)),
+            STREAM_DIR_PREFIX + os.path.splitext(os.path.basename(req.audio_path))[0],
+        )
         try:
-            if os.path.isfile(terms_file):
-                with open(terms_file, "r", encoding="utf-8") as f:
-                    # one term per line, ignore blanks and comments
-                    terms = [
-                        ln.strip() for ln in f.readlines()
-                        if (ln.strip() and not ln.strip().startswith("#"))
-                    ]
-                if terms:
-                    # keep prompt concise to avoid oversized inputs
-                    max_terms = 200
-                    terms_limited = terms[:max_terms]
-                    terms_joined = ", ".join(terms_limited)
-                    terms_prompt = (
-                        "Important domain terms that may appear in the audio."
-                        " Prefer these spellings when applicable: " + terms_joined
-                    )
-            else:
-                logger.warning("terms_file path not found: %s", terms_file)
-        except Exception as e:
-            logger.exception("Failed to read terms_file '%s': %s", terms_file, e)
+            split = split_lead(req.audio_path, stream_dir, lead_ms)
+        except decode_errors() as e:
+            logger.warning("Cannot decode %s for streaming (%s); transcribing it in full", req.audio_path, e)
+            shutil.rmtree(stream_dir, ignore_errors=True)
+    if split is None:
+        if result is None:
+            result = transcribe_with_chunking(
+                req,
+                chunk_seconds=int(input.get("chunk_seconds") or 0),
+                workers=int(input.get("transcription_workers") or 4),
+            )
+            _cache_store(cache, digest, result)
+        _write_transcript(json_path, result)
+        return {'transcription_path': json_path, 'text': result.text, 'cache': cache_status, 'complete': True}
+    lead, rest = split
+    started = time.perf_counter()
+    lead_result = get_transcription_backend().transcribe(
+        TranscriptionRequest(audio_path=lead.path, mime_type="audio/x-wav", terms_prompt=req.terms_prompt)
+    )
+    segment = TranscriptionSegment(
+        index=0,
+        start_ms=lead.start_ms,
+        end_ms=lead.end_ms,
+        text=lead_result.text,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    os.remove(lead.path)
+    _write_transcript(json_path, TranscriptionResult(text=lead_result.text, segments=[segment], partial=True))
+    logger.info(
+        "Leading %.1fs of %s transcribed in %.2fs; remainder pending",
+        lead.end_ms / 1000, req.audio_path, segment.seconds,
+    )
+    return {
+        'transcription_path': json_path,
+        'text': lead_result.text,
+        'cache': cache_status,
+        'complete': False,
+        'rest_path': rest.path,
+        'rest_offset_ms': rest.start_ms,
+        'rest_end_ms': rest.end_ms,
+        'overlapped': rest.start_ms < lead.end_ms,
+        'cache_digest': digest,
+    }
 
+
+@instrumented_activity("transcribe")
+def transcribe_remainder_activity(ctx, input: dict) -> dict:
+    """
+    Streaming mode, step 2: transcribe the audio after the leading segment (chunked like
+    transcribe_audio_activity), append it to the partial transcript file and clear 'partial'.
+    Input: the transcribe_leading_segment_activity output plus 'terms_file', 'chunk_seconds'
+    and 'transcription_workers'.
+    Output: the transcribe_audio_activity output for the complete transcript.
+    """
+    json_path = input.get("transcription_path")
+    rest_path = input.get("rest_path")
+    if not json_path or not rest_path:
+        raise ValueError("transcribe_remainder_activity requires 'transcription_path' and 'rest_path'.")
+    with open(json_path, "r", encoding="utf-8") as f:
+        lead = TranscriptionResult.model_validate_json(f.read())
+    if not lead.partial and not lead.error:
+        # Completed by an earlier attempt of this activity
+        return {'transcription_path': json_path, 'text': lead.text, 'cache': input.get("cache")}
     req = TranscriptionRequest(
-        audio_path=input.get("audio_path"),
-        mime_type=input.get("mime_type"),
-        terms_prompt=terms_prompt,
+        audio_path=rest_path, mime_type="audio/x-wav", terms_prompt=_terms_prompt(input.get("terms_file"))
+    )
+    started = time.perf_counter()
+    try:
+        rest = transcribe_with_chunking(
+            req,
+            chunk_seconds=int(input.get("chunk_seconds") or 0),
+            workers=int(input.get("transcription_workers") or 4),
+        )
+    except Exception as e:
+        # Terminal state for readers of the file: no longer waiting, but flagged as only the lead
+        _write_transcript(
+            json_path, lead.model_copy(update={"partial": False, "error": f"remainder transcription failed: {e}"})
+        )
+        raise
+    offset = int(input.get("rest_offset_ms") or 0)
+    lead_segments = lead.segments or []
+    rest_segments = rest.segments or [
+        TranscriptionSegment(
+            index=0,
+            start_ms=0,
+            end_ms=int(input.get("rest_end_ms") or offset) - offset,
+            text=rest.text,
+            seconds=round(time.perf_counter() - started, 3),
+        )
+    ]
+    segments = lead_segments + [
+        s.model_copy(update={
+            "index": len(lead_segments) + i,
+            "start_ms": s.start_ms + offset,
+            "end_ms": s.end_ms + offset,
+        })
+        for i, s in enumerate(rest_segments)
+    ]
+    result = TranscriptionResult(
+        text=stitch_texts([lead.text, rest.text], [False, bool(input.get("overlapped"))]),
+        segments=segments,
     )
-    result: TranscriptionResult = transcribe_audio_file(req)
-    # Save transcription as JSON next to audio file
-    json_path = os.path.splitext(req.audio_path)[0] + '.json'
-    with open(json_path, 'w', encoding='utf-8') as f:
-        f.write(result.json())
-    return {'transcription_path': json_path, 'text': result.text}
+    _write_transcript(json_path, result)
+    _cache_store(TranscriptionCache(), input.get("cache_digest"), result)
+    shutil.rmtree(os.path.dirname(rest_path), ignore_errors=True)
+    logger.info("Transcript %s completed with %d segments", json_path, len(segments))
+    return {'transcription_path': json_path, 'text': result.text, 'cache': input.get("cache")}
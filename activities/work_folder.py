@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import logging
+
+from services.telemetry import instrumented_activity
+from services.work_folder import enforce_retention, release_files, sweep_due
+
+logger = logging.getLogger("work_folder")
+
+
+@instrumented_activity("cleanup")
+def release_work_files_activity(ctx, input: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Delete work-folder audio of recordings that were published and archived.
+    Input: { 'artifacts': { correlation_id: [path, ...] } }
+    Output: { 'removed': int, 'bytes_freed': int }
+    """
+    removed = freed = 0
+    for correlation_id, paths in (input.get("artifacts") or {}).items():
+        n, size = release_files(paths or [])
+        removed += n
+        freed += size
+        logger.debug("Released %d work files (%d bytes) of %s", n, size, correlation_id)
+    return {"removed": removed, "bytes_freed": freed}
+
+
+@instrumented_activity("cleanup")
+def enforce_work_folder_retention_activity(ctx, input: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Age/size-bounded retention for the download folder (transcripts evicted LRU).
+    Input: { 'download_folder': str, 'max_transcript_bytes': int, 'max_age_seconds': int,
+             'min_interval_seconds': int | None }
+    Output: { 'swept': bool, 'removed': int, 'bytes_freed': int, '<kind>_bytes': int, ... }
+    """
+    folder = input.get("download_folder")
+    if not folder:
+        raise ValueError("enforce_work_folder_retention_activity requires 'download_folder' in input.")
+    if not sweep_due(folder, float(input.get("min_interval_seconds") or 0)):
+        return {"swept": False}
+    result = enforce_retention(
+        folder,
+        max_transcript_bytes=int(input.get("max_transcript_bytes") or 0),
+        max_age_seconds=int(input.get("max_age_seconds") or 0),
+    )
+    if result["removed"]:
+        logger.info("Work folder retention on %s: %s", folder, result)
+    return {"swept": True, **result}
@@ -0,0 +1,120 @@
+"""
+Real-time factor benchmark for the transcription backends.
+
+Transcribes the same recordings with each backend and reports, per file and in
+total, wall-clock seconds and the real-time factor (RTF = processing time / audio
+duration; below 1 is faster than real time). The local backend's model load is
+timed separately, since a worker pays it once per process and not per file.
+
+    python -m benchmarks.transcription_backends
+    python -m benchmarks.transcription_backends --backends local --files audio_samples/*.mp3 --json rtf.json
+
+The openai backend needs OPENAI_API_KEY; the local backend needs faster-whisper
+(pip install -r requirements-local-transcription.txt).
+Audio durations are read with pydub (ffmpeg for mp3).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio_samples")
+
+
+def audio_seconds(path: str) -> float:
+    from pydub import AudioSegment
+
+    return len(AudioSegment.from_file(path)) / 1000.0
+
+
+def run_backend(name: str, files: List[str], repeat: int) -> Dict[str, Any]:
+    from models.voice2action import TranscriptionRequest
+    from services.transcription_backends import LocalWhisperBackend, get_transcription_backend
+
+    backend = get_transcription_backend(name)
+    load_seconds = 0.0
+    if isinstance(backend, LocalWhisperBackend):
+        started = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - started
+
+    rows = []
+    for path in files:
+        duration = audio_seconds(path)
+        req = TranscriptionRequest(audio_path=path)
+        # Best of `repeat` runs, so a cold connection or cache does not dominate short samples
+        best, text = None, ""
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            text = backend.transcribe(req).text
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        rows.append(
+            {
+                "file": os.path.basename(path),
+                "audio_s": round(duration, 2),
+                "seconds": round(best, 3),
+                "rtf": round(best / duration, 3) if duration else 0.0,
+                "text": text,
+            }
+        )
+    audio_total = sum(r["audio_s"] for r in rows)
+    seconds_total = sum(r["seconds"] for r in rows)
+    return {
+        "backend": name,
+        "model": backend.model_id,
+        "load_seconds": round(load_seconds, 3),
+        "audio_s": round(audio_total, 2),
+        "seconds": round(seconds_total, 3),
+        "rtf": round(seconds_total / audio_total, 3) if audio_total else 0.0,
+        "files": rows,
+    }
+
+
+def print_result(r: Dict[str, Any]) -> None:
+    print(
+        f"\nbackend={r['backend']} model={r['model']} load={r['load_seconds']}s "
+        f"audio={r['audio_s']}s wall={r['seconds']}s rtf={r['rtf']}"
+    )
+    print(f"  {'file':<56}{'audio s':>9}{'wall s':>9}{'rtf':>8}")
+    for f in r["files"]:
+        print(f"  {f['file']:<56}{f['audio_s']:>9}{f['seconds']:>9}{f['rtf']:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Transcription backend real-time factor benchmark")
+    parser.add_argument("--backends", default="openai,local", help="comma separated backends to compare")
+    parser.add_argument("--files", nargs="*", help="recordings to transcribe (default: audio_samples/*.mp3)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per file; the fastest is reported")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    files = args.files or sorted(glob.glob(os.path.join(SAMPLES_DIR, "*.mp3")))
+    if not files:
+        print("No recordings found", file=sys.stderr)
+        return 1
+
+    results = []
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            results.append(run_backend(name, files, args.repeat))
+        except Exception as e:
+            print(f"\nbackend={name} skipped: {e}", file=sys.stderr)
+            continue
+        print_result(results[-1])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
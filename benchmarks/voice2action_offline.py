@@ -0,0 +1,394 @@
+"""
+Offline benchmark for the voice2action workflow.
+
+Synthesizes N small WAV recordings in a temporary local inbox and drives
+voice2action_poll_orchestrator in offline mode in-process: the Dapr state store and
+pub/sub are replaced by an in-memory fake client, Whisper by a fixed-latency stub, and
+the workflow engine by a minimal driver that runs child workflows on a thread pool.
+Activities, models and the orchestrators themselves are the real code.
+
+Each inbox size runs in a fresh subprocess so peak RSS is reported per size.
+
+    python -m benchmarks.voice2action_offline --sizes 10,100,1000,10000
+    python -m benchmarks.voice2action_offline --json after.json --baseline before.json
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import functools
+import grpc
+import json
+import logging
+import math
+import os
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+
+SAMPLE_RATE = 8000
+
+
+# ---- audio synthesis ----
+
+def synthesize_inbox(folder: str, count: int, seconds: float) -> None:
+    """Write `count` distinct mono 16-bit WAV files (a tone with the index stamped into it)."""
+    os.makedirs(folder, exist_ok=True)
+    frames = int(SAMPLE_RATE * seconds)
+    tone = bytearray(
+        b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE))) for i in range(frames)
+        )
+    )
+    for n in range(count):
+        # Unique content per file so the transcription cache does not turn the run into cache hits
+        tone[0:8] = struct.pack("<q", n)
+        with wave.open(os.path.join(folder, f"bench-{n:05d}.wav"), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(bytes(tone))
+
+
+# ---- Dapr fakes ----
+
+class FakeConflict(grpc.RpcError):
+    """What the sidecar returns when a first-write / etag conditional save loses."""
+
+    def code(self):
+        return grpc.StatusCode.ABORTED
+
+class FakeDaprClient:
+    """In-memory stand-in for the DaprClient calls made by StateStore and the publish activity."""
+
+    def __init__(self, publish_latency: float = 0.0):
+        self._lock = threading.Lock()
+        self._data: Dict[str, bytes] = {}
+        # etag per key: a write counter, so compare-and-swap writes (transcription cache index) work
+        self._etags: Dict[str, str] = {}
+        self._writes = 0
+        self.published = 0
+        self.publish_latency = publish_latency
+
+    def _put(self, key: str, value: Any) -> None:
+        self._writes += 1
+        self._data[key] = value if isinstance(value, bytes) else str(value).encode("utf-8")
+        self._etags[key] = str(self._writes)
+
+    def _pop(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._etags.pop(key, None)
+
+    def get_state(self, store_name, key, **kwargs):
+        with self._lock:
+            return types.SimpleNamespace(data=self._data.get(key, b""), etag=self._etags.get(key, ""))
+
+    def save_state(self, store_name, key, value, etag=None, options=None, **kwargs):
+        with self._lock:
+            # Conditional write: insert-only without etag (StateStore.claim), compare-and-swap with one
+            if options is not None and (
+                (etag is None and key in self._data) or (etag is not None and self._etags.get(key) != etag)
+            ):
+                raise FakeConflict(f"possible etag mismatch for key '{key}'")
+            self._put(key, value)
+
+    def delete_state(self, store_name, key, **kwargs):
+        with self._lock:
+            self._pop(key)
+
+    def get_bulk_state(self, store_name, keys, **kwargs):
+        with self._lock:
+            items = [
+                types.SimpleNamespace(key=k, data=self._data.get(k, b""), etag=self._etags.get(k, ""), error="")
+                for k in keys
+            ]
+        return types.SimpleNamespace(items=items)
+
+    def save_bulk_state(self, store_name, states, **kwargs):
+        with self._lock:
+            for s in states:
+                self._put(s.key, s.value)
+
+    def execute_state_transaction(self, store_name, operations, **kwargs):
+        with self._lock:
+            for op in operations:
+                if op.data is None:
+                    self._pop(op.key)
+                else:
+                    self._put(op.key, op.data)
+
+    def publish_event(self, **kwargs):
+        if self.publish_latency:
+            time.sleep(self.publish_latency)
+        with self._lock:
+            self.published += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_whisper(latency: float) -> Callable:
+    from models.voice2action import TranscriptionResult
+
+    def _transcribe(req) -> TranscriptionResult:
+        time.sleep(latency)
+        return TranscriptionResult(text=f"Benchmark note for {os.path.basename(req.audio_path)}.")
+    return _transcribe
+
+
+# ---- minimal workflow driver ----
+
+class _Task:
+    def __init__(self, future: Future):
+        self.future = future
+
+    def get_result(self):
+        return self.future.result()
+
+
+def _done(value=None, error: Optional[BaseException] = None) -> _Task:
+    f: Future = Future()
+    if error is not None:
+        f.set_exception(error)
+    else:
+        f.set_result(value)
+    return _Task(f)
+
+
+def fake_when_any(tasks: List[_Task]) -> _Task:
+    done, _ = wait([t.future for t in tasks], return_when=FIRST_COMPLETED)
+    first = next(t for t in tasks if t.future in done)
+    return _done(first)
+
+
+class Timings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+
+class FakeWorkflowContext:
+    """Implements the slice of DaprWorkflowContext the voice2action orchestrators use."""
+
+    is_replaying = False
+
+    def __init__(self, pool: ThreadPoolExecutor, timings: Timings):
+        self.pool = pool
+        self.timings = timings
+        self.instance_id = f"bench-{id(self):x}"
+        self.current_utc_datetime = datetime.now(timezone.utc)
+
+    def call_activity(self, activity, input=None, **kwargs) -> _Task:
+        # Stage names come from the telemetry decorator, so benchmark and /metrics agree
+        stage = getattr(activity, "stage_name", activity.__name__)
+        started = time.perf_counter()
+        try:
+            return _done(activity(self, input))
+        except Exception as e:
+            return _done(error=e)
+        finally:
+            self.timings.add(stage, time.perf_counter() - started)
+
+    def call_child_workflow(self, workflow, input=None, **kwargs) -> _Task:
+        def _run():
+            started = time.perf_counter()
+            try:
+                return run_orchestrator(workflow, FakeWorkflowContext(self.pool, self.timings), input)
+            finally:
+                self.timings.add("per_file", time.perf_counter() - started)
+        return _Task(self.pool.submit(_run))
+
+
+def run_orchestrator(fn, ctx: FakeWorkflowContext, input) -> Any:
+    gen = fn(ctx, input)
+    if not isinstance(gen, types.GeneratorType):
+        return gen
+    value, error = None, None
+    while True:
+        try:
+            task = gen.throw(error) if error is not None else gen.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value, error = task.get_result(), None
+        except Exception as e:
+            value, error = None, e
+
+
+# ---- single run ----
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def run_once(args) -> Dict[str, Any]:
+    import services.state_store as state_store
+    import activities.publish_intent_orchestrator as publish_mod
+    import activities.transcribe_audio as transcribe_mod
+    import workflows.voice2action as wf
+
+    client = FakeDaprClient(publish_latency=args.publish_latency_ms / 1000)
+    state_store._client = client
+    publish_mod.DaprClient = lambda *a, **k: client
+    transcribe_mod.transcribe_with_chunking = functools.partial(
+        transcribe_mod.transcribe_with_chunking, transcribe_fn=fake_whisper(args.whisper_latency_ms / 1000)
+    )
+    wf.when_any = fake_when_any
+
+    root = tempfile.mkdtemp(prefix="v2a-bench-")
+    try:
+        inbox, archive, work = (os.path.join(root, d) for d in ("inbox", "archive", "work"))
+        synthesize_inbox(inbox, args.size, args.seconds)
+        config = {
+            "offline_mode": True,
+            "inbox_folder": inbox,
+            "archive_folder": archive,
+            "download_folder": work,
+            "terms_file": None,
+            "chunk_seconds": 0,
+            "transcription_workers": 1,
+            "max_parallel_files": args.parallel,
+            "local_handoff": "link",
+        }
+        timings = Timings()
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel), thread_name_prefix="bench-child") as pool:
+            started = time.perf_counter()
+            result = run_orchestrator(wf.voice2action_poll_orchestrator, FakeWorkflowContext(pool, timings), config)
+            elapsed = time.perf_counter() - started
+        archived = len(os.listdir(archive)) if os.path.isdir(archive) else 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "size": args.size,
+        "parallel": args.parallel,
+        "seconds": round(elapsed, 3),
+        "files_per_min": round(args.size / elapsed * 60, 1) if elapsed else 0.0,
+        "failed": result.get("failed", 0),
+        "published": client.published,
+        "archived": archived,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for stage, values in timings.samples.items()
+        },
+    }
+
+
+# ---- suite ----
+
+def run_suite(args) -> List[Dict[str, Any]]:
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        cmd = [
+            sys.executable, "-m", "benchmarks.voice2action_offline", "--single",
+            "--size", str(size),
+            "--parallel", str(args.parallel),
+            "--seconds", str(args.seconds),
+            "--whisper-latency-ms", str(args.whisper_latency_ms),
+            "--publish-latency-ms", str(args.publish_latency_ms),
+        ]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+        print_result(results[-1])
+    return results
+
+
+def print_result(r: Dict[str, Any]) -> None:
+    print(
+        f"\nfiles={r['size']} parallel={r['parallel']} wall={r['seconds']}s "
+        f"throughput={r['files_per_min']} files/min peak_rss={r['peak_rss_mb']} MB "
+        f"failed={r['failed']} published={r['published']} archived={r['archived']}"
+    )
+    print(f"  {'stage':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in r["stages"].items():
+        print(f"  {stage:<14}{s['count']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float, min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    Return regressions: throughput drop or p95 growth beyond `tolerance` (fraction) per size/stage.
+    p95 changes smaller than min_delta_ms are treated as noise (sub-millisecond stages jitter a lot).
+    """
+    regressions = []
+    by_size = {b["size"]: b for b in baseline}
+    for r in results:
+        b = by_size.get(r["size"])
+        if not b:
+            continue
+        if r["files_per_min"] < b["files_per_min"] * (1 - tolerance):
+            regressions.append(f"size={r['size']}: throughput {b['files_per_min']} -> {r['files_per_min']} files/min")
+        for stage, s in r["stages"].items():
+            old = b["stages"].get(stage)
+            if (
+                old
+                and s["p95_ms"] > old["p95_ms"] * (1 + tolerance)
+                and s["p95_ms"] - old["p95_ms"] >= min_delta_ms
+            ):
+                regressions.append(f"size={r['size']} {stage}: p95 {old['p95_ms']} -> {s['p95_ms']} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline voice2action workflow benchmark")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma separated inbox sizes")
+    parser.add_argument("--parallel", type=int, default=4, help="max_parallel_files for the poll orchestrator")
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of each synthesized recording")
+    parser.add_argument("--whisper-latency-ms", type=float, default=50.0, help="fake Whisper latency per file")
+    parser.add_argument("--publish-latency-ms", type=float, default=0.0, help="fake pub/sub publish latency")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression fraction (default 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes below this")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, default=10, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.single:
+        print(json.dumps(run_once(args)))
+        return 0
+
+    results = run_suite(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
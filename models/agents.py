@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import Literal, Optional
 
 
 class SendEmailArgs(BaseModel):
@@ -70,8 +70,18 @@ class RetrieveTranscriptionArgs(BaseModel):
     )
 
 
+class FastIntentDecision(BaseModel):
+    """Structured output of the fast-path intent classifier (one LLM call per recording)."""
+
+    intent: Literal["create_todo", "send_email"]
+    confidence: float = Field(ge=0.0, le=1.0)
+    # Required when intent is create_todo; send_email is built from the transcript itself
+    task: Optional[CreateTaskArgs] = None
+
+
 __all__ = [
     "SendEmailArgs",
     "CreateTaskArgs",
     "RetrieveTranscriptionArgs",
+    "FastIntentDecision",
 ]
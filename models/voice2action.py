@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, field_validator, model_validator, ValidationError
 
 # Classification models for FR003
@@ -18,23 +18,49 @@ class TranscriptionRequest(BaseModel):
     # Optional prompt to bias transcription with common terms
     terms_prompt: Optional[str] = None
 
+class TranscriptionSegment(BaseModel):
+    index: int
+    start_ms: int
+    end_ms: int
+    text: str
+    # Wall-clock seconds spent transcribing this segment
+    seconds: float
+
+
 class TranscriptionResult(BaseModel):
     text: str
+    # Present when the recording was transcribed in chunks
+    segments: Optional[List[TranscriptionSegment]] = None
+    # Streaming mode: only the leading segment is in the file yet; the rest is still being transcribed
+    partial: Optional[bool] = None
+    # Streaming mode: the remainder failed; the file holds only the leading segment (partial is False)
+    error: Optional[str] = None
 
 class FileRef(BaseModel):
     id: str
     name: str
     size: Optional[int] = None
     etag: Optional[str] = None
+    # When the recording landed in the inbox (ISO 8601); used for end-to-end latency metrics
+    created_at: Optional[str] = None
 
 
 class ListInboxRequest(BaseModel):
     inbox_folder: Optional[str] = None
     corr_id: Optional[str] = None
+    # OneDrive only: list changes since the stored delta link instead of the full folder
+    incremental: bool = False
+    # Local only: restrict listing to these file names (set by the inbox watcher)
+    file_names: Optional[List[str]] = None
+    # Sharded polling: only list files whose id hashes to this shard (None = all files)
+    shard_index: Optional[int] = None
+    shard_count: int = 1
 
 
 class ListInboxResult(BaseModel):
     files: List[FileRef]
+    # State entries (e.g. delta link) to persist together with the pending marks
+    checkpoint: Optional[Dict[str, str]] = None
 
 
 class DownloadRequest(BaseModel):
@@ -46,3 +72,12 @@ class DownloadRequest(BaseModel):
 class MarkPendingRequest(BaseModel):
     file_id: str
     corr_id: Optional[str] = None
+    # Lease owner (poll workflow instance id); a retry by the same owner keeps its claims
+    owner: Optional[str] = None
+
+
+class MarkPendingBatchRequest(BaseModel):
+    file_ids: List[str]
+    corr_id: Optional[str] = None
+    owner: Optional[str] = None
+    checkpoint: Optional[Dict[str, str]] = None
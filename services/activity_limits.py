@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+import functools
+import logging
+import threading
+
+from services.telemetry import ACTIVITIES_QUEUED, ACTIVITIES_RUNNING
+
+logger = logging.getLogger("activity_limits")
+
+# Max concurrent executions per activity stage (stage names as in services.telemetry)
+DEFAULT_ACTIVITY_LIMITS: Dict[str, int] = {
+    "list": 2,
+    "mark_pending": 8,
+    "download": 16,
+    "preprocess": 4,
+    "transcribe": 4,
+    "intent": 8,
+    "publish": 8,
+    "archive": 8,
+    "cleanup": 2,
+}
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, int]:
+    """Parse 'transcribe=4,download=16' into a dict; unknown or malformed entries are ignored."""
+    limits: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or name not in DEFAULT_ACTIVITY_LIMITS:
+            if part.strip():
+                logger.warning("Ignoring activity limit entry '%s'", part.strip())
+            continue
+        try:
+            limits[name] = int(value)
+        except ValueError:
+            logger.warning("Ignoring activity limit entry '%s'", part.strip())
+    return limits
+
+
+class ActivityLimiter:
+    """
+    Per-stage concurrency limits for workflow activities.
+
+    Activities over the limit wait on a semaphore in their worker thread, so heavy stages
+    (transcribe, download) queue up instead of all hitting OpenAI and the disk at once, while
+    light stages keep their own slots. A limit <= 0 leaves the stage unbounded.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = {**DEFAULT_ACTIVITY_LIMITS, **(limits or {})}
+        self._semaphores = {
+            stage: threading.BoundedSemaphore(n) for stage, n in self.limits.items() if n > 0
+        }
+
+    @contextmanager
+    def slot(self, stage: str) -> Iterator[None]:
+        sem = self._semaphores.get(stage)
+        if sem is not None:
+            if ACTIVITIES_QUEUED is not None:
+                ACTIVITIES_QUEUED.labels(stage).inc()
+            try:
+                sem.acquire()
+            finally:
+                if ACTIVITIES_QUEUED is not None:
+                    ACTIVITIES_QUEUED.labels(stage).dec()
+        if ACTIVITIES_RUNNING is not None:
+            ACTIVITIES_RUNNING.labels(stage).inc()
+        try:
+            yield
+        finally:
+            if ACTIVITIES_RUNNING is not None:
+                ACTIVITIES_RUNNING.labels(stage).dec()
+            if sem is not None:
+                sem.release()
+
+    def bounded(self, fn: Callable) -> Callable:
+        """Wrap an `activity(ctx, input)` so it runs in a slot of its telemetry stage."""
+        stage = getattr(fn, "stage_name", fn.__name__)
+
+        @functools.wraps(fn)
+        def wrapper(ctx, input):
+            with self.slot(stage):
+                return fn(ctx, input)
+        return wrapper
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Type
+import os
+import wave
+
+
+# Chunks are 16-bit mono 16 kHz WAV: 32 kB per second of audio plus a 44 byte header
+CHUNK_FRAME_RATE = 16000
+CHUNK_BYTES_PER_SECOND = CHUNK_FRAME_RATE * 2
+WAV_HEADER_BYTES = 44
+
+
+def max_chunk_ms_for(max_bytes: int) -> int:
+    """Longest chunk (ms) whose WAV export stays within max_bytes."""
+    return max(1000, (max_bytes - WAV_HEADER_BYTES) * 1000 // CHUNK_BYTES_PER_SECOND)
+
+
+def decode_errors() -> Tuple[Type[BaseException], ...]:
+    """Errors meaning a file cannot be decoded here: pydub or ffmpeg/ffprobe missing, or unreadable audio."""
+    try:
+        from pydub.exceptions import CouldntDecodeError
+    except ImportError:
+        return (ImportError, OSError)
+    return (ImportError, OSError, CouldntDecodeError)
+
+
+def wav_duration_ms(path: str) -> Optional[int]:
+    """Length of a PCM WAV file read from its header (no decoding, no ffmpeg); None for other formats."""
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getnframes() * 1000 // w.getframerate()
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        return None
+
+
+def _export_chunk(audio, path: str) -> None:
+    audio.set_channels(1).set_frame_rate(CHUNK_FRAME_RATE).set_sample_width(2).export(path, format="wav")
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    path: str
+    start_ms: int
+    end_ms: int
+
+
+def plan_cuts(
+    duration_ms: int,
+    silences: List[tuple],
+    max_chunk_ms: int,
+    min_chunk_ms: int = 1000,
+    overlap_ms: int = 1500,
+) -> List[tuple]:
+    """
+    Plan (start_ms, end_ms) chunk bounds no longer than max_chunk_ms.
+
+    Cuts at the latest silence midpoint that fits in the window; when a window has no silence
+    the chunk is hard-cut and the next chunk starts overlap_ms earlier so no words are lost
+    (duplicates are removed when the text is stitched).
+    """
+    cut_points = sorted((s + e) // 2 for s, e in silences)
+    bounds: List[tuple] = []
+    start = 0
+    while start < duration_ms:
+        limit = start + max_chunk_ms
+        if limit >= duration_ms:
+            bounds.append((start, duration_ms))
+            break
+        candidates = [c for c in cut_points if start + min_chunk_ms < c <= limit]
+        if candidates:
+            end = candidates[-1]
+            bounds.append((start, end))
+            start = end
+        else:
+            bounds.append((start, limit))
+            start = max(limit - overlap_ms, start + min_chunk_ms)
+    return bounds
+
+
+def split_on_silence(
+    audio_path: str,
+    out_dir: str,
+    max_chunk_ms: int,
+    min_silence_ms: int = 700,
+    silence_thresh_db: Optional[float] = None,
+    overlap_ms: int = 1500,
+    max_bytes: Optional[int] = None,
+) -> List[AudioChunk]:
+    """
+    Split an audio file into mono 16 kHz WAV chunks of at most max_chunk_ms, preferring silent gaps.
+
+    Returns [] when the recording already fits into one chunk (and, with max_bytes, the file
+    is no larger than that) so callers can upload the original. A short recording above
+    max_bytes (e.g. 44.1 kHz stereo WAV) is transcoded into a single chunk instead.
+    silence_thresh_db defaults to 16 dB below the file's average loudness.
+    Requires pydub (and ffmpeg for non-WAV input).
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+    audio = AudioSegment.from_file(audio_path)
+    if len(audio) <= max_chunk_ms:
+        if max_bytes is None or os.path.getsize(audio_path) <= max_bytes:
+            return []
+        bounds = [(0, len(audio))]
+    else:
+        thresh = silence_thresh_db if silence_thresh_db is not None else audio.dBFS - 16
+        silences = detect_silence(audio, min_silence_len=min_silence_ms, silence_thresh=int(thresh))
+        bounds = plan_cuts(len(audio), silences, max_chunk_ms, overlap_ms=overlap_ms)
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    chunks: List[AudioChunk] = []
+    for i, (start, end) in enumerate(bounds):
+        path = os.path.join(out_dir, f"{base}.part{i:03d}.wav")
+        _export_chunk(audio[start:end], path)
+        chunks.append(AudioChunk(index=i, path=path, start_ms=start, end_ms=end))
+    return chunks
+
+
+def split_lead(
+    audio_path: str,
+    out_dir: str,
+    lead_ms: int,
+    min_silence_ms: int = 700,
+    silence_thresh_db: Optional[float] = None,
+    overlap_ms: int = 1500,
+) -> Optional[Tuple[AudioChunk, AudioChunk]]:
+    """
+    Split an audio file into a leading chunk of at most lead_ms (cut at its last silent gap) and
+    the rest, both mono 16 kHz WAV. Returns None when the recording fits into the leading chunk.
+    Only the leading window is scanned for silence, so this stays cheap for long recordings.
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+    audio = AudioSegment.from_file(audio_path)
+    # Not worth a second transcription request for a short tail
+    if len(audio) <= lead_ms + min_silence_ms * 2:
+        return None
+    window = audio[:lead_ms]
+    thresh = silence_thresh_db if silence_thresh_db is not None else audio.dBFS - 16
+    silences = detect_silence(window, min_silence_len=min_silence_ms, silence_thresh=int(thresh))
+    (lead_start, lead_end), (rest_start, _) = plan_cuts(len(audio), silences, lead_ms, overlap_ms=overlap_ms)[:2]
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    parts: List[AudioChunk] = []
+    for i, (name, start, end) in enumerate((("lead", lead_start, lead_end), ("rest", rest_start, len(audio)))):
+        path = os.path.join(out_dir, f"{base}.{name}.wav")
+        _export_chunk(audio[start:end], path)
+        parts.append(AudioChunk(index=i, path=path, start_ms=start, end_ms=end))
+    return parts[0], parts[1]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+import multiprocessing
+import os
+import threading
+
+# Speech needs no more than this for Whisper; Opus at 24 kbit/s mono is ~10 MB per hour
+TARGET_SAMPLE_RATE = 16000
+OPUS_BITRATE = "24k"
+# Worker processes for CPU-bound decoding/encoding (kept out of the gRPC worker threads)
+AUDIO_PREPROCESS_WORKERS = int(os.getenv("AUDIO_PREPROCESS_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def preprocess_audio(
+    src_path: str,
+    dest_dir: str,
+    silence_thresh_db: float = -50.0,
+    keep_silence_ms: int = 250,
+) -> Dict[str, Any]:
+    """
+    Downmix to mono, resample to 16 kHz, trim leading/trailing silence and encode as Opus (.ogg).
+
+    Returns {'path', 'mime_type', 'bytes_in', 'bytes_out', 'bytes_saved', 'duration_ms_in',
+    'duration_ms_out'}. When the result would not be smaller (or the recording is all
+    silence) the original file is returned unchanged. Requires pydub and ffmpeg with libopus.
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_leading_silence
+
+    bytes_in = os.path.getsize(src_path)
+    audio = AudioSegment.from_file(src_path)
+    duration_in = len(audio)
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE)
+    lead = detect_leading_silence(audio, silence_threshold=silence_thresh_db)
+    tail = detect_leading_silence(audio.reverse(), silence_threshold=silence_thresh_db)
+    start = max(0, lead - keep_silence_ms)
+    end = min(len(audio), len(audio) - tail + keep_silence_ms)
+    unchanged = {
+        "path": src_path,
+        "mime_type": None,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_in,
+        "bytes_saved": 0,
+        "duration_ms_in": duration_in,
+        "duration_ms_out": duration_in,
+    }
+    if end <= start:
+        return unchanged
+    trimmed = audio[start:end]
+    os.makedirs(dest_dir, exist_ok=True)
+    dest_path = os.path.join(dest_dir, os.path.splitext(os.path.basename(src_path))[0] + ".ogg")
+    trimmed.export(dest_path, format="ogg", codec="libopus", bitrate=OPUS_BITRATE)
+    bytes_out = os.path.getsize(dest_path)
+    if bytes_out >= bytes_in:
+        os.remove(dest_path)
+        return unchanged
+    return {
+        "path": dest_path,
+        "mime_type": "audio/ogg",
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "bytes_saved": bytes_in - bytes_out,
+        "duration_ms_in": duration_in,
+        "duration_ms_out": len(trimmed),
+    }
+
+
+def get_preprocess_pool() -> ProcessPoolExecutor:
+    """Process pool for preprocess_audio; spawn start method so no gRPC state is forked."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, AUDIO_PREPROCESS_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import re
+import time
+
+from models.voice2action import TranscriptionRequest, TranscriptionResult, TranscriptionSegment
+from services.audio_chunker import AudioChunk
+
+TranscribeFn = Callable[[TranscriptionRequest], TranscriptionResult]
+
+_WORD = re.compile(r"[^\w']+")
+
+
+def _norm(word: str) -> str:
+    return _WORD.sub("", word.lower())
+
+
+def stitch_texts(texts: List[str], overlapped: Optional[List[bool]] = None, max_overlap_words: int = 30) -> str:
+    """
+    Join chunk transcripts in order, dropping words repeated across a chunk boundary.
+    overlapped[i] tells whether chunk i shares audio with chunk i-1 (default: assume it does).
+    """
+    out: List[str] = []
+    for i, text in enumerate(texts):
+        words = text.split()
+        if out and words and (overlapped is None or overlapped[i]):
+            tail = [_norm(w) for w in out[-max_overlap_words:]]
+            head = [_norm(w) for w in words[:max_overlap_words]]
+            overlap = 0
+            for k in range(min(len(tail), len(head)), 0, -1):
+                if tail[-k:] == head[:k]:
+                    overlap = k
+                    break
+            words = words[overlap:]
+        out.extend(words)
+    return " ".join(out)
+
+
+def transcribe_chunks(
+    chunks: List[AudioChunk],
+    transcribe_fn: TranscribeFn,
+    terms_prompt: str | None = None,
+    max_workers: int = 4,
+) -> Tuple[str, List[TranscriptionSegment]]:
+    """Transcribe chunks concurrently and return (stitched text, per-segment timings) in chunk order."""
+
+    def _one(chunk: AudioChunk) -> TranscriptionSegment:
+        started = time.perf_counter()
+        res = transcribe_fn(
+            TranscriptionRequest(audio_path=chunk.path, mime_type="audio/x-wav", terms_prompt=terms_prompt)
+        )
+        return TranscriptionSegment(
+            index=chunk.index,
+            start_ms=chunk.start_ms,
+            end_ms=chunk.end_ms,
+            text=res.text,
+            seconds=round(time.perf_counter() - started, 3),
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="transcribe") as pool:
+        segments = list(pool.map(_one, chunks))
+    overlapped = [i > 0 and c.start_ms < chunks[i - 1].end_ms for i, c in enumerate(chunks)]
+    return stitch_texts([s.text for s in segments], overlapped), segments
@@ -0,0 +1,153 @@
+"""Fast-path intent handling: one structured-output LLM call instead of the multi-agent loop.
+
+The classifier returns a FastIntentDecision (create a todo, otherwise send the transcript
+by email). Confident decisions are executed directly with the same adapters the
+OfficeAutomation agent uses; anything else is left to the IntentOrchestrator.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+import html
+import json
+import logging
+import os
+import threading
+
+from pydantic import ValidationError
+
+from models.agents import FastIntentDecision, SendEmailArgs
+
+logger = logging.getLogger("fast_intent")
+
+# Decisions below this confidence are escalated to the IntentOrchestrator
+FAST_INTENT_MIN_CONFIDENCE = float(os.getenv("FAST_INTENT_MIN_CONFIDENCE", "0.8"))
+FAST_INTENT_MODEL = os.getenv("FAST_INTENT_MODEL") or None
+
+# Static, so the provider's prompt cache covers it; only the user message varies per recording
+SYSTEM_PROMPT = "\n".join([
+    "You classify the intent of a voice note transcript. Answer with one JSON object:",
+    '{"intent": "create_todo" | "send_email", "confidence": number 0..1,',
+    ' "task": {"title": string, "due_date": string|null, "reminder": string|null, "notes": string|null} | null}',
+    "Rules:",
+    "- Only the first two sentences can carry an intent; the rest is a note.",
+    "- create_todo only when the user explicitly asks for a todo, task or follow up; otherwise send_email.",
+    "- Do not infer any intent that is not explicitly stated.",
+    "- For create_todo fill task: title summarizes the intent, notes holds the full transcript.",
+    "- Dates are ISO 8601 date time strings with offset (e.g. 2025-08-16T06:00:00+02:00);"
+    " without a time use 06:00:00; resolve relative dates against the current office time given.",
+    "- For send_email set task to null.",
+    "- confidence is your probability that intent and dates are exactly right.",
+])
+
+
+def _office_timezone():
+    tz_name = os.getenv("OFFICE_TIMEZONE")
+    if tz_name:
+        try:
+            from zoneinfo import ZoneInfo
+
+            return ZoneInfo(tz_name)
+        except Exception:
+            pass
+    try:
+        import tzlocal
+
+        return tzlocal.get_localzone()
+    except Exception:
+        from datetime import timezone
+
+        return timezone.utc
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _chat_client():
+    """OpenAI SDK client behind the shared chat LLM (created once per process)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from services.llm_factory import create_chat_llm
+                from services.llm_usage import instrument_chat_client
+
+                _client = instrument_chat_client(create_chat_llm(), name="FastIntent")
+    return _client
+
+
+def classify(transcript: str, correlation_id: Optional[str] = None) -> Optional[FastIntentDecision]:
+    """One JSON-mode completion; returns None when the answer does not validate."""
+    llm = _chat_client()
+    now = datetime.now(_office_timezone()).isoformat(timespec="seconds")
+    user = json.dumps(
+        # correlation_id lets llm_usage attribute the tokens to the recording
+        {"correlation_id": correlation_id, "office_time": now, "transcript": transcript},
+        ensure_ascii=False,
+    )
+    from services.rate_limiter import get_openai_rate_limiter
+
+    get_openai_rate_limiter().acquire()
+    response = llm.client.chat.completions.create(
+        model=FAST_INTENT_MODEL or getattr(llm, "model", None) or getattr(llm, "azure_deployment", None),
+        messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user}],
+        response_format={"type": "json_object"},
+        temperature=0,
+    )
+    content = response.choices[0].message.content or ""
+    try:
+        decision = FastIntentDecision.model_validate_json(content)
+    except ValidationError as e:
+        logger.info("Fast intent answer for %s did not validate: %s", correlation_id, e)
+        return None
+    if decision.intent == "create_todo" and decision.task is None:
+        return None
+    return decision
+
+
+def _send_email(args: SendEmailArgs) -> None:
+    from services.outlook import OutlookService
+
+    recipient = os.getenv("SEND_MAIL_RECIPIENT")
+    if not recipient:
+        raise ValueError("SEND_MAIL_RECIPIENT is not configured")
+    body_html = f"<html><body><p>{html.escape(args.body)}</p></body></html>"
+    OutlookService().send_email(to=recipient, subject=args.subject, body_html=body_html, save_to_sent=True)
+
+
+def handle(transcript: str, file_name: str, correlation_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Classify and execute. Returns {'handled': bool, 'intent': str|None, 'confidence': float|None,
+    'reason': str|None}; handled=False means the caller should escalate to the orchestrator.
+    """
+    try:
+        decision = classify(transcript, correlation_id)
+    except Exception as e:
+        logger.warning("Fast intent classification failed for %s: %s", correlation_id, e)
+        return {"handled": False, "intent": None, "confidence": None, "reason": "error"}
+    if decision is None:
+        return {"handled": False, "intent": None, "confidence": None, "reason": "invalid"}
+    result = {"handled": False, "intent": decision.intent, "confidence": decision.confidence, "reason": None}
+    if decision.confidence < FAST_INTENT_MIN_CONFIDENCE:
+        result["reason"] = "low_confidence"
+        return result
+    try:
+        if decision.intent == "create_todo":
+            from services import task_webhook
+
+            task = decision.task
+            if task is None:  # classify() rejects this; keep the escalation path explicit
+                result["reason"] = "invalid"
+                return result
+            task_webhook.create_task(title=task.title, due=task.due_date, reminder=task.reminder)
+        else:
+            # Same contract as the OfficeAutomation agent: subject is the file name, body the transcript
+            _send_email(SendEmailArgs(subject=os.path.splitext(file_name)[0], body=transcript))
+    except Exception as e:
+        logger.warning("Fast intent %s failed for %s; escalating: %s", decision.intent, correlation_id, e)
+        result["reason"] = "execution_failed"
+        return result
+    result["handled"] = True
+    return result
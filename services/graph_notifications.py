@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+import logging
+import secrets
+import threading
+
+from .graph_session import GraphSession, get_graph_session
+
+logger = logging.getLogger("graph_notifications")
+
+NOTIFICATION_ROUTE = "/graph/notifications"
+# driveItem subscriptions may live up to ~29 days; renew well before expiry
+DEFAULT_LIFETIME_MINUTES = 3 * 24 * 60
+SCOPES = ["Files.ReadWrite"]
+
+
+class DriveChangeNotifications:
+    """
+    Microsoft Graph change notifications for the signed-in user's drive.
+
+    Serves the webhook (validation handshake + notifications) on `port`, creates a subscription
+    for `/me/drive/root` pointing at `notification_url` (public HTTPS URL that forwards to the
+    webhook route) and renews it at half its lifetime. Every accepted notification calls
+    `on_change()`; OneDrive notifications carry no item details, so the receiver simply polls.
+    """
+
+    def __init__(
+        self,
+        notification_url: str,
+        port: int,
+        on_change: Callable[[], None],
+        lifetime_minutes: int = DEFAULT_LIFETIME_MINUTES,
+        session: Optional[GraphSession] = None,
+    ):
+        self.notification_url = notification_url
+        self.port = port
+        self.on_change = on_change
+        self.lifetime_minutes = lifetime_minutes
+        self.session = session or get_graph_session()
+        self.graph_root = self.session.base_url.rsplit("/me", 1)[0]
+        self.client_state = secrets.token_urlsafe(24)
+        self.subscription_id: Optional[str] = None
+        self._stop = threading.Event()
+        self._server = None
+
+    # ---- webhook ----
+    def _build_app(self):
+        from flask import Flask, request
+
+        app = Flask("graph_notifications")
+
+        @app.route(NOTIFICATION_ROUTE, methods=["POST"])
+        def notifications():
+            token = request.args.get("validationToken")
+            if token:
+                # Subscription validation: echo the token as plain text within 10 seconds
+                return token, 200, {"Content-Type": "text/plain"}
+            body = request.get_json(silent=True) or {}
+            accepted = [n for n in body.get("value", []) if n.get("clientState") == self.client_state]
+            if accepted:
+                logger.info("Received %d drive change notification(s)", len(accepted))
+                self.on_change()
+            elif body.get("value"):
+                logger.warning("Ignoring drive change notification with unknown clientState")
+            return "", 202
+
+        return app
+
+    def start(self) -> None:
+        from werkzeug.serving import make_server
+
+        self._server = make_server("0.0.0.0", self.port, self._build_app(), threaded=True)
+        threading.Thread(target=self._server.serve_forever, name="graph-webhook", daemon=True).start()
+        logger.info("Graph change notification webhook listening on :%d%s", self.port, NOTIFICATION_ROUTE)
+        self._subscribe()
+        threading.Thread(target=self._renew_loop, name="graph-subscription", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.subscription_id:
+            try:
+                self.session.http.delete(
+                    f"{self.graph_root}/subscriptions/{self.subscription_id}", headers=self.session.headers(SCOPES)
+                )
+            except Exception:
+                logger.warning("Failed to delete Graph subscription %s", self.subscription_id)
+        if self._server is not None:
+            self._server.shutdown()
+
+    # ---- subscription lifecycle ----
+    def _expiration(self) -> str:
+        expires = datetime.now(timezone.utc) + timedelta(minutes=self.lifetime_minutes)
+        return expires.isoformat().replace("+00:00", "Z")
+
+    def _subscribe(self) -> None:
+        resp = self.session.http.post(
+            f"{self.graph_root}/subscriptions",
+            json={
+                "changeType": "updated",
+                "notificationUrl": self.notification_url,
+                "resource": "/me/drive/root",
+                "expirationDateTime": self._expiration(),
+                "clientState": self.client_state,
+            },
+            headers=self.session.headers(SCOPES, json=True),
+        )
+        resp.raise_for_status()
+        self.subscription_id = resp.json().get("id")
+        logger.info("Created Graph drive subscription %s", self.subscription_id)
+
+    def _renew(self) -> None:
+        resp = self.session.http.patch(
+            f"{self.graph_root}/subscriptions/{self.subscription_id}",
+            json={"expirationDateTime": self._expiration()},
+            headers=self.session.headers(SCOPES, json=True),
+        )
+        if resp.status_code == 404:
+            # Subscription expired or was removed by Graph; start over
+            self._subscribe()
+            return
+        resp.raise_for_status()
+        logger.info("Renewed Graph drive subscription %s", self.subscription_id)
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.lifetime_minutes * 60 / 2):
+            try:
+                self._renew()
+            except Exception:
+                logger.exception("Failed to renew Graph drive subscription; retrying in 5 minutes")
+                if self._stop.wait(300):
+                    return
+                try:
+                    self._subscribe()
+                except Exception:
+                    logger.exception("Failed to recreate Graph drive subscription")
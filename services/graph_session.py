@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from .http_client import HttpClient
+from .token_state_store import TokenStateStore
+
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0/me"
+TOKEN_STATE_KEY = "global_ms_graph_token_cache"  # store the MSAL cache, not a custom dict
+# Refresh the in-memory access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("MS_GRAPH_TOKEN_REFRESH_MARGIN", "300"))
+
+
+class GraphSession:
+    """
+    Long-lived Microsoft Graph session shared by OneDrive/Outlook adapters (TR001).
+
+    - one keep-alive HTTP connection pool (HTTP/2 when the h2 package is installed)
+    - MSAL token cache loaded once from the token state store
+    - access tokens held in memory per scope set until close to expiry
+    - MSAL cache written back only when MSAL reports a change
+    """
+
+    def __init__(self, http: Optional[HttpClient] = None):
+        self.http = http or HttpClient(http2=True)
+        self.base_url = GRAPH_BASE_URL
+        self.state = TokenStateStore()
+        self.logger = logging.getLogger("graph_session")
+        self.client_id = os.getenv("MS_GRAPH_CLIENT_ID")
+        self.client_secret = os.getenv("MS_GRAPH_CLIENT_SECRET")
+        self.authority = os.getenv("MS_GRAPH_AUTHORITY", "https://login.microsoftonline.com/consumers")
+        self._lock = threading.RLock()
+        self._tokens: Dict[Tuple[str, ...], Tuple[str, float]] = {}
+
+        import msal  # imported here so modules that only reference the session start fast
+
+        self.cache = msal.SerializableTokenCache()
+        self._load_cache()
+        self.app = msal.ConfidentialClientApplication(
+            self.client_id,
+            authority=self.authority,
+            client_credential=self.client_secret,
+            token_cache=self.cache,
+        )
+
+    def _load_cache(self) -> bool:
+        raw = self.state.get(TOKEN_STATE_KEY)
+        if raw:
+            try:
+                self.cache.deserialize(raw)
+                return True
+            except Exception:
+                self.logger.warning("Failed to deserialize token cache; starting fresh.")
+        return False
+
+    def has_cached_account(self) -> bool:
+        return bool(self.app.get_accounts())
+
+    # ---- First-time bootstrap (run once after user consents) ----
+    def get_authorization_url(self, scopes: List[str], redirect_uri: str) -> str:
+        return self.app.get_authorization_request_url(scopes, redirect_uri=redirect_uri)
+
+    def redeem_auth_code(self, code: str, scopes: List[str], redirect_uri: str):
+        with self._lock:
+            result = self.app.acquire_token_by_authorization_code(
+                code, scopes=scopes, redirect_uri=redirect_uri
+            )
+            self._ensure_ok(result)
+            self._persist_cache()
+
+    # ---- Normal operation / refresh-on-demand ----
+    def access_token(self, scopes: List[str]) -> str:
+        """Return a valid access token for scopes, hitting MSAL only near expiry."""
+        key = tuple(sorted(scopes))
+        cached = self._tokens.get(key)
+        if cached and cached[1] - TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+            return cached[0]
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and cached[1] - TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+                return cached[0]
+            result = self._acquire_silent(scopes)
+            if not result and self._load_cache():
+                # Cache may have been re-seeded by the authenticator since we loaded it
+                result = self._acquire_silent(scopes)
+            if not result:
+                raise RuntimeError(
+                    "No cached delegated token. Run interactive consent (auth code) once to bootstrap."
+                )
+            self._ensure_ok(result)
+            self._persist_cache()
+            token = result["access_token"]
+            self._tokens[key] = (token, time.time() + int(result.get("expires_in", 0)))
+            return token
+
+    def headers(self, scopes: List[str], json: bool = False) -> Dict[str, str]:
+        headers = {"Authorization": f"Bearer {self.access_token(scopes)}"}
+        if json:
+            headers["Content-Type"] = "application/json"
+        return headers
+
+    def _acquire_silent(self, scopes: List[str]) -> Optional[Dict[str, Any]]:
+        accounts = self.app.get_accounts()
+        return self.app.acquire_token_silent(scopes, account=accounts[0] if accounts else None)
+
+    def _persist_cache(self):
+        if self.cache.has_state_changed:
+            self.state.set(TOKEN_STATE_KEY, self.cache.serialize())
+
+    def _ensure_ok(self, result):
+        if not result or "access_token" not in result:
+            raise RuntimeError(f"MSAL token failure: {(result or {}).get('error_description', result)}")
+
+
+_session: Optional[GraphSession] = None
+_session_lock = threading.Lock()
+
+
+def get_graph_session() -> GraphSession:
+    """Return the process-wide GraphSession, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = GraphSession()
+    return _session
@@ -1,13 +1,76 @@
 from __future__ import annotations
 
+import hashlib
 import os
 from typing import Any, Dict, Optional
 import httpx
 
 
+def _sha256_of(path: str, chunk_size: int = 1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_etag(path: str, etag: Optional[str]) -> None:
+    # Weak ETags (W/"...") are not valid in If-Range; without a strong one a resume restarts
+    if etag and not etag.startswith("W/"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(etag)
+    else:
+        _remove(path)
+
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _content_range_start(value: Optional[str]) -> Optional[int]:
+    """First byte of 'bytes <start>-<end>/<total>', or None."""
+    try:
+        return int((value or "").split(" ", 1)[1].split("-", 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _content_range_total(value: Optional[str]) -> Optional[int]:
+    """Total length of 'bytes */<total>' (or 'bytes <start>-<end>/<total>'), or None."""
+    try:
+        return int((value or "").rsplit("/", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
 class HttpClient:
-    def __init__(self, timeout: float = 30.0):
-        self._client = httpx.Client(timeout=timeout)
+    def __init__(self, timeout: float = 30.0, http2: bool = False, max_connections: int = 20):
+        # http2 is only enabled when the optional h2 package is installed
+        self._client = httpx.Client(
+            timeout=timeout,
+            http2=http2 and _h2_available(),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
 
     def get(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
         return self._client.get(url, headers=headers, params=params)
@@ -20,13 +83,77 @@ class HttpClient:
         else:
             return self._client.post(url, headers=headers)
 
-    def download(self, url: str, dest_path: str, headers: Optional[Dict[str, str]] = None) -> None:
-        with self._client.stream("GET", url, headers=headers) as r:
-            r.raise_for_status()
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            with open(dest_path, "wb") as f:
-                for chunk in r.iter_bytes():
-                    f.write(chunk)
+    def download(
+        self,
+        url: str,
+        dest_path: str,
+        headers: Optional[Dict[str, str]] = None,
+        chunk_size: int = 1024 * 1024,
+        max_attempts: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Stream url to dest_path and return {'path', 'sha256', 'bytes'}.
+
+        Data is written in chunk_size blocks to '<dest_path>.part' and hashed on the fly; the part
+        file is renamed into place only once complete, so readers never see a truncated file.
+        Interrupted transfers resume with an HTTP Range request (also across calls, as long as
+        the part file is still there). The resume is conditional on the ETag stored next to the
+        part file ('<dest_path>.part.etag', sent as If-Range): if the content changed, or there
+        is no strong ETag to check against, the server sends the full body and the download
+        restarts from zero.
+        """
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        part_path = dest_path + ".part"
+        etag_path = part_path + ".etag"
+        attempt = 0
+        while True:
+            attempt += 1
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            etag = _read_text(etag_path) if offset else None
+            req_headers = dict(headers or {})
+            if offset and etag:
+                req_headers["Range"] = f"bytes={offset}-"
+                req_headers["If-Range"] = etag
+            try:
+                with self._client.stream("GET", url, headers=req_headers, follow_redirects=True) as r:
+                    if r.status_code == 416 and "Range" in req_headers:
+                        if _content_range_total(r.headers.get("content-range")) != offset:
+                            # Part file does not match the current content; start over
+                            _remove(part_path, etag_path)
+                            if attempt >= max_attempts:
+                                r.raise_for_status()
+                            continue
+                        # Part file already holds the whole content
+                        digest = _sha256_of(part_path)
+                    else:
+                        r.raise_for_status()
+                        resumed = (
+                            "Range" in req_headers
+                            and r.status_code == 206
+                            and _content_range_start(r.headers.get("content-range")) == offset
+                        )
+                        if r.status_code == 206 and not resumed:
+                            # A range we did not ask for; start over without one
+                            _remove(part_path, etag_path)
+                            if attempt >= max_attempts:
+                                raise httpx.HTTPStatusError("Unexpected partial content", request=r.request, response=r)
+                            continue
+                        if resumed:
+                            digest = _sha256_of(part_path)
+                        else:
+                            digest = hashlib.sha256()
+                            _write_etag(etag_path, r.headers.get("etag"))
+                        with open(part_path, "ab" if resumed else "wb", buffering=chunk_size) as f:
+                            for chunk in r.iter_bytes(chunk_size):
+                                f.write(chunk)
+                                digest.update(chunk)
+                size = os.path.getsize(part_path)
+                os.replace(part_path, dest_path)
+                _remove(etag_path)
+                return {"path": dest_path, "sha256": digest.hexdigest(), "bytes": size}
+            except httpx.TransportError:
+                if attempt >= max_attempts:
+                    raise
 
     def patch(self, url: str, json: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
         return self._client.patch(url, json=json, headers=headers)
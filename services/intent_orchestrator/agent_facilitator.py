@@ -32,6 +32,9 @@ def retrieve_transcription(transcription_path: str) -> str:
     - If 'transcription_path' is set, attempts to load JSON and read the 'text' field
       (or treat file contents as a raw string if not JSON).
     - Otherwise returns 'transcription_text' if provided.
+    - A streamed transcript that is not complete yet ('partial') or whose remainder failed
+      ('error') is returned with a leading [Transcript incomplete: ...] notice instead of
+      passing the leading segment off as the whole transcript.
     - Returns empty string if nothing is available.
     """
     if transcription_path:
@@ -44,6 +47,13 @@ def retrieve_transcription(transcription_path: str) -> str:
                     f.seek(0)
                     return f.read()
             if isinstance(data, dict) and "text" in data:
+                if data.get("error"):
+                    return f"[Transcript incomplete: {data['error']}; only the beginning is available]\n{data['text']}"
+                if data.get("partial"):
+                    return (
+                        "[Transcript incomplete: still being transcribed; only the beginning is available."
+                        " Read it again before using the full text]\n" + data["text"]
+                    )
                 return data["text"]
             if isinstance(data, str):
                 return data
@@ -125,6 +135,7 @@ async def main():
                 instructions=[
                     "Essential services and tools that have highest priority:",
                     "Use tool read_transcription to access, check or retrieve voice transcription. Take the path to transcription file from mission briefing or task instructions.\n",
+                    "If read_transcription starts with [Transcript incomplete: ...], pass that notice on; when it says the transcript is still being transcribed, read it again before the full text is used.\n",
                     "Auxiliary services and tools to be used when one of the essential services already has been utilized:"
                     "Add timezone and timezone offset information to the process when dates are handled e.g. due dates, reminders.\n",
                     "Available tools and arguments:",
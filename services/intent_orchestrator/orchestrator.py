@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dapr_agents import LLMOrchestrator
 from services.llm_factory import create_chat_llm
+from services.llm_usage import instrument_chat_client
 import os
 import logging
 import asyncio
@@ -20,6 +21,20 @@ root.setLevel(getattr(logging, level, logging.INFO))
 # Suppress werkzeug INFO logs
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
+# Static planning instructions, sent as the first system message of every LLM call so the
+# provider's prompt cache can reuse them; tasks only carry the per-file fields
+INTENT_INSTRUCTIONS = "\n".join([
+    "You plan the handling of voice recordings. Each task is a JSON object with:",
+    "- correlation_id: id of the recording's workflow",
+    "- transcription_path: path of the transcription file; preserve it exactly when passing it on",
+    "- excerpt: the beginning of the transcript",
+    "From the first two sentences of the transcript, extract the user's intent to plan steps.",
+    "Treat the rest of the transcription as a note with no further intent.",
+    "Do not infer any intent that is not explicitly stated.",
+    "Possible explicit intent: create a todo.",
+    "If no intent is found, send an email containing the full transcript.",
+])
+
 async def main():
     if os.getenv("DEBUGPY_ENABLE", "0") == "1":
         import debugpy
@@ -28,7 +43,7 @@ async def main():
         debugpy.wait_for_client()
         
     try:
-        llm = create_chat_llm()
+        llm = instrument_chat_client(create_chat_llm(), system_prefix=INTENT_INSTRUCTIONS, name="IntentOrchestrator")
         orchestrator = LLMOrchestrator(
             name="IntentOrchestrator",
             llm=llm,
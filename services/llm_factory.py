@@ -17,6 +17,15 @@ Provider selection precedence (TR005 enforced):
 If neither provider can be resolved a RuntimeError is raised early so
 agents/orchestrators fail fast with a clear message.
 
+Every client returned is tuned for this repo's agents (TR005a):
+    - one keep-alive HTTP connection pool per process shared by all chat clients
+      (LLM_MAX_CONNECTIONS), with at most LLM_MAX_CONCURRENCY requests in flight
+    - 429/5xx responses retried with full-jitter exponential backoff, honouring
+      Retry-After (LLM_MAX_RETRIES, LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS)
+    - optional response cache in the Dapr state store keyed by a hash of
+      (model, messages, tools, ...) with LLM_RESPONSE_CACHE_TTL seconds expiry (0 = off),
+      so identical planning prompts across replicas cost one LLM call
+
 Rationale: The upstream dapr-agents library's OpenAIChatClient already
 abstracts both OpenAI and Azure OpenAI via its base (OpenAIClientBase),
 so returning an OpenAIChatClient instance in both cases keeps the rest
@@ -26,12 +35,140 @@ of the code uniform and future-proofs additional options (temperature, etc.).
 from __future__ import annotations
 
 from dapr_agents import OpenAIChatClient
+import functools
+import hashlib
+import json
 import logging
 import os
-from typing import Optional
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
 
 logger = logging.getLogger("llm_factory")
 
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", "0"))
+LLM_CACHE_PREFIX = "llm_cache:"
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_http: Optional[httpx.Client] = None
+_http_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(max(1, LLM_MAX_CONCURRENCY))
+
+
+def get_llm_http_client() -> httpx.Client:
+    """Process-wide keep-alive connection pool for all LLM clients."""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                _http = httpx.Client(
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS
+                    ),
+                )
+    return _http
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    """Hash of everything that determines the completion (model, messages, tools, sampling...)."""
+    payload = json.dumps(request, sort_keys=True, default=str, ensure_ascii=False)
+    return LLM_CACHE_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Retry-After when the server sent one, else full jitter over an exponential cap."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(LLM_RETRY_MAX_SECONDS, float(retry_after)) + random.uniform(0, LLM_RETRY_BASE_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def _call_with_retry(create, *args, **kwargs):
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            with _semaphore:
+                return create(*args, **kwargs)
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status not in _RETRY_STATUS or attempt >= LLM_MAX_RETRIES:
+                raise
+            delay = _retry_delay(attempt, e)
+            logger.warning("LLM request failed with %s; retry %d/%d in %.1fs", status, attempt + 1, LLM_MAX_RETRIES, delay)
+            time.sleep(delay)
+
+
+def _cache_get(key: str, response_type):
+    try:
+        from services.state_store import StateStore
+
+        raw = StateStore().get(key)
+        if raw:
+            response = response_type.model_validate_json(raw)
+            # Lets usage accounting tell replayed responses from real spend
+            setattr(response, "cache_hit", True)
+            return response
+    except Exception as e:
+        logger.warning("LLM response cache lookup failed: %s", e)
+    return None
+
+
+def _cache_put(key: str, response) -> None:
+    try:
+        from services.state_store import StateStore
+
+        StateStore().set(key, response.model_dump_json(), ttl_seconds=LLM_RESPONSE_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Failed to store LLM response in cache: %s", e)
+
+
+def _tune(client: OpenAIChatClient) -> OpenAIChatClient:
+    """Move the client onto the shared pool (SDK retries off, ours apply) and wrap chat completions."""
+    sdk = getattr(client, "client", None)
+    if sdk is None or not hasattr(sdk, "with_options"):
+        logger.warning("Chat client exposes no OpenAI SDK client; using its default HTTP settings")
+        return client
+    try:
+        client._client = sdk.with_options(http_client=get_llm_http_client(), max_retries=0)
+        sdk = client.client
+    except Exception as e:  # pragma: no cover - depends on dapr-agents internals
+        logger.warning("Could not attach shared LLM connection pool: %s", e)
+    completions = sdk.chat.completions
+    create = completions.create
+
+    @functools.wraps(create)
+    def _create(*args, **kwargs):
+        key = None
+        if LLM_RESPONSE_CACHE_TTL > 0 and not kwargs.get("stream") and not args:
+            key = cache_key(kwargs)
+            from openai.types.chat import ChatCompletion
+
+            cached = _cache_get(key, ChatCompletion)
+            if cached is not None:
+                logger.info("LLM response cache hit (%s)", key[len(LLM_CACHE_PREFIX):][:12])
+                return cached
+        response = _call_with_retry(create, *args, **kwargs)
+        if key is not None:
+            _cache_put(key, response)
+        return response
+
+    # Instance attribute shadows the SDK's overloaded method for this client only
+    setattr(completions, "create", _create)
+    return client
+
 
 def _all_present(*values: Optional[str]) -> bool:
     return all(v is not None and v.strip() != "" for v in values)
@@ -50,13 +187,13 @@ def create_chat_llm() -> OpenAIChatClient:  # noqa: D401
     azure_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
     if _all_present(azure_api_key, azure_endpoint, azure_deployment, azure_api_version):
         try:
-            client = OpenAIChatClient(
+            client = _tune(OpenAIChatClient(
                 # For Azure we supply azure_* fields; model left None so validator defaults to deployment
                 api_key=azure_api_key,
                 azure_endpoint=azure_endpoint,
                 azure_deployment=azure_deployment,
                 api_version=azure_api_version,
-            )
+            ))
             logger.info(
                 "LLM provider selected: azure (deployment=%s, endpoint=%s, api_version=%s)",
                 azure_deployment,
@@ -91,7 +228,7 @@ def create_chat_llm() -> OpenAIChatClient:  # noqa: D401
     if openai_api_key:
         model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         try:
-            client = OpenAIChatClient(model=model, api_key=openai_api_key)
+            client = _tune(OpenAIChatClient(model=model, api_key=openai_api_key))
             logger.info("LLM provider selected: openai (model=%s)", model)
             return client
         except Exception as e:  # pragma: no cover - defensive
@@ -104,4 +241,4 @@ def create_chat_llm() -> OpenAIChatClient:  # noqa: D401
     )
 
 
-__all__ = ["create_chat_llm"]
+__all__ = ["create_chat_llm", "get_llm_http_client"]
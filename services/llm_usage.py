@@ -0,0 +1,133 @@
+"""Stable system-prompt prefix and per-workflow token usage for chat clients.
+
+Provider-side prompt caching (OpenAI / Azure OpenAI) reuses the longest identical
+prefix of a request, so static instructions are sent as the very first system
+message of every chat completion, ahead of anything that varies per request.
+Token usage (prompt, cached prompt, completion) is summed per workflow instance,
+identified by the `correlation_id` field of the compact task payload.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import functools
+import logging
+import re
+import threading
+
+logger = logging.getLogger("llm_usage")
+
+_CORRELATION_ID = re.compile(r'"correlation_id"\s*:\s*"([^"]+)"')
+
+
+class UsageCounters:
+    """Token totals per workflow instance; the oldest instances are dropped beyond max_instances."""
+
+    def __init__(self, max_instances: int = 1000):
+        self.max_instances = max_instances
+        self._lock = threading.Lock()
+        self._by_instance: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def add(self, instance_id: str, prompt: int, cached: int, completion: int) -> Dict[str, int]:
+        with self._lock:
+            totals = self._by_instance.pop(instance_id, None) or {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+            }
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt
+            totals["cached_tokens"] += cached
+            totals["completion_tokens"] += completion
+            self._by_instance[instance_id] = totals
+            while len(self._by_instance) > self.max_instances:
+                self._by_instance.popitem(last=False)
+            return dict(totals)
+
+    def snapshot(self, instance_id: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            totals = self._by_instance.get(instance_id)
+            return dict(totals) if totals else None
+
+
+counters = UsageCounters()
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _role_and_content(message: Any):
+    if isinstance(message, dict):
+        return message.get("role"), message.get("content")
+    return getattr(message, "role", None), getattr(message, "content", None)
+
+
+def find_correlation_id(messages: List[Any]) -> Optional[str]:
+    """Workflow instance the request belongs to; the latest task payload in the conversation wins."""
+    for message in reversed(messages or []):
+        match = _CORRELATION_ID.search(_text(_role_and_content(message)[1]))
+        if match:
+            return match.group(1)
+    return None
+
+
+def with_system_prefix(messages: List[Any], prefix: str) -> List[Any]:
+    """Put `prefix` first as its own system message (once), keeping the caller's messages after it."""
+    if messages:
+        role, content = _role_and_content(messages[0])
+        if role == "system" and content == prefix:
+            return messages
+    return [{"role": "system", "content": prefix}, *(messages or [])]
+
+
+def _record_usage(response: Any, messages: List[Any], name: str) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    if getattr(response, "cache_hit", False):
+        # Answered from the llm_factory response cache; no tokens were spent
+        logger.info("%s response for %s served from cache", name, find_correlation_id(messages) or "unknown")
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = int(getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    completion = int(getattr(usage, "completion_tokens", 0) or 0)
+    instance_id = find_correlation_id(messages) or "unknown"
+    totals = counters.add(instance_id, prompt, cached, completion)
+    logger.info(
+        "%s tokens for %s: prompt=%d (cached %d) completion=%d; instance totals %s",
+        name, instance_id, prompt, cached, completion, totals,
+    )
+
+
+def instrument_chat_client(llm: Any, system_prefix: Optional[str] = None, name: str = "llm") -> Any:
+    """
+    Wrap the OpenAI SDK client behind a dapr-agents chat client: prepend `system_prefix`
+    to every chat completion and record token usage per workflow instance.
+    Returns `llm` unchanged (with a warning) when it exposes no OpenAI client.
+    """
+    sdk = getattr(llm, "client", None)
+    completions = getattr(getattr(sdk, "chat", None), "completions", None)
+    if completions is None or not hasattr(completions, "create"):
+        logger.warning("%s: chat client has no OpenAI completions API; prompt prefix and usage disabled", name)
+        return llm
+    create = completions.create
+
+    @functools.wraps(create)
+    def _create(*args, **kwargs):
+        messages = kwargs.get("messages") or []
+        if system_prefix:
+            messages = kwargs["messages"] = with_system_prefix(messages, system_prefix)
+        response = create(*args, **kwargs)
+        try:
+            _record_usage(response, messages, name)
+        except Exception as e:  # usage accounting must never fail the completion
+            logger.debug("Failed to record token usage: %s", e)
+        return response
+
+    completions.create = _create
+    return llm
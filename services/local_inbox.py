@@ -1,8 +1,15 @@
+import errno
+import logging
 import os
 import shutil
-from typing import List
+from typing import List, Optional
 from models.voice2action import FileRef
 
+logger = logging.getLogger("local_inbox")
+
+# Linux FICLONE ioctl: copy-on-write clone of a whole file (btrfs, XFS with reflink, bcachefs)
+_FICLONE = 0x40049409
+
 def list_local_inbox(folder: str) -> List[FileRef]:
     os.makedirs(folder, exist_ok=True)
     files = []
@@ -12,10 +19,64 @@ def list_local_inbox(folder: str) -> List[FileRef]:
             files.append(FileRef(id=name, name=name))
     return files
 
-def move_file_to_local_archive(file_name: str, inbox_folder: str, archive_folder: str):
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def link_or_copy(src: str, dst: str, mode: str = "link") -> str:
+    """
+    Place src at dst without copying data where possible and return how it was done:
+    'hardlink' (same inode), 'reflink' (copy-on-write clone) or 'copy' (cross-device or mode='copy').
+    An existing dst is replaced.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == "link":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            # EXDEV: other filesystem; EPERM/EMLINK/ENOTSUP: no (more) hard links allowed here
+            logger.debug("Hard link %s -> %s failed (%s); trying reflink", src, dst, e)
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def move_file_to_local_archive(
+    file_name: str, inbox_folder: str, archive_folder: str, work_path: Optional[str] = None
+) -> str:
+    """
+    Move the inbox file to the archive. When work_path is a hard link of the inbox file, that
+    link is renamed into the archive (no data written even across inbox/archive devices as long
+    as the work folder shares the archive's filesystem) and the inbox entry is just unlinked.
+    Returns the archive path.
+    """
     os.makedirs(archive_folder, exist_ok=True)
     src = os.path.join(inbox_folder, file_name)
     dst = os.path.join(archive_folder, file_name)
     if os.path.exists(dst):
         os.remove(dst)
+    if work_path and os.path.exists(work_path) and os.path.exists(src) and os.path.samefile(work_path, src):
+        try:
+            os.rename(work_path, dst)
+            os.remove(src)
+            return dst
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
     shutil.move(src, dst)
+    return dst
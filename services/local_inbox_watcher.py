@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("local_inbox_watcher")
+
+AUDIO_EXTS = (".wav", ".mp3")
+
+
+def _is_audio(name: str) -> bool:
+    return name.lower().endswith(AUDIO_EXTS)
+
+
+class LocalInboxWatcher:
+    """
+    Watch a local inbox folder and report audio files once they are completely written.
+
+    Uses inotify (via the optional watchdog package) to learn about new files immediately and
+    falls back to periodic directory scans when watchdog is not installed. A file is reported once
+    its size and mtime have not changed for `settle_seconds`, so partially copied recordings are
+    not picked up. Ready files found in the same tick are reported together in one callback.
+    With watchdog running the folder is still rescanned every `rescan_interval`: a file that is
+    still in the inbox `retry_seconds` after it was reported (its hand-off or workflow failed) is
+    reported again; the inbox pending/downloaded markers keep in-flight files from running twice.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        on_files: Callable[[List[str]], None],
+        settle_seconds: float = 1.0,
+        scan_interval: float = 2.0,
+        tick_seconds: float = 0.2,
+        rescan_interval: float = 30.0,
+        retry_seconds: float = 300.0,
+    ):
+        self.folder = folder
+        self.on_files = on_files
+        self.settle_seconds = settle_seconds
+        self.scan_interval = scan_interval
+        self.tick_seconds = tick_seconds
+        self.rescan_interval = rescan_interval
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        # name -> (size, mtime_ns, monotonic time of last observed change)
+        self._candidates: Dict[str, Tuple[int, int, float]] = {}
+        # name -> monotonic time it was reported
+        self._reported: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- lifecycle ----
+    def start(self) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        self._observer = self._start_observer()
+        if self._observer is None:
+            logger.info("watchdog not available; polling %s every %.1fs", self.folder, self.scan_interval)
+        self._scan()  # pick up files that arrived while we were down
+        self._thread = threading.Thread(target=self._run, name="local-inbox-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                # watchdog reports bytes paths when the folder was given as bytes
+                if event.event_type in ("deleted", "moved"):
+                    watcher._forget(os.path.basename(os.fsdecode(event.src_path)))
+                if event.event_type == "deleted":
+                    return
+                path = getattr(event, "dest_path", None) or event.src_path
+                watcher._touch(os.path.basename(os.fsdecode(path)))
+
+        observer = Observer()
+        observer.schedule(_Handler(), self.folder, recursive=False)
+        observer.start()
+        logger.info("Watching %s for new recordings (inotify)", self.folder)
+        return observer
+
+    # ---- change tracking ----
+    def _touch(self, name: str) -> None:
+        if not _is_audio(name):
+            return
+        with self._lock:
+            if name in self._reported:
+                return
+            # Reset the settle timer; the size check in _tick confirms stability
+            self._candidates[name] = (-1, -1, time.monotonic())
+
+    def _forget(self, name: str) -> None:
+        with self._lock:
+            self._reported.pop(name, None)
+            self._candidates.pop(name, None)
+
+    def _scan(self) -> None:
+        try:
+            names = [e.name for e in os.scandir(self.folder) if e.is_file() and _is_audio(e.name)]
+        except FileNotFoundError:
+            names = []
+        present = set(names)
+        now = time.monotonic()
+        with self._lock:
+            # Forget reported files that left the inbox (archived) so a re-upload is seen again,
+            # and those still there long after they were reported so they are retried
+            for name, reported_at in list(self._reported.items()):
+                if name not in present:
+                    del self._reported[name]
+                elif self.retry_seconds > 0 and now - reported_at >= self.retry_seconds:
+                    logger.info(
+                        "%s still in the inbox %.0fs after hand-off; reporting it again", name, now - reported_at
+                    )
+                    del self._reported[name]
+        for name in names:
+            with self._lock:
+                known = name in self._candidates or name in self._reported
+            if not known:
+                self._touch(name)
+
+    def _tick(self) -> List[str]:
+        now = time.monotonic()
+        ready: List[str] = []
+        with self._lock:
+            for name, (size, mtime, changed_at) in list(self._candidates.items()):
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    del self._candidates[name]
+                    continue
+                if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                    self._candidates[name] = (st.st_size, st.st_mtime_ns, now)
+                elif now - changed_at >= self.settle_seconds:
+                    del self._candidates[name]
+                    self._reported[name] = now
+                    ready.append(name)
+        return sorted(ready)
+
+    def _run(self) -> None:
+        last_scan = time.monotonic()
+        while not self._stop.wait(self.tick_seconds):
+            interval = self.scan_interval if self._observer is None else self.rescan_interval
+            if time.monotonic() - last_scan >= interval:
+                self._scan()
+                last_scan = time.monotonic()
+            ready = self._tick()
+            if not ready:
+                continue
+            try:
+                self.on_files(ready)
+            except Exception:
+                logger.exception("Failed to hand off ready files %s; will retry", ready)
+                with self._lock:
+                    for name in ready:
+                        self._reported.pop(name, None)
+                        self._candidates[name] = (-1, -1, time.monotonic())
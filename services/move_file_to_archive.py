@@ -1 +0,0 @@
-def move_file_to_archive(file_id: str, file_name: Optional[str] = None, inbox_folder: Optional[str] = None, archive_folder: Optional[str] = None):
@@ -1,165 +1,292 @@
 from __future__ import annotations
 
 from .http_client import HttpClient
-from .token_state_store import TokenStateStore
+from .graph_session import GraphSession, TOKEN_STATE_KEY, get_graph_session
 from models.voice2action import FileRef
 
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import httpx
+
+# Graph $batch accepts at most 20 requests per call
+GRAPH_BATCH_LIMIT = 20
+REPLACE_ON_CONFLICT = "@microsoft.graph.conflictBehavior=replace"
+
 
 def move_file_to_archive(file_id: str, file_name: Optional[str] = None, inbox_folder: Optional[str] = None, archive_folder: Optional[str] = None):
     """
     Move a file to the archive folder on OneDrive using PATCH /me/drive/items/{item-id}
     with parentReference.id as per Graph documentation.
+
+    The archive folder id is cached per process and an existing file with the same name is
+    replaced via conflictBehavior=replace; if Graph still reports a conflict the existing
+    file is looked up by path, deleted, and the move retried (FR006).
     """
     service = OneDriveService()
     if not archive_folder:
         raise ValueError("archive_folder is required to move file in OneDrive.")
-    # Resolve destination folder ID from path
-    dest_meta = service.get_item_by_path(archive_folder)
-    dest_id = dest_meta.get("id")
-    if not dest_id:
-        raise RuntimeError(f"Could not resolve archive folder id for path '{archive_folder}'")
-    # If a file with the same name exists in destination, delete it first
-    if file_name:
-        try:
-            existing = service.find_child_by_name(parent_id=dest_id, name=file_name)
-            if existing and existing.get("id"):
-                del_url = f"{service.base_url}/drive/items/{existing['id']}"
-                resp_del = service.http.delete(del_url, headers=service._headers())
-                # 204 No Content expected
-                resp_del.raise_for_status()
-        except Exception as e:
-            service.logger.warning("Pre-delete existing archive file failed (continuing): %s", e)
-
-    patch_url = f"{service.base_url}/drive/items/{file_id}"
+    dest_id = service.resolve_folder_id(archive_folder)
+    resp = service.http.patch(
+        f"{service.base_url}/drive/items/{file_id}?{REPLACE_ON_CONFLICT}",
+        headers=service._headers(),
+        json=_move_body(dest_id, file_name),
+    )
+    if resp.status_code == 409 and file_name:
+        _delete_archived_by_name(service, archive_folder, file_name)
+        resp = service.http.patch(
+            f"{service.base_url}/drive/items/{file_id}",
+            headers=service._headers(),
+            json=_move_body(dest_id, file_name),
+        )
+    if resp.status_code in (400, 404):
+        # Archive folder may have been recreated; resolve it again next time
+        service.forget_folder_id(archive_folder)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def move_files_to_archive(files: List[Dict[str, Any]], archive_folder: str) -> List[Dict[str, Any]]:
+    """
+    Archive many files with Graph JSON batching (up to 20 moves per POST /$batch).
+
+    files: [{'file_id': str, 'file_name': str|None}, ...]
+    Returns [{'file_id', 'status', 'error'?}] in input order. Moves that fail with a name
+    conflict inside the batch are retried one by one through move_file_to_archive.
+    """
+    if not archive_folder:
+        raise ValueError("archive_folder is required to move files in OneDrive.")
+    service = OneDriveService()
+    dest_id = service.resolve_folder_id(archive_folder)
+    # Batch request URLs are relative to the Graph version root, e.g. /me/drive/items/{id}
+    graph_root, me_path = service.base_url.rsplit("/me", 1)[0], "/me"
+    results: List[Dict[str, Any]] = []
+    for start in range(0, len(files), GRAPH_BATCH_LIMIT):
+        group = files[start:start + GRAPH_BATCH_LIMIT]
+        requests_body = [
+            {
+                "id": str(i),
+                "method": "PATCH",
+                "url": f"{me_path}/drive/items/{f['file_id']}?{REPLACE_ON_CONFLICT}",
+                "headers": {"Content-Type": "application/json"},
+                "body": _move_body(dest_id, f.get("file_name")),
+            }
+            for i, f in enumerate(group)
+        ]
+        resp = service.http.post(
+            f"{graph_root}/$batch",
+            json={"requests": requests_body},
+            headers={**service._headers(), "Content-Type": "application/json"},
+        )
+        resp.raise_for_status()
+        by_id = {r.get("id"): r for r in resp.json().get("responses", [])}
+        for i, f in enumerate(group):
+            r = by_id.get(str(i)) or {}
+            status = int(r.get("status", 0))
+            if 200 <= status < 300:
+                results.append({"file_id": f["file_id"], "status": "archived"})
+                continue
+            try:
+                if status == 409:
+                    move_file_to_archive(f["file_id"], f.get("file_name"), archive_folder=archive_folder)
+                    results.append({"file_id": f["file_id"], "status": "archived"})
+                    continue
+                raise RuntimeError(f"Graph batch move failed with status {status}: {r.get('body')}")
+            except Exception as e:
+                service.logger.warning("Archiving id=%s failed: %s", f["file_id"], e)
+                results.append({"file_id": f["file_id"], "status": "failed", "error": str(e)})
+    return results
+
+
+def _move_body(dest_id: str, file_name: Optional[str]) -> Dict[str, Any]:
     json_body: Dict[str, Any] = {
         "parentReference": {"id": dest_id}
     }
     if file_name:
         json_body["name"] = file_name
-    resp = service.http.patch(patch_url, headers=service._headers(), json=json_body)
-    resp.raise_for_status()
-    return resp.json()
+    return json_body
+
+
+def _delete_archived_by_name(service: "OneDriveService", archive_folder: str, file_name: str) -> None:
+    """Delete an existing archive entry via direct path lookup (no listing of the archive folder)."""
+    try:
+        existing = service.get_item_by_path(f"{archive_folder.rstrip('/')}/{file_name}")
+        if existing and existing.get("id"):
+            resp_del = service.http.delete(f"{service.base_url}/drive/items/{existing['id']}", headers=service._headers())
+            # 204 No Content expected
+            resp_del.raise_for_status()
+    except Exception as e:
+        service.logger.warning("Pre-delete existing archive file failed (continuing): %s", e)
+
+
+_folder_ids: Dict[str, str] = {}
+_folder_ids_lock = threading.Lock()
+
+# Pre-authenticated @microsoft.graph.downloadUrl per item id, captured while listing. They are
+# bearer-equivalent, so they stay in process memory instead of travelling in FileRefs through
+# workflow history and logs. Graph lets them expire after about an hour.
+LISTED_URL_TTL_SECONDS = 30 * 60
+_download_urls: Dict[str, Tuple[str, float]] = {}
+_download_urls_lock = threading.Lock()
+
+
+def _remember_download_urls(items: List[Dict[str, Any]]) -> None:
+    now = time.monotonic()
+    with _download_urls_lock:
+        for item_id in [k for k, (_, expires) in _download_urls.items() if expires <= now]:
+            del _download_urls[item_id]
+        for it in items:
+            url = it.get("@microsoft.graph.downloadUrl")
+            if url and it.get("id"):
+                _download_urls[it["id"]] = (url, now + LISTED_URL_TTL_SECONDS)
+
 
-from typing import List, Optional, Dict, Any
+def _take_download_url(item_id: str) -> Optional[str]:
+    with _download_urls_lock:
+        url, expires = _download_urls.pop(item_id, (None, 0.0))
+    return url if expires > time.monotonic() else None
+
+from typing import List, Optional, Dict, Any, Set, Tuple
 import json
 import logging
-import msal
-import os
-import time
-import requests
 
 
 
+class DeltaTokenExpired(Exception):
+    """Graph rejected a stored delta link (410 Gone); caller must do a full resync."""
+
+
 class OneDriveService:
     """
-    OneDrive adapter using Microsoft Graph. Handles token refresh and state store for TR001.
+    OneDrive adapter using Microsoft Graph. Tokens and connections come from the
+    process-wide GraphSession (TR001), so constructing the adapter is cheap.
     """
 
-    TOKEN_STATE_KEY = "global_ms_graph_token_cache"  # store the MSAL cache, not a custom dict
+    TOKEN_STATE_KEY = TOKEN_STATE_KEY  # store the MSAL cache, not a custom dict
 
-    def __init__(self, http: Optional[HttpClient] = None):
-        self.http = http or HttpClient()
-        self.base_url = "https://graph.microsoft.com/v1.0/me"
-        self.state = TokenStateStore()
+    def __init__(self, http: Optional[HttpClient] = None, session: Optional[GraphSession] = None):
+        self.session = session or get_graph_session()
+        self.http = http or self.session.http
+        self.base_url = self.session.base_url
+        self.state = self.session.state
         self.logger = logging.getLogger("onedrive")
-        self.client_id = os.getenv("MS_GRAPH_CLIENT_ID")
-        self.client_secret = os.getenv("MS_GRAPH_CLIENT_SECRET")
-        self.authority = os.getenv("MS_GRAPH_AUTHORITY", "https://login.microsoftonline.com/consumers")
         # Delegated scopes
         self.scopes = [
             "User.Read",
             "Files.ReadWrite"
         ]
 
-        # Load MSAL token cache from state
-        self.cache = msal.SerializableTokenCache()
-        raw = self.state.get(self.TOKEN_STATE_KEY)
-        if raw:
-            try:
-                self.cache.deserialize(raw)
-            except Exception:
-                self.logger.warning("Failed to deserialize token cache; starting fresh.")
-
-        self.app = msal.ConfidentialClientApplication(
-            self.client_id,
-            authority=self.authority,
-            client_credential=self.client_secret,
-            token_cache=self.cache,
-        )
-
         # Ensure we have a token (will use refresh token if available)
         self._ensure_token()
 
     # ---- First-time bootstrap (run once after user consents) ----
     def get_authorization_url(self, redirect_uri: str) -> str:
-        return self.app.get_authorization_request_url(self.scopes, redirect_uri=redirect_uri)
+        return self.session.get_authorization_url(self.scopes, redirect_uri=redirect_uri)
 
     def redeem_auth_code(self, code: str, redirect_uri: str):
-        result = self.app.acquire_token_by_authorization_code(
-            code, scopes=self.scopes, redirect_uri=redirect_uri
-        )
-        self._ensure_ok(result)
-        self._persist_cache()
+        self.session.redeem_auth_code(code, scopes=self.scopes, redirect_uri=redirect_uri)
 
     # ---- Normal operation / refresh-on-demand ----
     def _ensure_token(self):
-        accounts = self.app.get_accounts()
-        result = self.app.acquire_token_silent(self.scopes, account=accounts[0] if accounts else None)
-        if not result:
-            raise RuntimeError(
-                "No cached delegated token. Run interactive consent (auth code) once to bootstrap."
-            )
-        self._ensure_ok(result)
-        self._persist_cache()
+        self.session.access_token(self.scopes)
 
     def _headers(self):
-        accounts = self.app.get_accounts()
-        result = self.app.acquire_token_silent(self.scopes, account=accounts[0] if accounts else None)
-        self._ensure_ok(result)
-        self._persist_cache()
-        return {"Authorization": f"Bearer {result['access_token']}"}
-
-    def _persist_cache(self):
-        if self.cache.has_state_changed:
-            self.state.set(self.TOKEN_STATE_KEY, self.cache.serialize())
-
-    def _ensure_ok(self, result):
-        if not result or "access_token" not in result:
-            raise RuntimeError(f"MSAL token failure: {result.get('error_description', result)}")
+        return self.session.headers(self.scopes)
 
     # reqular operations
-    def download_file_by_path(self, onedrive_path: str, local_path: str):
+    def download_file_by_path(self, onedrive_path: str, local_path: str) -> Dict[str, Any]:
         """
         Download a file from OneDrive by its path (e.g. /folder/file.txt) to a local file.
-        Uses requests directly for streaming.
+        Uses the shared resumable download engine; returns {'path', 'sha256', 'bytes'}.
         """
         url = f"{self.base_url}/drive/root:{onedrive_path}:/content"
-        resp = requests.get(url, headers=self._headers(), stream=True)
-        resp.raise_for_status()
-        with open(local_path, 'wb') as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        return self.download_to(url, local_path)
+
+    def download_to(self, url: str, local_path: str) -> Dict[str, Any]:
+        """
+        Download url (a Graph content URL or a pre-authenticated downloadUrl) to local_path.
+        The Authorization header is only sent to Graph itself; returns {'path', 'sha256', 'bytes'}.
+        """
+        headers = self._headers() if url.startswith(self.base_url) else None
+        return self.http.download(url, local_path, headers=headers)
+
+    def download_item(self, item_id: str, local_path: str) -> Dict[str, Any]:
+        """
+        Download a drive item without a metadata round trip: through the downloadUrl this process
+        captured when listing it, else through the content endpoint (Graph redirects to the same
+        kind of URL; httpx drops the Authorization header on that cross-origin redirect).
+        """
+        url = _take_download_url(item_id)
+        if url:
+            try:
+                return self.download_to(url, local_path)
+            except httpx.HTTPStatusError as e:
+                self.logger.info("Listed download URL rejected (%s) for id=%s; using the content endpoint", e.response.status_code, item_id)
+        return self.download_to(f"{self.base_url}/drive/items/{item_id}/content", local_path)
+
+    def _get_paged(self, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Follow @odata.nextLink until exhausted; returns (items, @odata.deltaLink if any)."""
+        items: List[Dict[str, Any]] = []
+        delta_link: Optional[str] = None
+        next_url: Optional[str] = url
+        while next_url:
+            resp = self.http.get(next_url, headers=self._headers(), params=params)
+            params = None  # nextLink already carries the query
+            if resp.status_code == 410:
+                raise DeltaTokenExpired(f"Delta token rejected by Graph: {resp.text}")
+            resp.raise_for_status()
+            data = resp.json()
+            items.extend(data.get("value", []))
+            next_url = data.get("@odata.nextLink")
+            delta_link = data.get("@odata.deltaLink", delta_link)
+        return items, delta_link
+
+    @staticmethod
+    def _to_file_ref(it: Dict[str, Any]) -> FileRef:
+        return FileRef(
+            id=it["id"],
+            name=it["name"],
+            size=it.get("size"),
+            etag=it.get("eTag"),
+            created_at=it.get("createdDateTime"),
+        )
 
     def list_folder(self, folder_path: str) -> List[FileRef]:
-        # GET /me/drive/root:/path:/children
+        # GET /me/drive/root:/path:/children (all pages)
         url = f"{self.base_url}/drive/root:/{folder_path}:/children"
-        resp = self.http.get(url, headers=self._headers())
-        resp.raise_for_status()
-        data = resp.json()
-        items = []
-        for it in data.get("value", []):
-            if "file" in it:  # skip folders
-                items.append(
-                    FileRef(
-                        id=it.get("id"),
-                        name=it.get("name"),
-                        size=it.get("size"),
-                        etag=it.get("eTag"),
-                    )
-                )
-        return items
+        values, _ = self._get_paged(url)
+        # skip folders
+        files = [it for it in values if "file" in it]
+        _remember_download_urls(files)
+        return [self._to_file_ref(it) for it in files]
+
+    def latest_delta_link(self, folder_path: str) -> str:
+        """Return a delta link for the folder's current state without enumerating it."""
+        norm = folder_path.lstrip('/')
+        url = f"{self.base_url}/drive/root:/{norm}:/delta"
+        _, delta_link = self._get_paged(url, params={"token": "latest"})
+        if not delta_link:
+            raise RuntimeError(f"Graph returned no deltaLink for '{folder_path}'")
+        return delta_link
+
+    def list_folder_changes(
+        self, delta_link: str, folder_id: str, removed: Optional[Set[str]] = None
+    ) -> Tuple[List[FileRef], str]:
+        """
+        Return files added or changed directly under folder_id since delta_link, plus the next delta link.
+        Ids of files deleted or moved out of the folder are added to `removed` when given.
+        Raises DeltaTokenExpired when Graph requires a resync.
+        """
+        values, next_link = self._get_paged(delta_link)
+        changed: List[Dict[str, Any]] = []
+        for it in values:
+            if "deleted" not in it and (it.get("parentReference") or {}).get("id") == folder_id:
+                if "file" in it:
+                    changed.append(it)
+            elif removed is not None and it.get("id"):
+                removed.add(it["id"])
+        _remember_download_urls(changed)
+        return [self._to_file_ref(it) for it in changed], next_link or delta_link
 
     def get_download_url(self, item_id: str) -> str:
         # GET /me/drive/items/{item-id}
@@ -171,7 +298,7 @@ class OneDriveService:
         dl = data.get("@microsoft.graph.downloadUrl")
         if dl:
             return dl
-        # Fallback: content endpoint
+        # Fallback: content endpoint (needs the Authorization header)
         return f"{url}/content"
 
     def get_item_by_path(self, item_path: str) -> Dict[str, Any]:
@@ -186,6 +313,23 @@ class OneDriveService:
         resp.raise_for_status()
         return resp.json()
 
+    def resolve_folder_id(self, folder_path: str) -> str:
+        """Resolve a folder path to its drive item id, cached for the lifetime of the process."""
+        key = folder_path.rstrip('/')
+        folder_id = _folder_ids.get(key)
+        if folder_id:
+            return folder_id
+        folder_id = self.get_item_by_path(folder_path).get("id")
+        if not folder_id:
+            raise RuntimeError(f"Could not resolve folder id for path '{folder_path}'")
+        with _folder_ids_lock:
+            _folder_ids[key] = folder_id
+        return folder_id
+
+    def forget_folder_id(self, folder_path: str) -> None:
+        with _folder_ids_lock:
+            _folder_ids.pop(folder_path.rstrip('/'), None)
+
     def list_children_by_id(self, parent_id: str) -> Dict[str, Any]:
         """List children of a drive item by id (returns raw JSON with value[])."""
         url = f"{self.base_url}/drive/items/{parent_id}/children"
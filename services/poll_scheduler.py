@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+import hashlib
+import time
+
+# Runtime statuses (names of dapr.ext.workflow.WorkflowStatus) after which a poll is done
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "TERMINATED")
+
+
+def poll_instance_id(window_seconds: float, now: Optional[float] = None, files: Optional[Iterable[str]] = None) -> str:
+    """
+    Deterministic poll workflow instance id for the schedule window containing `now`.
+
+    Every publisher (or redelivery) for the same window maps to the same id, so the workflow
+    engine rejects the duplicate instead of a state-store dedup entry. `files` (watch mode)
+    distinguishes several hand-offs within one window.
+    """
+    window = max(1, int(window_seconds))
+    start = int((time.time() if now is None else now) // window) * window
+    instance_id = "voice2action-poll-" + datetime.fromtimestamp(start, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    if files:
+        digest = hashlib.sha256("\n".join(sorted(files)).encode("utf-8")).hexdigest()[:12]
+        instance_id += f"-{digest}"
+    return instance_id
+
+
+@dataclass
+class PollOutcome:
+    status: str
+    files: int = 0
+    failed: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+def shard_events(base_event: dict, instance_id: str, shard_count: int) -> List[dict]:
+    """
+    One schedule event per shard (shard_index 0..shard_count-1), each with its own poll instance
+    id, so the shard polls land on different worker replicas. shard_count <= 1 keeps one event.
+    """
+    if shard_count <= 1:
+        return [{**base_event, "poll_instance_id": instance_id}]
+    from services.sharding import shard_suffix
+
+    return [
+        {
+            **base_event,
+            "shard_index": i,
+            "shard_count": shard_count,
+            "poll_instance_id": instance_id + shard_suffix(i, shard_count),
+        }
+        for i in range(shard_count)
+    ]
+
+
+def combine_outcomes(outcomes: List[Optional["PollOutcome"]]) -> Optional["PollOutcome"]:
+    """Outcome of a sharded poll: unknown if any shard is unknown, failed if any shard failed."""
+    known: List[PollOutcome] = []
+    for outcome in outcomes:
+        if outcome is None:
+            return None
+        known.append(outcome)
+    if not known:
+        return None
+    status = next((o.status for o in known if o.status != "COMPLETED"), "COMPLETED")
+    return PollOutcome(
+        status=status,
+        files=sum(o.files for o in known),
+        failed=sum(o.failed for o in known),
+    )
+
+
+class AdaptivePollScheduler:
+    """
+    Decide how long to wait before the next poll from the outcome of the previous one.
+
+    - files found: a backlog may be building up, poll again after `min_interval`
+    - empty poll: return to `base_interval`, then back off by `factor` up to `max_interval`
+    - failed poll: back off like an empty poll so a broken dependency is not hammered
+    - unknown outcome (status not available): keep the fixed `base_interval`
+    """
+
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float, factor: float = 2.0):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.factor = max(1.0, factor)
+        self.interval = base_interval
+
+    def next_delay(self, outcome: Optional[PollOutcome]) -> float:
+        if outcome is None:
+            self.interval = self.base_interval
+        elif outcome.status == "COMPLETED" and outcome.files > 0:
+            self.interval = self.min_interval
+        elif self.interval < self.base_interval:
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        return self.interval
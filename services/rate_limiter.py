@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Optional
+import os
+import threading
+import time
+
+from services.telemetry import RATE_LIMIT_WAIT_SECONDS
+
+# Outbound OpenAI request budget shared by all threads of a process; 0 disables limiting
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "50"))
+OPENAI_REQUEST_BURST = int(os.getenv("OPENAI_REQUEST_BURST", "5"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` saved up for bursts."""
+
+    def __init__(self, rate: float, capacity: int, name: str = "default"):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.name = name
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are available; returns False if `timeout` seconds pass first."""
+        if self.rate <= 0:
+            return True
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    waited = now - started
+                    if waited > 0 and RATE_LIMIT_WAIT_SECONDS is not None:
+                        RATE_LIMIT_WAIT_SECONDS.labels(self.name).inc(waited)
+                    return True
+                delay = (tokens - self._tokens) / self.rate
+            if timeout is not None and now + delay - started > timeout:
+                return False
+            time.sleep(delay)
+
+
+_openai_limiter: Optional[TokenBucket] = None
+_openai_lock = threading.Lock()
+
+
+def get_openai_rate_limiter() -> TokenBucket:
+    """Process-wide limiter for OpenAI API calls (Whisper and chat)."""
+    global _openai_limiter
+    if _openai_limiter is None:
+        with _openai_lock:
+            if _openai_limiter is None:
+                _openai_limiter = TokenBucket(OPENAI_REQUESTS_PER_MINUTE / 60.0, OPENAI_REQUEST_BURST, name="openai")
+    return _openai_limiter
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from bisect import bisect
+from typing import Dict, Iterable, List, Optional, Tuple, TypeVar
+import functools
+import hashlib
+
+T = TypeVar("T")
+
+# Points per shard on the ring; more points give a more even split
+VIRTUAL_NODES = 160
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of file ids onto shard indexes 0..shard_count-1.
+
+    Growing from N to N+1 shards moves only ~1/(N+1) of the files (those now owned by the new
+    shard), so a resize does not reshuffle every in-flight file. Ownership only decides which
+    shard poll lists and schedules a file; the pending/downloaded markers stay keyed by file id,
+    so a file that changes owner mid-flight is still skipped by its new shard.
+    """
+
+    def __init__(self, shard_count: int, virtual_nodes: int = VIRTUAL_NODES):
+        self.shard_count = max(1, shard_count)
+        points: List[Tuple[int, int]] = sorted(
+            (_hash(f"shard-{shard}#{v}"), shard) for shard in range(self.shard_count) for v in range(virtual_nodes)
+        )
+        self._keys = [p for p, _ in points]
+        self._shards = [s for _, s in points]
+
+    def shard_of(self, file_id: str) -> int:
+        if self.shard_count == 1:
+            return 0
+        i = bisect(self._keys, _hash(file_id)) % len(self._keys)
+        return self._shards[i]
+
+    def partition(self, items: Iterable[T], key=lambda x: x) -> Dict[int, List[T]]:
+        out: Dict[int, List[T]] = {}
+        for item in items:
+            out.setdefault(self.shard_of(key(item)), []).append(item)
+        return out
+
+
+@functools.lru_cache(maxsize=8)
+def get_ring(shard_count: int) -> HashRing:
+    return HashRing(shard_count)
+
+
+def owned(file_id: str, shard_index: Optional[int], shard_count: int) -> bool:
+    """True when sharding is off or file_id belongs to shard_index."""
+    if shard_index is None or shard_count <= 1:
+        return True
+    return get_ring(shard_count).shard_of(file_id) == shard_index
+
+
+def shard_suffix(shard_index: Optional[int], shard_count: int) -> str:
+    """Suffix for per-shard ids and keys (poll instance ids, delta cursors); empty when not sharded."""
+    if shard_index is None or shard_count <= 1:
+        return ""
+    return f"-s{shard_index}of{shard_count}"
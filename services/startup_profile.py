@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+import builtins
+import importlib.util
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("startup_profile")
+
+_started = time.perf_counter()
+_enabled = False
+_original_import = builtins.__import__
+_local = threading.local()
+_lock = threading.Lock()
+# module -> (cumulative seconds incl. its own imports, self seconds)
+_imports: Dict[str, Tuple[float, float]] = {}
+_marks: List[Tuple[str, float]] = []
+
+
+def _resolve(name: str, globals_, level: int) -> str:
+    if not level:
+        return name
+    try:
+        return importlib.util.resolve_name("." * level + name, (globals_ or {}).get("__package__"))
+    except (ImportError, ValueError):
+        return name
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    module = _resolve(name, globals, level)
+    if module in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            _imports.setdefault(module, (elapsed, elapsed - children))
+
+
+def enable() -> None:
+    """Record the time spent in every first-time import from now on (cumulative and self)."""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        builtins.__import__ = _timed_import
+
+
+def mark(phase: str) -> None:
+    """Record a startup milestone relative to process start of this module."""
+    if _enabled:
+        _marks.append((phase, time.perf_counter() - _started))
+
+
+def report(top: int = 25) -> None:
+    """Log milestones and the slowest imports, then stop timing imports."""
+    if not _enabled:
+        return
+    builtins.__import__ = _original_import
+    for phase, at in _marks:
+        logger.info("startup %-32s %8.1f ms", phase, at * 1000)
+    with _lock:
+        slowest = sorted(_imports.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    logger.info("slowest imports (cumulative / self ms):")
+    for module, (cumulative, own) in slowest:
+        logger.info("  %-48s %8.1f %8.1f", module, cumulative * 1000, own * 1000)
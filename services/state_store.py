@@ -1,16 +1,54 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import grpc
 from dapr.clients import DaprClient
+from dapr.clients.grpc._request import TransactionalStateOperation, TransactionOperationType
+from dapr.clients.grpc._state import Concurrency, StateItem, StateOptions
+
+logger = logging.getLogger("state_store")
 
 
 STATE_STORE_NAME = os.getenv("STATE_STORE_NAME", "workflowstatestore")
+# Max keys per bulk/transactional request; keeps gRPC messages bounded for large inboxes
+STATE_BULK_CHUNK_SIZE = int(os.getenv("STATE_BULK_CHUNK_SIZE", "500"))
+STATE_BULK_PARALLELISM = int(os.getenv("STATE_BULK_PARALLELISM", "8"))
+# gRPC status of a conditional write that lost (etag mismatch / first-write key already exists)
+CONFLICT_STATUS_CODES = (grpc.StatusCode.ABORTED, grpc.StatusCode.FAILED_PRECONDITION)
+
+_client: Optional[DaprClient] = None
+_client_lock = threading.Lock()
+
+
+def get_dapr_client() -> DaprClient:
+    """Return the process-wide DaprClient (one gRPC channel shared by all state stores)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DaprClient()
+    return _client
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), max(1, size)):
+        yield items[i:i + size]
+
+
+def _ttl_metadata(ttl_seconds: Optional[int]) -> Dict[str, str]:
+    # Dapr state TTL (supported by the Redis, PostgreSQL and SQLite stores used here); <= 0 means no expiry
+    return {"ttlInSeconds": str(int(ttl_seconds))} if ttl_seconds and ttl_seconds > 0 else {}
 
 
 class StateStore:
     def __init__(self):
-        self.client = DaprClient()
+        self.client = get_dapr_client()
 
     def get(self, key: str) -> Optional[str]:
         res = self.client.get_state(store_name=STATE_STORE_NAME, key=key)
@@ -18,8 +56,142 @@ class StateStore:
             return res.data.decode("utf-8")
         return None
 
-    def set(self, key: str, value: str) -> None:
-        self.client.save_state(store_name=STATE_STORE_NAME, key=key, value=value)
+    def set(self, key: str, value: str, ttl_seconds: Optional[int] = None) -> None:
+        self.client.save_state(
+            store_name=STATE_STORE_NAME, key=key, value=value, state_metadata=_ttl_metadata(ttl_seconds)
+        )
 
     def delete(self, key: str) -> None:
         self.client.delete_state(store_name=STATE_STORE_NAME, key=key)
+
+    # ---- Bulk operations (one round trip per chunk) ----
+    def get_bulk(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """Fetch many keys at once; missing keys map to None."""
+        return {k: value for k, (value, _) in self.get_bulk_with_etags(keys).items()}
+
+    def get_bulk_with_etags(self, keys: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Like get_bulk, but maps each key to (value, etag); missing keys map to (None, None)."""
+        out: Dict[str, Tuple[Optional[str], Optional[str]]] = {k: (None, None) for k in keys}
+        unique = list(out.keys())
+        for chunk in _chunks(unique, STATE_BULK_CHUNK_SIZE):
+            res = self.client.get_bulk_state(
+                store_name=STATE_STORE_NAME, keys=chunk, parallelism=STATE_BULK_PARALLELISM
+            )
+            for item in res.items:
+                if item.error:
+                    raise RuntimeError(f"Bulk get failed for key '{item.key}': {item.error}")
+                if item.data:
+                    raw = item.data
+                    value = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                    out[item.key] = (value, getattr(item, "etag", None) or None)
+        return out
+
+    # ---- Leases (first-write-wins claims) ----
+    def _try_write(self, key: str, value: str, etag: Optional[str], ttl_seconds: Optional[int]) -> bool:
+        """
+        Conditional write: insert-only without etag, compare-and-swap with one. False if another
+        writer won; any other failure (sidecar unavailable, timeout, ...) is raised.
+        """
+        try:
+            self.client.save_state(
+                store_name=STATE_STORE_NAME,
+                key=key,
+                value=value,
+                etag=etag,
+                options=StateOptions(concurrency=Concurrency.first_write),
+                state_metadata=_ttl_metadata(ttl_seconds),
+            )
+            return True
+        except grpc.RpcError as e:
+            if e.code() not in CONFLICT_STATUS_CODES:
+                raise
+            logger.debug("Conditional write of %s lost: %s", key, e)
+            return False
+
+    def compare_and_set(self, key: str, value: str, etag: Optional[str], ttl_seconds: Optional[int] = None) -> bool:
+        """
+        Write key only if it is unchanged since it was read with `etag` (etag None: only if it
+        does not exist yet). Returns False when another writer got there first.
+        """
+        return self._try_write(key, value, etag, ttl_seconds)
+
+    def claim(self, keys: List[str], owner: str, lease_seconds: int) -> List[str]:
+        """
+        Claim keys for `owner` and return the ones this caller won.
+
+        Each key is claimed on its own (not as one batch or transaction) with a conditional
+        first-write-wins write: absent keys are inserted only if still absent, keys whose lease
+        expired are taken over only if their etag is unchanged. Keys already held by `owner`
+        count as won and keys held by others are skipped. If a write fails for another reason the
+        error is raised and keys claimed before it stay claimed; a retry by the same owner (the
+        activity retry) keeps them. The lease is stored as {'owner', 'expires'} and also as
+        store-side TTL, so claims of a crashed instance lapse on their own.
+        lease_seconds <= 0 means the lease never expires.
+        """
+        if not keys:
+            return []
+        now = time.time()
+        expires = now + lease_seconds if lease_seconds and lease_seconds > 0 else 0
+        value = json.dumps({"owner": owner, "expires": expires})
+        current = self.get_bulk_with_etags(keys)
+        won: Dict[str, bool] = {}
+        attempts: List[Tuple[str, Optional[str]]] = []
+        for key in dict.fromkeys(keys):
+            raw, etag = current[key]
+            if raw is None:
+                attempts.append((key, None))
+                continue
+            try:
+                held = json.loads(raw)
+            except ValueError:
+                held = None
+            if not isinstance(held, dict):
+                # Plain marker written before leases existed: held until its TTL lapses
+                won[key] = False
+            elif held.get("owner") == owner:
+                won[key] = True
+            elif held.get("expires") and held["expires"] < now and etag:
+                attempts.append((key, etag))
+            else:
+                won[key] = False
+        if attempts:
+            with ThreadPoolExecutor(max_workers=max(1, min(STATE_BULK_PARALLELISM, len(attempts)))) as pool:
+                results = pool.map(lambda a: self._try_write(a[0], value, a[1], lease_seconds), attempts)
+                for (key, _), ok in zip(attempts, results):
+                    won[key] = ok
+        return [k for k in dict.fromkeys(keys) if won.get(k)]
+
+    def set_bulk(self, items: Dict[str, str]) -> None:
+        states = [StateItem(key=k, value=v) for k, v in items.items()]
+        for chunk in _chunks(states, STATE_BULK_CHUNK_SIZE):
+            self.client.save_bulk_state(store_name=STATE_STORE_NAME, states=chunk)
+
+    def delete_bulk(self, keys: List[str]) -> None:
+        self.transact(deletes=keys)
+
+    def transact(
+        self,
+        upserts: Optional[Dict[str, str]] = None,
+        deletes: Optional[List[str]] = None,
+        ttls: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Apply upserts and deletes atomically (per chunk) via the transactional state API.
+        ttls optionally maps upserted keys to a time-to-live in seconds (store-side expiry).
+        """
+        ttls = ttls or {}
+        ops: List[TransactionalStateOperation] = [
+            TransactionalStateOperation(
+                operation_type=TransactionOperationType.upsert,
+                key=k,
+                data=v,
+                metadata=_ttl_metadata(ttls.get(k)),
+            )
+            for k, v in (upserts or {}).items()
+        ]
+        ops.extend(
+            TransactionalStateOperation(operation_type=TransactionOperationType.delete, key=k)
+            for k in (deletes or [])
+        )
+        for chunk in _chunks(ops, STATE_BULK_CHUNK_SIZE):
+            self.client.execute_state_transaction(store_name=STATE_STORE_NAME, operations=chunk)
@@ -0,0 +1,186 @@
+"""Tracing and latency metrics for the voice2action pipeline.
+
+Spans go to the OTLP collector configured via OTEL_EXPORTER_OTLP_ENDPOINT (the same collector
+the Dapr sidecars export to in components/config.yaml), so app spans join the Dapr traces.
+Stage latencies are recorded as Prometheus histograms and served on VOICE2ACTION_METRICS_PORT.
+
+Both OpenTelemetry and prometheus_client are optional: when missing, instrumentation is a no-op.
+
+Workflows cannot open spans themselves (they replay), so a W3C traceparent is created where the
+poll is scheduled and passed down through workflow/activity inputs as 'trace_parent'.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+import functools
+import logging
+import os
+import time
+
+logger = logging.getLogger("telemetry")
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+    _propagator: Optional[TraceContextTextMapPropagator] = TraceContextTextMapPropagator()
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None  # type: ignore
+    Status = StatusCode = None  # type: ignore
+    _propagator = None
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None  # type: ignore
+
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+if prometheus_client is not None:
+    Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+    STAGE_SECONDS = Histogram(
+        "voice2action_stage_seconds", "Duration of a voice2action pipeline stage", ["stage"], buckets=_BUCKETS
+    )
+    STAGE_ERRORS = Counter("voice2action_stage_errors_total", "Failed voice2action pipeline stages", ["stage"])
+    INBOX_TO_PUBLISH_SECONDS = Histogram(
+        "voice2action_inbox_to_publish_seconds",
+        "Time from a recording landing in the inbox to the TriggerAction publish",
+        buckets=_BUCKETS,
+    )
+    ACTIVITIES_QUEUED = Gauge(
+        "voice2action_activities_queued", "Activities waiting for a concurrency slot", ["stage"]
+    )
+    ACTIVITIES_RUNNING = Gauge("voice2action_activities_running", "Activities currently executing", ["stage"])
+    RATE_LIMIT_WAIT_SECONDS = Counter(
+        "voice2action_rate_limit_wait_seconds_total", "Time spent waiting for an outbound rate limiter", ["limiter"]
+    )
+    PREPROCESS_BYTES_SAVED = Counter(
+        "voice2action_preprocess_bytes_saved_total", "Upload bytes saved by audio pre-processing"
+    )
+    WORK_FOLDER_BYTES = Gauge(
+        "voice2action_work_folder_bytes", "Bytes in the download/work folder after the last retention sweep", ["kind"]
+    )
+    TRANSCRIPTION_CACHE_EVENTS = Counter(
+        "voice2action_transcription_cache_total", "Transcription cache hits, misses and evictions", ["event"]
+    )
+    TRANSCRIPTION_CACHE_BYTES = Gauge(
+        "voice2action_transcription_cache_bytes", "Bytes of cached transcripts after the last cache write"
+    )
+else:
+    STAGE_SECONDS = STAGE_ERRORS = INBOX_TO_PUBLISH_SECONDS = None
+    ACTIVITIES_QUEUED = ACTIVITIES_RUNNING = RATE_LIMIT_WAIT_SECONDS = PREPROCESS_BYTES_SAVED = None
+    WORK_FOLDER_BYTES = TRANSCRIPTION_CACHE_EVENTS = TRANSCRIPTION_CACHE_BYTES = None
+
+
+def init_telemetry(service_name: str) -> None:
+    """Configure the OTLP span exporter and the /metrics endpoint for this process."""
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if trace is not None and endpoint:
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+            provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint, insecure=True)))
+            trace.set_tracer_provider(provider)
+            logger.info("Tracing to OTLP endpoint %s as %s", endpoint, service_name)
+        except Exception:
+            logger.exception("Failed to initialize OTLP tracing; continuing without exporter")
+    port = int(os.getenv("VOICE2ACTION_METRICS_PORT", "9464"))
+    if prometheus_client is not None and port > 0:
+        prometheus_client.start_http_server(port)
+        logger.info("Serving Prometheus metrics on :%d/metrics", port)
+
+
+def current_trace_parent() -> Optional[str]:
+    """Return the W3C traceparent of the active span (to hand to workflows/pub/sub)."""
+    if _propagator is None:
+        return None
+    carrier: Dict[str, str] = {}
+    _propagator.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def _context_from(trace_parent: Optional[str]):
+    if _propagator is None or not trace_parent:
+        return None
+    return _propagator.extract({"traceparent": trace_parent})
+
+
+@contextmanager
+def span(name: str, trace_parent: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+    """Start a span (child of trace_parent when given); yields the span or None without OTel."""
+    if trace is None:
+        with nullcontext() as s:
+            yield s
+        return
+    tracer = trace.get_tracer("voice2action")
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(name, context=_context_from(trace_parent), attributes=attrs) as s:
+        yield s
+
+
+@contextmanager
+def stage(name: str, file_id: Optional[str] = None, trace_parent: Optional[str] = None) -> Iterator[Any]:
+    """Time one pipeline stage as a span plus a voice2action_stage_seconds observation."""
+    started = time.perf_counter()
+    with span(f"voice2action.{name}", trace_parent, **{"voice2action.stage": name, "voice2action.file_id": file_id}) as s:
+        try:
+            yield s
+        except Exception as e:
+            if STAGE_ERRORS is not None:
+                STAGE_ERRORS.labels(name).inc()
+            if s is not None and Status is not None and StatusCode is not None:
+                s.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            if STAGE_SECONDS is not None:
+                STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def _file_id_of(payload: Any) -> Optional[str]:
+    if not isinstance(payload, dict):
+        return None
+    file = payload.get("file")
+    if isinstance(file, dict) and file.get("id"):
+        return file["id"]
+    return payload.get("file_id") or payload.get("correlation_id")
+
+
+def instrumented_activity(stage_name: str) -> Callable:
+    """Decorator for `activity(ctx, input)` functions: wraps the call in stage(stage_name).
+
+    The activity keeps its __name__, so workflow registration and call_activity are unaffected.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(ctx, input):
+            trace_parent = input.get("trace_parent") if isinstance(input, dict) else None
+            with stage(stage_name, _file_id_of(input), trace_parent) as s:
+                result = fn(ctx, input)
+                if s is not None and isinstance(result, dict) and isinstance(result.get("files"), list):
+                    s.set_attribute("voice2action.files", len(result["files"]))
+                return result
+        # Read by ActivityLimiter to pick the stage's concurrency slot
+        setattr(wrapper, "stage_name", stage_name)
+        return wrapper
+    return decorator
+
+
+def observe_inbox_to_publish(file_created_at: Optional[str]) -> None:
+    """Record end-to-end latency from the file's inbox timestamp (ISO 8601) to now."""
+    if INBOX_TO_PUBLISH_SECONDS is None or not file_created_at:
+        return
+    try:
+        created = datetime.fromisoformat(file_created_at.replace("Z", "+00:00"))
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        INBOX_TO_PUBLISH_SECONDS.observe(max(0.0, (datetime.now(timezone.utc) - created).total_seconds()))
+    except ValueError:
+        logger.debug("Unparseable file_created_at=%s", file_created_at)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 from typing import Optional
-from dapr.clients import DaprClient
+from .state_store import get_dapr_client
 
 
 STATE_STORE_NAME = os.getenv("TOKEN_STATE_STORE_NAME", "tokenstatestore")
@@ -10,7 +10,7 @@ STATE_STORE_NAME = os.getenv("TOKEN_STATE_STORE_NAME", "tokenstatestore")
 
 class TokenStateStore:
     def __init__(self):
-        self.client = DaprClient()
+        self.client = get_dapr_client()
 
     def get(self, key: str) -> Optional[str]:
         res = self.client.get_state(store_name=STATE_STORE_NAME, key=key)
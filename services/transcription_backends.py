@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Protocol
+import logging
+import os
+import threading
+
+from models.voice2action import TranscriptionRequest, TranscriptionResult
+from services.whisper import WHISPER_MODEL, transcribe_audio_file
+
+logger = logging.getLogger("transcription_backends")
+
+# "openai" (Whisper API) or "local" (faster-whisper on CPU, no API key or network needed)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai").lower()
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_COMPUTE_TYPE = os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+# CPU threads per transcription and concurrent transcriptions the loaded model serves
+LOCAL_WHISPER_CPU_THREADS = int(os.getenv("LOCAL_WHISPER_CPU_THREADS", "0"))
+LOCAL_WHISPER_NUM_WORKERS = int(os.getenv("LOCAL_WHISPER_NUM_WORKERS", "1"))
+LOCAL_WHISPER_BEAM_SIZE = int(os.getenv("LOCAL_WHISPER_BEAM_SIZE", "1"))
+
+
+class TranscriptionBackend(Protocol):
+    name: str
+    # Part of the transcription cache key: different engines/models never share transcripts
+    model_id: str
+
+    def load(self) -> object:
+        """Prepare the backend (e.g. read model weights) ahead of the first transcription."""
+        ...
+
+    def transcribe(self, req: TranscriptionRequest) -> TranscriptionResult: ...
+
+
+class OpenAIWhisperBackend:
+    """Whisper API via dapr-agents (needs OPENAI_API_KEY; shares the OpenAI rate limiter)."""
+
+    name = "openai"
+    model_id = WHISPER_MODEL  # unchanged, so transcripts cached before backends existed still hit
+
+    def load(self) -> object:
+        return None  # remote API, nothing to preload
+
+    def transcribe(self, req: TranscriptionRequest) -> TranscriptionResult:
+        return transcribe_audio_file(req)
+
+
+class LocalWhisperBackend:
+    """
+    faster-whisper (CTranslate2) on CPU with int8 weights by default.
+
+    The model is loaded on first use and kept for the lifetime of the process, so only the
+    first transcription of a worker pays for reading the weights.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str = LOCAL_WHISPER_MODEL,
+        compute_type: str = LOCAL_WHISPER_COMPUTE_TYPE,
+        cpu_threads: int = LOCAL_WHISPER_CPU_THREADS,
+        num_workers: int = LOCAL_WHISPER_NUM_WORKERS,
+        beam_size: int = LOCAL_WHISPER_BEAM_SIZE,
+    ):
+        self.model = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = max(1, num_workers)
+        self.beam_size = max(1, beam_size)
+        self.model_id = f"faster-whisper:{model}:{compute_type}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from faster_whisper import WhisperModel
+                    except ImportError as e:
+                        raise RuntimeError(
+                            "TRANSCRIPTION_BACKEND=local needs the faster-whisper package "
+                            "(pip install -r requirements-local-transcription.txt, or build the base "
+                            "image with --build-arg LOCAL_TRANSCRIPTION=true)"
+                        ) from e
+
+                    logger.info("Loading local Whisper model %s (%s)", self.model, self.compute_type)
+                    self._model = WhisperModel(
+                        self.model,
+                        device="cpu",
+                        compute_type=self.compute_type,
+                        cpu_threads=self.cpu_threads,
+                        num_workers=self.num_workers,
+                    )
+        return self._model
+
+    def transcribe(self, req: TranscriptionRequest) -> TranscriptionResult:
+        if not os.path.isfile(req.audio_path):
+            raise FileNotFoundError(f"Audio file not found: {req.audio_path}")
+        segments, _info = self.load().transcribe(
+            req.audio_path,
+            beam_size=self.beam_size,
+            initial_prompt=req.terms_prompt or None,
+            vad_filter=True,
+        )
+        # segments is a generator; decoding happens while iterating
+        text = " ".join(s.text.strip() for s in segments if s.text.strip())
+        return TranscriptionResult(text=text)
+
+
+_backends: Dict[str, TranscriptionBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_transcription_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """Process-wide backend instance per name (default TRANSCRIPTION_BACKEND)."""
+    name = (name or TRANSCRIPTION_BACKEND).lower()
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name == "openai":
+                    backend = OpenAIWhisperBackend()
+                elif name == "local":
+                    backend = LocalWhisperBackend()
+                else:
+                    raise ValueError(f"Unknown TRANSCRIPTION_BACKEND '{name}' (expected 'openai' or 'local')")
+                _backends[name] = backend
+    return backend
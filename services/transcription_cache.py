@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from models.voice2action import TranscriptionResult
+from services.state_store import StateStore
+from services.telemetry import TRANSCRIPTION_CACHE_BYTES, TRANSCRIPTION_CACHE_EVENTS
+
+logger = logging.getLogger("transcription_cache")
+
+# Size budget of cached transcripts in the state store (least recently used are evicted); 0 disables the cache
+TRANSCRIPTION_CACHE_MAX_BYTES = int(float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "16")) * 1024 * 1024)
+CACHE_PREFIX = "transcription_cache:"
+INDEX_KEY = "transcription_cache_index"  # {digest: [last access epoch seconds, bytes]}
+# Compare-and-swap rounds for one index update before giving up under contention
+INDEX_UPDATE_ATTEMPTS = 8
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Stream a file through SHA-256 without loading it into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_digest(audio_sha256: str, model: str, terms_prompt: Optional[str]) -> str:
+    """Cache identity: same audio bytes, same model and same biasing prompt give the same transcript."""
+    prompt_hash = hashlib.sha256((terms_prompt or "").encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{audio_sha256}|{model}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+        if TRANSCRIPTION_CACHE_EVENTS is not None:
+            TRANSCRIPTION_CACHE_EVENTS.labels(name).inc(n)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+counters = _Counters()
+
+
+class TranscriptionCache:
+    """
+    Transcript cache in the Dapr state store keyed by content hash, model and terms prompt.
+
+    LRU bookkeeping lives in one index entry holding each transcript's last access and size.
+    The index is updated with etag compare-and-swap (re-read and retried on conflict), so
+    concurrent transcriptions on any replica never drop each other's entries, and the cached
+    transcripts stay within max_bytes. The index is written before the transcript, so a crash in
+    between leaves at most an index entry without data, which is evicted like any other.
+    """
+
+    def __init__(self, state: Optional[StateStore] = None, max_bytes: int = TRANSCRIPTION_CACHE_MAX_BYTES):
+        self.state = state or StateStore()
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _parse_index(raw: Optional[str]) -> Dict[str, List[float]]:
+        try:
+            index = json.loads(raw) if raw else {}
+        except ValueError:
+            logger.warning("Corrupt transcription cache index; resetting")
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        # Entries of the former {digest: last access} format count as size 0 until touched
+        return {d: (list(v) if isinstance(v, list) else [float(v), 0]) for d, v in index.items()}
+
+    def _update_index(
+        self, change: Callable[[Dict[str, List[float]]], List[str]]
+    ) -> Optional[Tuple[List[str], Dict[str, List[float]]]]:
+        """Apply change() to a fresh copy of the index and write it back if nobody else did meanwhile."""
+        for _ in range(INDEX_UPDATE_ATTEMPTS):
+            raw, etag = self.state.get_bulk_with_etags([INDEX_KEY])[INDEX_KEY]
+            index = self._parse_index(raw)
+            result = change(index)
+            if self.state.compare_and_set(INDEX_KEY, json.dumps(index), etag if raw else None):
+                return result, index
+        logger.warning("Transcription cache index busy; skipped an update after %d attempts", INDEX_UPDATE_ATTEMPTS)
+        return None
+
+    def get(self, digest: str) -> Optional[TranscriptionResult]:
+        raw = self.state.get(CACHE_PREFIX + digest)
+        if not raw:
+            counters.add("misses")
+            return None
+        counters.add("hits")
+        size = len(raw.encode("utf-8"))
+
+        def touch(index: Dict[str, List[float]]) -> List[str]:
+            index[digest] = [time.time(), size]
+            return []
+
+        self._update_index(touch)
+        return TranscriptionResult.model_validate_json(raw)
+
+    def put(self, digest: str, result: TranscriptionResult) -> None:
+        value = result.model_dump_json(exclude_none=True)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        def add(index: Dict[str, List[float]]) -> List[str]:
+            index[digest] = [time.time(), size]
+            total = sum(b for _, b in index.values())
+            evicted: List[str] = []
+            for old, (_, b) in sorted(index.items(), key=lambda kv: kv[1][0]):
+                if total <= self.max_bytes:
+                    break
+                if old != digest:
+                    evicted.append(old)
+                    total -= b
+                    del index[old]
+            return evicted
+
+        updated = self._update_index(add)
+        if updated is None:
+            return
+        evicted, index = updated
+        self.state.transact(upserts={CACHE_PREFIX + digest: value}, deletes=[CACHE_PREFIX + d for d in evicted])
+        if evicted:
+            counters.add("evictions", len(evicted))
+        if TRANSCRIPTION_CACHE_BYTES is not None:
+            TRANSCRIPTION_CACHE_BYTES.set(sum(b for _, b in index.values()))
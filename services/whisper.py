@@ -1,7 +1,8 @@
 import os
-from dapr_agents import OpenAIAudioClient
-from dapr_agents.types.llm import AudioTranscriptionRequest
 from models.voice2action import TranscriptionRequest, TranscriptionResult
+from services.rate_limiter import get_openai_rate_limiter
+
+WHISPER_MODEL = "whisper-1"
 
 
 def transcribe_audio_file(req: TranscriptionRequest) -> TranscriptionResult:
@@ -16,14 +17,20 @@ def transcribe_audio_file(req: TranscriptionRequest) -> TranscriptionResult:
     if not os.path.isfile(req.audio_path):
         raise FileNotFoundError(f"Audio file not found: {req.audio_path}")
 
+    # dapr_agents pulls in every LLM SDK (seconds of import time); load it on first transcription
+    from dapr_agents import OpenAIAudioClient
+    from dapr_agents.types.llm import AudioTranscriptionRequest
+
     client = OpenAIAudioClient()
     transcription_request = AudioTranscriptionRequest(
-        model="whisper-1",
+        model=WHISPER_MODEL,
         file=req.audio_path,  # path string; client handles file opening/bytes
         # language can be provided optionally, e.g., language="en"
         prompt=req.terms_prompt if getattr(req, "terms_prompt", None) else None,
     )
 
+    # Shared request budget keeps concurrent chunks/files under the OpenAI rate limit
+    get_openai_rate_limiter().acquire()
     response = client.create_transcription(request=transcription_request)
     text = getattr(response, "text", "") or ""
     return TranscriptionResult(text=text)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import shutil
+import threading
+import time
+
+from services.telemetry import WORK_FOLDER_BYTES
+
+logger = logging.getLogger("work_folder")
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".part")
+TRANSCRIPT_EXTENSIONS = (".json",)
+# Temporary chunk directories left behind by crashed transcriptions
+CHUNK_DIR_PREFIX = ".chunks-"
+
+_sweep_lock = threading.Lock()
+_last_sweep: Dict[str, float] = {}
+
+
+def kind_of(name: str) -> str:
+    lower = name.lower()
+    if lower.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    if lower.endswith(TRANSCRIPT_EXTENSIONS):
+        return "transcript"
+    return "other"
+
+
+def release_files(paths: Iterable[str]) -> Tuple[int, int]:
+    """Delete work-folder artifacts that are no longer needed; returns (files removed, bytes freed)."""
+    removed = freed = 0
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            continue  # moved into the archive (hard link) or released on a previous attempt
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def _last_used(st: os.stat_result) -> float:
+    # atime is not updated on noatime mounts, and hand-offs keep the inbox mtime (copy2, hard
+    # links); ctime moves whenever the file is created, linked or rewritten
+    return max(st.st_atime, st.st_mtime, st.st_ctime)
+
+
+def enforce_retention(
+    folder: str,
+    max_transcript_bytes: int,
+    max_age_seconds: int,
+    now: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    One sweep over the work folder:
+    - anything (audio orphaned by failed runs, transcripts, chunk dirs) unused for max_age_seconds is removed
+    - transcripts are then evicted least recently used first until they fit max_transcript_bytes
+    Budgets <= 0 are disabled. Returns counters and the remaining bytes per kind; the bytes are
+    also reported as the voice2action_work_folder_bytes gauge.
+    """
+    now = now or time.time()
+    usage = {"audio": 0, "transcript": 0, "other": 0}
+    stats = {"removed": 0, "bytes_freed": 0}
+    if not os.path.isdir(folder):
+        return {**stats, **{f"{k}_bytes": v for k, v in usage.items()}}
+    transcripts: List[Tuple[float, int, str]] = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            expired = max_age_seconds > 0 and now - _last_used(st) > max_age_seconds
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name.startswith(CHUNK_DIR_PREFIX) and expired:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    stats["removed"] += 1
+                continue
+            if expired:
+                removed, freed = release_files([entry.path])
+                stats["removed"] += removed
+                stats["bytes_freed"] += freed
+                continue
+            kind = kind_of(entry.name)
+            usage[kind] += st.st_size
+            if kind == "transcript":
+                transcripts.append((_last_used(st), st.st_size, entry.path))
+    if max_transcript_bytes > 0 and usage["transcript"] > max_transcript_bytes:
+        for _, size, path in sorted(transcripts):
+            if usage["transcript"] <= max_transcript_bytes:
+                break
+            removed, freed = release_files([path])
+            usage["transcript"] -= size
+            stats["removed"] += removed
+            stats["bytes_freed"] += freed
+    if WORK_FOLDER_BYTES is not None:
+        for kind, value in usage.items():
+            WORK_FOLDER_BYTES.labels(kind).set(value)
+    return {**stats, **{f"{k}_bytes": v for k, v in usage.items()}}
+
+
+def sweep_due(folder: str, min_interval_seconds: float) -> bool:
+    """True at most once per min_interval_seconds per folder and process (polls can be seconds apart)."""
+    key = os.path.abspath(folder)
+    now = time.monotonic()
+    with _sweep_lock:
+        last = _last_sweep.get(key)
+        if last is not None and now - last < min_interval_seconds:
+            return False
+        _last_sweep[key] = now
+        return True
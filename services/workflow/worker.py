@@ -1,9 +1,13 @@
 from __future__ import annotations
-from time import sleep
+from time import monotonic, sleep
 
+import json
 import logging
 import debugpy
 import os
+import threading
+
+from services.poll_scheduler import poll_instance_id, shard_events
 
 level = os.getenv("DAPR_LOG_LEVEL", "info").upper()
 
@@ -22,7 +26,6 @@ root.setLevel(getattr(logging, level, logging.INFO))
 logger = logging.getLogger("workflow")
 
 def main():
-    from dapr.clients import DaprClient
     poll_interval = int(os.getenv("ONEDRIVE_VOICE_POLL_INTERVAL", "30"))
     offline_mode = os.getenv("OFFLINE_MODE", "false").lower() == "true"
     # Resolve all config at Tier 1 and pass it down (Tier 2/3 shouldn't read env for this)
@@ -39,6 +42,31 @@ def main():
     download_folder = os.getenv("LOCAL_VOICE_DOWNLOAD_FOLDER", "./.work/voice")
     # Optional: path to common terms file to bias transcription
     terms_file = os.getenv("TRANSCRIPTION_TERMS_FILE")
+    # Long recordings are split on silence into chunks of at most this many seconds
+    # (0 = only split files above the Whisper upload limit; MP3 input needs ffmpeg)
+    chunk_seconds = int(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "0"))
+    transcription_workers = int(os.getenv("TRANSCRIPTION_WORKERS", "4"))
+    # Downmix/resample/trim and encode to Opus before upload (needs ffmpeg with libopus)
+    preprocess_audio = os.getenv("TRANSCRIPTION_PREPROCESS", "false").lower() == "true"
+    # Handle todo/email intents with one structured LLM call; escalate to the orchestrator when unsure
+    fast_intent = os.getenv("FAST_INTENT", "false").lower() == "true"
+    # Publish the intent once the leading segment is transcribed; the rest is appended to the transcript afterwards
+    stream_transcription = os.getenv("TRANSCRIPTION_STREAMING", "false").lower() == "true"
+    stream_lead_seconds = int(os.getenv("TRANSCRIPTION_STREAM_LEAD_SECONDS", "30"))
+    # Max per-file child workflows in flight per poll (1 = sequential)
+    max_parallel_files = int(os.getenv("VOICE_MAX_PARALLEL_FILES", "4"))
+    # OneDrive: list only changes since the last poll via Graph delta query (opt-in; keeps a cursor in state)
+    incremental_listing = os.getenv("ONEDRIVE_VOICE_DELTA", "false").lower() == "true"
+    # OneDrive: archive all files of a poll cycle with Graph $batch instead of one move per child workflow
+    batch_archive = os.getenv("ONEDRIVE_VOICE_BATCH_ARCHIVE", "false").lower() == "true"
+
+    # Offline: hard-link (or reflink) inbox files into the work folder instead of copying ('copy' to disable)
+    local_handoff = os.getenv("LOCAL_VOICE_HANDOFF", "link").lower()
+    # Work folder retention: audio is released after archiving, transcripts kept within these budgets
+    release_work_files = os.getenv("VOICE_WORK_RELEASE_AUDIO", "true").lower() == "true"
+    work_max_transcript_bytes = int(float(os.getenv("VOICE_WORK_MAX_TRANSCRIPT_MB", "512")) * 1024 * 1024)
+    work_max_age_seconds = int(float(os.getenv("VOICE_WORK_MAX_AGE_DAYS", "30")) * 86400)
+    work_sweep_interval_seconds = int(os.getenv("VOICE_WORK_SWEEP_INTERVAL", "300"))
 
     # Ensure local dirs exist in offline mode for smoother testing
     if offline_mode:
@@ -47,33 +75,229 @@ def main():
         if archive_folder:
             os.makedirs(archive_folder, exist_ok=True)
 
+    # Partition the inbox by consistent hashing of file ids over this many shard polls per tick
+    # (set to the number of worker-voice2action replicas; 1 = one poll for the whole inbox)
+    shard_count = max(1, int(os.getenv("VOICE_SHARDS", "1")))
+
+    # Offline only: react to inbox changes instead of polling on a fixed interval
+    watch_mode = offline_mode and os.getenv("LOCAL_VOICE_WATCH", "false").lower() == "true"
+    # Tries to reach the Dapr sidecar at startup (exponential backoff) before exiting non-zero
+    client_attempts = max(1, int(os.getenv("DAPR_CLIENT_START_ATTEMPTS", "5")))
+    base_event = {
+        "offline_mode": offline_mode,
+        "inbox_folder": inbox_folder,
+        "archive_folder": archive_folder,
+        "download_folder": download_folder,
+        "terms_file": terms_file,
+        "chunk_seconds": chunk_seconds,
+        "transcription_workers": transcription_workers,
+        "max_parallel_files": max_parallel_files,
+        "incremental_listing": incremental_listing,
+        "batch_archive": batch_archive,
+        "preprocess_audio": preprocess_audio,
+        "fast_intent": fast_intent,
+        "stream_transcription": stream_transcription,
+        "stream_lead_seconds": stream_lead_seconds,
+        "local_handoff": local_handoff,
+        "release_work_files": release_work_files,
+        "work_max_transcript_bytes": work_max_transcript_bytes,
+        "work_max_age_seconds": work_max_age_seconds,
+        "work_sweep_interval_seconds": work_sweep_interval_seconds,
+    }
+
+    if watch_mode:
+        run_watch(base_event, shard_count, client_attempts)
+        return
+
+    # Opt-in: wait for each poll and adapt the interval to the inbox activity
+    if os.getenv("VOICE_POLL_ADAPTIVE", "false").lower() == "true":
+        run_adaptive(base_event, poll_interval, shard_count, client_attempts)
+        return
+
     sleep(poll_interval)
     
     try:
-        with DaprClient() as d:
+        with connect_dapr_client(client_attempts) as d:
             while True:
-                import json
-                event = {
-                    "offline_mode": offline_mode,
-                    "inbox_folder": inbox_folder,
-                    "archive_folder": archive_folder,
-                    "download_folder": download_folder,
-                    "terms_file": terms_file,
-                }
-                d.publish_event(
-                    pubsub_name="pubsub",
-                    topic_name="voice2action-schedule",
-                    data=json.dumps(event),
-                    data_content_type="application/json",
-                )
-                logger.info(
-                    f"Published schedule event to pubsub (mode={'offline' if offline_mode else 'onedrive'}): {event}"
-                )
+                for event in shard_events(base_event, poll_instance_id(poll_interval), shard_count):
+                    publish_schedule_event(d, event)
                 sleep(poll_interval)
     except KeyboardInterrupt:
         logger.info("Stopping...")
 
 
+def connect_dapr_client(attempts: int = 5, first_delay: float = 2.0):
+    """
+    Open a DaprClient, retrying with exponential backoff while the sidecar is not reachable.
+    The last error is raised, so the process exits non-zero and the supervisor restarts it.
+    """
+    from dapr.clients import DaprClient
+
+    delay = first_delay
+    for attempt in range(1, attempts + 1):
+        try:
+            return DaprClient()
+        except Exception as e:
+            if attempt >= attempts:
+                raise
+            logger.warning(f"Dapr client failed to start (attempt {attempt}/{attempts}): {e}; retrying in {delay:.0f}s")
+            sleep(delay)
+            delay = min(delay * 2, 60.0)
+    raise RuntimeError("attempts must be at least 1")
+
+
+def publish_schedule_event(d, event: dict) -> None:
+    d.publish_event(
+        pubsub_name="pubsub",
+        topic_name="voice2action-schedule",
+        data=json.dumps(event),
+        data_content_type="application/json",
+    )
+    logger.info(
+        f"Published schedule event to pubsub (mode={'offline' if event.get('offline_mode') else 'onedrive'}): {event}"
+    )
+
+
+def run_watch(base_event: dict, shard_count: int = 1, client_attempts: int = 5) -> None:
+    """Publish a schedule event carrying the specific files as soon as they land in the local inbox."""
+    from services.local_inbox_watcher import LocalInboxWatcher
+    from services.sharding import get_ring
+
+    settle_seconds = float(os.getenv("LOCAL_VOICE_WATCH_SETTLE_SECONDS", "1.0"))
+    scan_interval = float(os.getenv("LOCAL_VOICE_WATCH_SCAN_INTERVAL", "2.0"))
+    # Files still in the inbox this long after being handed off (failed hand-off or workflow) are handed off again
+    retry_seconds = float(os.getenv("LOCAL_VOICE_WATCH_RETRY_SECONDS", "300"))
+    with connect_dapr_client(client_attempts) as d:
+        def on_files(names):
+            # Sharded: one event per shard that owns any of the new files (local file id = name)
+            for shard, shard_names in sorted(get_ring(shard_count).partition(names).items()):
+                event = {**base_event, "files": shard_names, "poll_instance_id": poll_instance_id(1, files=shard_names)}
+                if shard_count > 1:
+                    event.update(shard_index=shard, shard_count=shard_count)
+                publish_schedule_event(d, event)
+
+        watcher = LocalInboxWatcher(
+            base_event["inbox_folder"],
+            on_files,
+            settle_seconds=settle_seconds,
+            scan_interval=scan_interval,
+            retry_seconds=retry_seconds,
+        )
+        watcher.start()
+        try:
+            while True:
+                sleep(1)
+        except KeyboardInterrupt:
+            logger.info("Stopping...")
+        finally:
+            watcher.stop()
+
+def fetch_poll_outcome(d, app_id: str, instance_id: str):
+    """Ask worker-voice2action (service invocation) for the status of a poll instance; None if unavailable."""
+    from services.poll_scheduler import PollOutcome
+
+    try:
+        resp = d.invoke_method(
+            app_id,
+            "poll_status",
+            data=json.dumps({"instance_id": instance_id}),
+            content_type="application/json",
+        )
+        body = json.loads(resp.text() or "{}")
+    except Exception as e:
+        logger.warning(f"Could not fetch status of poll {instance_id}: {e}")
+        return None
+    return PollOutcome(
+        status=body.get("status", "UNKNOWN"),
+        files=int(body.get("files") or 0),
+        failed=int(body.get("failed") or 0),
+    )
+
+
+def wait_for_poll(d, app_id: str, instance_id: str, check_interval: float, tick: float, not_found_grace: float):
+    """
+    Block until the poll instance reaches a terminal status, so polls never overlap.
+    Ticks that pass while it is still running are skipped. Returns None when the status
+    cannot be determined (e.g. the schedule event was not consumed within not_found_grace).
+    """
+    started = monotonic()
+    skipped = 0
+    while True:
+        sleep(check_interval)
+        outcome = fetch_poll_outcome(d, app_id, instance_id)
+        if outcome is None:
+            return None
+        if outcome.done:
+            return outcome
+        elapsed = monotonic() - started
+        if outcome.status == "NOT_FOUND" and elapsed > not_found_grace:
+            logger.warning(f"Poll {instance_id} not found after {elapsed:.0f}s; falling back to fixed interval")
+            return None
+        if elapsed > (skipped + 1) * tick:
+            skipped += 1
+            logger.info(f"Poll {instance_id} still {outcome.status.lower()}; skipping tick {skipped}")
+
+
+def run_adaptive(base_event: dict, poll_interval: int, shard_count: int = 1, client_attempts: int = 5) -> None:
+    """
+    Publish one schedule event at a time and pick the next delay from the previous poll's outcome:
+    fast while files keep coming, exponential backoff while the inbox is empty. With
+    ONEDRIVE_VOICE_WEBHOOK_URL set, Graph drive change notifications trigger a poll right away
+    and the timer only acts as a safety net. With shard_count > 1 every tick publishes one
+    event per shard and waits for all shard polls.
+    """
+    from services.poll_scheduler import AdaptivePollScheduler, combine_outcomes
+
+    scheduler = AdaptivePollScheduler(
+        base_interval=poll_interval,
+        min_interval=float(os.getenv("VOICE_POLL_MIN_INTERVAL", "5")),
+        max_interval=float(os.getenv("VOICE_POLL_MAX_INTERVAL", "600")),
+        factor=float(os.getenv("VOICE_POLL_BACKOFF_FACTOR", "2")),
+    )
+    app_id = os.getenv("VOICE2ACTION_APP_ID", "worker-voice2action")
+    wake = threading.Event()
+    notifications = None
+    webhook_url = os.getenv("ONEDRIVE_VOICE_WEBHOOK_URL")
+    if webhook_url and not base_event.get("offline_mode"):
+        from services.graph_notifications import DriveChangeNotifications
+
+        notifications = DriveChangeNotifications(
+            webhook_url, int(os.getenv("ONEDRIVE_VOICE_WEBHOOK_PORT", "5001")), on_change=wake.set
+        )
+        notifications.start()
+
+    delay: float = poll_interval
+    try:
+        with connect_dapr_client(client_attempts) as d:
+            while True:
+                if wake.wait(delay):
+                    logger.info("Drive change notification received; polling now")
+                wake.clear()
+                # Consecutive publishes are at least min_interval apart, so windows never collide
+                instance_id = poll_instance_id(scheduler.min_interval)
+                events = shard_events(base_event, instance_id, shard_count)
+                for event in events:
+                    publish_schedule_event(d, event)
+                outcome = combine_outcomes([
+                    wait_for_poll(
+                        d,
+                        app_id,
+                        event["poll_instance_id"],
+                        check_interval=scheduler.min_interval,
+                        tick=poll_interval,
+                        not_found_grace=max(poll_interval, 30),
+                    )
+                    for event in events
+                ])
+                delay = scheduler.next_delay(outcome)
+                logger.info(f"Poll {instance_id} outcome={outcome}; next poll in {delay:.0f}s")
+    except KeyboardInterrupt:
+        logger.info("Stopping...")
+    finally:
+        if notifications is not None:
+            notifications.stop()
+
+
 if __name__ == "__main__":
     if os.getenv("DEBUGPY_ENABLE", "0") == "1":
         debugpy.listen(("0.0.0.0", 5678))
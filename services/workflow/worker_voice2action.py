@@ -1,12 +1,17 @@
 import os
 import json
 import logging
-from time import sleep
 import threading
-import debugpy
+from typing import Optional
+
+# Per-module import timings (VOICE2ACTION_STARTUP_PROFILE=1); enabled before the imports below
+from services import startup_profile
+
+if os.getenv("VOICE2ACTION_STARTUP_PROFILE", "0") == "1":
+    startup_profile.enable()
 
 from cloudevents.sdk.event import v1
-from dapr.ext.grpc import App
+from dapr.ext.grpc import App, InvokeMethodRequest
 from dapr.clients.grpc._response import TopicEventResponse
 from dapr.ext.workflow import WorkflowRuntime, DaprWorkflowClient
 
@@ -17,11 +22,20 @@ from workflows.voice2action import (
 from activities.onedrive_inbox import (
     list_onedrive_inbox,
     mark_file_pending,
+    mark_files_pending,
     download_onedrive_file,
 )
-from activities.transcribe_audio import transcribe_audio_activity
+from activities.preprocess_audio import preprocess_audio_activity
+from activities.transcribe_audio import (
+    transcribe_audio_activity,
+    transcribe_leading_segment_activity,
+    transcribe_remainder_activity,
+)
+from activities.work_folder import enforce_work_folder_retention_activity, release_work_files_activity
+from activities.fast_intent import fast_intent_activity
 from activities.publish_intent_orchestrator import publish_intent_plan_activity
-from services.state_store import StateStore
+from services.telemetry import current_trace_parent, init_telemetry, span
+from services.activity_limits import ActivityLimiter, parse_limits
 
 # Root logging per repo convention
 level = os.getenv("DAPR_LOG_LEVEL", "info").upper()
@@ -40,6 +54,10 @@ logger = logging.getLogger("worker_voice2action")
 
 def build_runtime() -> WorkflowRuntime:
     """Build and register workflows/activities (no start)."""
+    # Per-stage limits, e.g. VOICE2ACTION_ACTIVITY_LIMITS="transcribe=4,download=16"
+    limiter = ActivityLimiter(parse_limits(os.getenv("VOICE2ACTION_ACTIVITY_LIMITS")))
+    logger.info("Activity limits %s", limiter.limits)
+    # dapr-ext-workflow 1.16 has no runtime-wide concurrency settings; the per-stage limiter bounds the work
     runtime = WorkflowRuntime()
     runtime.register_workflow(voice2action_poll_orchestrator)
     runtime.register_workflow(voice2action_per_file_orchestrator)
@@ -48,40 +66,96 @@ def build_runtime() -> WorkflowRuntime:
         list_local_inbox_activity,
         prepare_local_file_activity,
     )
-    runtime.register_activity(list_local_inbox_activity)
-    runtime.register_activity(prepare_local_file_activity)
-    runtime.register_activity(list_onedrive_inbox)
-    runtime.register_activity(download_onedrive_file)
     from activities.archive_recording import (
         archive_recording_local_activity,
         archive_recording_onedrive_activity,
+        archive_recordings_onedrive_batch_activity,
     )
-    runtime.register_activity(archive_recording_local_activity)
-    runtime.register_activity(archive_recording_onedrive_activity)
-    runtime.register_activity(mark_file_pending)
-    runtime.register_activity(transcribe_audio_activity)
-    runtime.register_activity(publish_intent_plan_activity)
+    for activity in (
+        list_local_inbox_activity,
+        prepare_local_file_activity,
+        list_onedrive_inbox,
+        download_onedrive_file,
+        archive_recording_local_activity,
+        archive_recording_onedrive_activity,
+        archive_recordings_onedrive_batch_activity,
+        mark_file_pending,
+        mark_files_pending,
+        preprocess_audio_activity,
+        transcribe_audio_activity,
+        transcribe_leading_segment_activity,
+        transcribe_remainder_activity,
+        fast_intent_activity,
+        publish_intent_plan_activity,
+        release_work_files_activity,
+        enforce_work_folder_retention_activity,
+    ):
+        # Wrapper keeps the activity name, so call_activity in the workflows still resolves it
+        runtime.register_activity(limiter.bounded(activity))
     return runtime
 
 
+# Set once WorkflowRuntime.start() returned, i.e. its work item stream to the sidecar is up
+runtime_ready = threading.Event()
+
+
 def start_runtime_async(runtime: WorkflowRuntime) -> None:
     """Start workflow runtime in a background thread so gRPC server can bind early.
 
-    We have at least one poll interval (~60s) before first schedule event, so
-    runtime should be fully started long before workflows are scheduled.
+    The app health check reports unhealthy until the runtime is connected, so the
+    sidecar only treats this replica as ready once it can actually run workflows. If the
+    runtime cannot connect, the process exits non-zero so the supervisor restarts it.
     """
     def _run():
         try:
             logger.info("Starting WorkflowRuntime asynchronously...")
             runtime.start()
+            runtime_ready.set()
             logger.info("WorkflowRuntime started.")
+            startup_profile.mark("workflow runtime connected")
+            startup_profile.report()
         except Exception:
-            logger.exception("WorkflowRuntime failed to start")
+            logger.exception("WorkflowRuntime failed to start; exiting")
+            # A failed start() leaves the worker's connection thread behind, so calling it again
+            # is not safe; a fresh process is. os._exit because the gRPC app owns the main thread.
+            logging.shutdown()
+            os._exit(1)
 
     t = threading.Thread(target=_run, name="workflow-runtime", daemon=True)
     t.start()
 
 
+def preload_transcription_backend() -> None:
+    """Load local Whisper weights in the background so the first recording does not wait for them."""
+    if os.getenv("TRANSCRIPTION_BACKEND", "openai").lower() != "local":
+        return
+
+    def _run():
+        try:
+            from services.transcription_backends import get_transcription_backend
+
+            get_transcription_backend("local").load()
+            logger.info("Local transcription model loaded.")
+        except Exception:
+            logger.exception("Preloading local transcription model failed; retrying on first use")
+
+    threading.Thread(target=_run, name="transcription-preload", daemon=True).start()
+
+
+_wf_client: Optional[DaprWorkflowClient] = None
+_wf_client_lock = threading.Lock()
+
+
+def get_workflow_client() -> DaprWorkflowClient:
+    """One DaprWorkflowClient (gRPC channel) for all schedule events and status queries."""
+    global _wf_client
+    if _wf_client is None:
+        with _wf_client_lock:
+            if _wf_client is None:
+                _wf_client = DaprWorkflowClient()
+    return _wf_client
+
+
 app = App()
 
 
@@ -95,52 +169,96 @@ def on_schedule_event(event: v1.Event) -> TopicEventResponse:
             except Exception:
                 pass
         data = json.loads(raw) if isinstance(raw, str) else raw
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise ValueError(f"Schedule event data must be a JSON object, got {type(data).__name__}")
         logger.info("Received pubsub event: %s", data)
 
-        # Idempotency using CloudEvent ID (at-least-once delivery)
+        # Idempotency (at-least-once delivery): the poll instance id is derived from the schedule
+        # window (or, for older publishers, the CloudEvent id), so the workflow engine itself
+        # rejects a second schedule of the same poll
         ce_id = None
         try:
             ce_id = event.EventID()
         except Exception:
             pass
-        store = StateStore()
-        if ce_id:
-            key = f"schedule_event:{ce_id}"
-            if store.get(key):
-                logger.info(
-                    "Duplicate delivery for event id=%s; already processed. Acking.", ce_id
+        instance_id = data.get("poll_instance_id") or (f"voice2action-poll-{ce_id}" if ce_id else None)
+
+        # Schedule workflow; the poll span continues the trace the sidecar attached to the event
+        try:
+            incoming_trace = (event.Extensions() or {}).get("traceparent")
+        except Exception:
+            incoming_trace = None
+        with span("voice2action.schedule", incoming_trace, **{"messaging.message.id": ce_id}) as s:
+            try:
+                instance_id = get_workflow_client().schedule_new_workflow(
+                    workflow=voice2action_poll_orchestrator,
+                    input={**data, "trace_parent": current_trace_parent()},
+                    instance_id=instance_id,
                 )
-                sleep(0.02)
-                return TopicEventResponse("success")
-
-        # Schedule workflow
-        wf_client = DaprWorkflowClient()
-        instance_id = wf_client.schedule_new_workflow(
-            workflow=voice2action_poll_orchestrator,
-            input=data or {},
-        )
+            except Exception as e:
+                if instance_id and "already exists" in str(e).lower():
+                    logger.info("Poll instance %s already scheduled (duplicate delivery); acking.", instance_id)
+                    return TopicEventResponse("success")
+                raise
+            if s is not None:
+                s.set_attribute("voice2action.instance_id", instance_id)
         logger.info("Scheduled poller workflow instance: %s", instance_id)
-        if ce_id:
-            store.set(f"schedule_event:{ce_id}", instance_id)
         return TopicEventResponse("success")
     except Exception as e:
         logger.exception("Failed to process schedule event: %s", e)
         return TopicEventResponse("retry")
 
 
-# Health check
-app.register_health_check(lambda: logger.info("Healthy") or None)
+@app.method(name="poll_status")
+def poll_status(request: InvokeMethodRequest) -> str:
+    """Report a poll instance's status and file counts to the adaptive scheduler in services/workflow/worker."""
+    instance_id = json.loads(request.text() or "{}").get("instance_id")
+    state = get_workflow_client().get_workflow_state(instance_id) if instance_id else None
+    if state is None:
+        return json.dumps({"instance_id": instance_id, "status": "NOT_FOUND"})
+    output = {}
+    if state.serialized_output:
+        try:
+            output = json.loads(state.serialized_output) or {}
+        except ValueError:
+            output = {}
+    return json.dumps(
+        {
+            "instance_id": instance_id,
+            "status": state.runtime_status.name,
+            "files": int(output.get("files") or 0),
+            "failed": int(output.get("failed") or 0),
+        }
+    )
+
+
+def health_check() -> None:
+    # Raising makes the gRPC health check fail, which the sidecar reports as not ready
+    if not runtime_ready.is_set():
+        raise RuntimeError("WorkflowRuntime not connected yet")
+
+
+app.register_health_check(health_check)
 
 
 if __name__ == "__main__":
     if os.getenv("DEBUGPY_ENABLE", "0") == "1":
+        import debugpy
+
         debugpy.listen(("0.0.0.0", 5678))
         print("debugpy: Waiting for debugger attach on port 5678...")
         debugpy.wait_for_client()
 
+    # OTLP spans + Prometheus /metrics (VOICE2ACTION_METRICS_PORT)
+    startup_profile.mark("imports done")
+    init_telemetry("worker-voice2action")
     runtime = build_runtime()
+    startup_profile.mark("runtime built")
     # Start runtime asynchronously to let gRPC app become reachable quickly for sidecar subscription discovery
     start_runtime_async(runtime)
+    preload_transcription_backend()
 
     port = int(os.environ.get("DAPR_APP_PORT", 5002))
     logger.info(f"Starting gRPC App on port {port} (worker-voice2action) ...")
@@ -0,0 +1,81 @@
+"""In-memory stand-ins for the Dapr state API with etag / first-write semantics."""
+
+from __future__ import annotations
+
+import threading
+import types
+from typing import Callable, Dict, Optional, Tuple
+
+import grpc
+
+
+class FakeRpcError(grpc.RpcError):
+    def __init__(self, status: grpc.StatusCode, message: str = ""):
+        super().__init__(message)
+        self._status = status
+
+    def code(self):
+        return self._status
+
+
+class FakeStateClient:
+    """get/save/bulk/transaction calls of DaprClient used by StateStore; etags are write counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data: Dict[str, Tuple[bytes, str]] = {}
+        self._version = 0
+        # Called before each conditional save; lets a test interleave a competing writer
+        self.before_save: Optional[Callable[[str], None]] = None
+        self.fail_with: Optional[grpc.StatusCode] = None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._version += 1
+            self.data[key] = (value.encode("utf-8"), str(self._version))
+
+    def value(self, key: str) -> Optional[str]:
+        item = self.data.get(key)
+        return item[0].decode("utf-8") if item else None
+
+    def get_state(self, store_name, key, **kwargs):
+        data, etag = self.data.get(key, (b"", ""))
+        return types.SimpleNamespace(data=data, etag=etag)
+
+    def get_bulk_state(self, store_name, keys, **kwargs):
+        items = []
+        for k in keys:
+            data, etag = self.data.get(k, (b"", ""))
+            items.append(types.SimpleNamespace(key=k, data=data, etag=etag, error=""))
+        return types.SimpleNamespace(items=items)
+
+    def save_state(self, store_name, key, value, etag=None, options=None, **kwargs):
+        if self.before_save is not None:
+            self.before_save(key)
+        if self.fail_with is not None:
+            raise FakeRpcError(self.fail_with, "injected failure")
+        with self._lock:
+            current = self.data.get(key)
+            if options is not None:
+                if etag is None and current is not None:
+                    raise FakeRpcError(grpc.StatusCode.ABORTED, f"key '{key}' exists")
+                if etag is not None and (current is None or current[1] != etag):
+                    raise FakeRpcError(grpc.StatusCode.ABORTED, f"etag mismatch for '{key}'")
+            self._version += 1
+            raw = value if isinstance(value, bytes) else str(value).encode("utf-8")
+            self.data[key] = (raw, str(self._version))
+
+    def save_bulk_state(self, store_name, states, **kwargs):
+        for s in states:
+            self.put(s.key, s.value)
+
+    def delete_state(self, store_name, key, **kwargs):
+        with self._lock:
+            self.data.pop(key, None)
+
+    def execute_state_transaction(self, store_name, operations, **kwargs):
+        for op in operations:
+            if op.data is None:
+                self.delete_state(store_name, op.key)
+            else:
+                self.put(op.key, op.data.decode("utf-8") if isinstance(op.data, bytes) else op.data)
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from services.activity_limits import ActivityLimiter, parse_limits
+
+
+def test_parse_limits_keeps_known_stages_and_ignores_the_rest():
+    assert parse_limits("transcribe=2, download=32,bogus=1,publish=x,list") == {"transcribe": 2, "download": 32}
+    assert parse_limits(None) == {} and parse_limits("") == {}
+
+
+def test_limiter_bounds_concurrency_per_stage():
+    limiter = ActivityLimiter({"transcribe": 2, "download": 0})
+    assert "download" not in limiter._semaphores
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def activity(ctx, input):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    activity.stage_name = "transcribe"
+    bounded = limiter.bounded(activity)
+    threads = [threading.Thread(target=bounded, args=(None, {})) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
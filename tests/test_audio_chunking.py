@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+pytest.importorskip("pydub")
+from pydub.generators import Sine  # noqa: E402
+
+import activities.transcribe_audio as transcribe_mod  # noqa: E402
+from models.voice2action import TranscriptionRequest, TranscriptionResult  # noqa: E402
+from services.audio_chunker import CHUNK_BYTES_PER_SECOND, max_chunk_ms_for, plan_cuts, split_on_silence  # noqa: E402
+
+
+def _wav(path, seconds, frame_rate=44100, channels=2):
+    audio = Sine(440).to_audio_segment(duration=seconds * 1000).set_frame_rate(frame_rate).set_channels(channels)
+    audio.export(path, format="wav")
+    return path
+
+
+def test_plan_cuts_prefers_latest_silence_in_window():
+    bounds = plan_cuts(100_000, [(20_000, 21_000), (25_000, 26_000)], max_chunk_ms=30_000)
+    assert bounds[0] == (0, 25_500)
+    assert bounds[1][0] == 25_500
+    assert bounds[-1][1] == 100_000
+
+
+def test_plan_cuts_hard_cut_overlaps_next_chunk():
+    bounds = plan_cuts(70_000, [], max_chunk_ms=30_000, overlap_ms=1500)
+    assert bounds[:2] == [(0, 30_000), (28_500, 58_500)]
+    assert all(end - start <= 30_000 for start, end in bounds)
+
+
+def test_max_chunk_ms_for_fits_upload_limit():
+    limit = 24 * 1024 * 1024
+    ms = max_chunk_ms_for(limit)
+    assert 44 + ms * CHUNK_BYTES_PER_SECOND // 1000 <= limit
+    assert max_chunk_ms_for(limit + CHUNK_BYTES_PER_SECOND) > ms
+
+
+def test_split_on_silence_short_file_within_size_is_not_split(tmp_path):
+    path = _wav(str(tmp_path / "short.wav"), 2, frame_rate=16000, channels=1)
+    assert split_on_silence(path, str(tmp_path / "chunks"), max_chunk_ms=60_000, max_bytes=1_000_000) == []
+
+
+def test_split_on_silence_large_but_short_file_is_transcoded(tmp_path):
+    # 3 s of 44.1 kHz stereo is ~530 kB: shorter than one chunk but above the (scaled down) limit
+    path = _wav(str(tmp_path / "large.wav"), 3)
+    max_bytes = 200_000
+    assert os.path.getsize(path) > max_bytes
+    chunks = split_on_silence(path, str(tmp_path / "chunks"), max_chunk_ms=60_000, max_bytes=max_bytes)
+    assert len(chunks) == 1
+    assert (chunks[0].start_ms, chunks[0].end_ms) == (0, 3000)
+    assert os.path.getsize(chunks[0].path) <= max_bytes
+
+
+def test_transcribe_with_chunking_never_uploads_above_limit(tmp_path, monkeypatch):
+    # 4 s of 44.1 kHz stereo against a limit that fits only ~2.5 s of 16 kHz mono
+    path = _wav(str(tmp_path / "memo.wav"), 4)
+    monkeypatch.setattr(transcribe_mod, "WHISPER_MAX_UPLOAD_BYTES", 80_000)
+    uploaded = []
+
+    def fake_transcribe(req):
+        uploaded.append(os.path.getsize(req.audio_path))
+        return TranscriptionResult(text=f"part{len(uploaded)}")
+
+    result = transcribe_mod.transcribe_with_chunking(
+        TranscriptionRequest(audio_path=path, mime_type="audio/x-wav"), chunk_seconds=0, transcribe_fn=fake_transcribe
+    )
+    assert len(uploaded) >= 2
+    assert max(uploaded) <= 80_000
+    assert result.segments and len(result.segments) == len(uploaded)
+
+
+@pytest.mark.filterwarnings("ignore:Couldn't find ffprobe")
+def test_undecodable_file_is_uploaded_whole(tmp_path):
+    # Not audio at all: without ffmpeg pydub fails with FileNotFoundError, with it CouldntDecodeError
+    path = tmp_path / "memo.mp3"
+    path.write_bytes(b"not really an mp3" * 100)
+    uploaded = []
+
+    def fake_transcribe(req):
+        uploaded.append(req.audio_path)
+        return TranscriptionResult(text="whole")
+
+    result = transcribe_mod.transcribe_with_chunking(
+        TranscriptionRequest(audio_path=str(path), mime_type="audio/mpeg"), chunk_seconds=300, transcribe_fn=fake_transcribe
+    )
+    assert uploaded == [str(path)] and result.text == "whole"
+
+
+def test_short_wav_within_chunk_seconds_is_not_decoded(tmp_path, monkeypatch):
+    path = _wav(str(tmp_path / "short.wav"), 2)
+
+    def no_split(*args, **kwargs):
+        raise AssertionError("split_on_silence should not run")
+
+    monkeypatch.setattr(transcribe_mod, "split_on_silence", no_split)
+    result = transcribe_mod.transcribe_with_chunking(
+        TranscriptionRequest(audio_path=path, mime_type="audio/x-wav"),
+        chunk_seconds=300,
+        transcribe_fn=lambda req: TranscriptionResult(text="whole"),
+    )
+    assert result.text == "whole"
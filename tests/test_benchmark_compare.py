@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("dapr.ext.workflow")
+from benchmarks.voice2action_offline import compare  # noqa: E402
+
+
+def _result(size, files_per_min, p95):
+    return {"size": size, "files_per_min": files_per_min, "stages": {"transcribe": {"p95_ms": p95}}}
+
+
+def test_within_tolerance_is_not_a_regression():
+    assert compare([_result(10, 90, 110)], [_result(10, 100, 100)], tolerance=0.2) == []
+
+
+def test_throughput_drop_and_p95_growth_are_reported():
+    regressions = compare([_result(10, 70, 130)], [_result(10, 100, 100)], tolerance=0.2)
+    assert len(regressions) == 2
+    assert "throughput" in regressions[0] and "transcribe" in regressions[1]
+
+
+def test_small_p95_jitter_and_unknown_sizes_are_ignored():
+    assert compare([_result(10, 100, 0.9)], [_result(10, 100, 0.3)], tolerance=0.2, min_delta_ms=1.0) == []
+    assert compare([_result(100, 1, 1000)], [_result(10, 100, 1)], tolerance=0.2) == []
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("dapr.ext.workflow")
+from models.voice2action import FileRef  # noqa: E402
+from workflows.voice2action import child_instance_id  # noqa: E402
+
+
+def test_child_instance_id_is_deterministic_per_file_version():
+    f = FileRef(id="f1", name="memo.wav", etag="v1")
+    assert child_instance_id("poll-1", f) == child_instance_id("poll-1", f.model_copy())
+    assert child_instance_id("poll-1", f).startswith("poll-1-file-")
+
+
+def test_child_instance_id_changes_with_etag_and_file():
+    f = FileRef(id="f1", name="memo.wav", etag="v1")
+    assert child_instance_id("poll-1", f) != child_instance_id("poll-1", f.model_copy(update={"etag": "v2"}))
+    assert child_instance_id("poll-1", f) != child_instance_id("poll-1", f.model_copy(update={"id": "f2"}))
@@ -0,0 +1,72 @@
+import hashlib
+
+import httpx
+
+from services.http_client import HttpClient
+
+BODY = b"0123456789" * 100
+
+
+def _client(handler):
+    client = HttpClient()
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _server(etag='"v1"', body=BODY, seen=None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if seen is not None:
+            seen.append(dict(request.headers))
+        rng = request.headers.get("range")
+        if rng and request.headers.get("if-range") == etag:
+            start = int(rng.split("=")[1].rstrip("-"))
+            if start >= len(body):
+                return httpx.Response(416, headers={"Content-Range": f"bytes */{len(body)}"})
+            return httpx.Response(
+                206, content=body[start:], headers={"Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}", "ETag": etag}
+            )
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+    return handler
+
+
+def _part(tmp_path, data, etag='"v1"'):
+    dest = tmp_path / "a.bin"
+    (tmp_path / "a.bin.part").write_bytes(data)
+    if etag:
+        (tmp_path / "a.bin.part.etag").write_text(etag)
+    return str(dest)
+
+
+def test_resume_sends_if_range_and_appends(tmp_path):
+    seen = []
+    dest = _part(tmp_path, BODY[:300])
+    result = _client(_server(seen=seen)).download("http://x/f", dest)
+    assert seen[0]["range"] == "bytes=300-" and seen[0]["if-range"] == '"v1"'
+    assert open(dest, "rb").read() == BODY
+    assert result["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert not (tmp_path / "a.bin.part.etag").exists()
+
+
+def test_changed_content_restarts_from_zero(tmp_path):
+    dest = _part(tmp_path, b"stale" * 10, etag='"v0"')
+    result = _client(_server()).download("http://x/f", dest)
+    assert open(dest, "rb").read() == BODY
+    assert result["bytes"] == len(BODY)
+
+
+def test_part_without_etag_is_not_resumed(tmp_path):
+    seen = []
+    dest = _part(tmp_path, b"junk", etag=None)
+    _client(_server(seen=seen)).download("http://x/f", dest)
+    assert "range" not in seen[0]
+    assert open(dest, "rb").read() == BODY
+
+
+def test_416_accepts_only_a_complete_part(tmp_path):
+    dest = _part(tmp_path, BODY)
+    assert _client(_server()).download("http://x/f", dest)["bytes"] == len(BODY)
+
+    # Longer than the content: the part is wrong, so the download starts over
+    dest = _part(tmp_path, BODY + b"extra")
+    assert _client(_server()).download("http://x/f", dest)["bytes"] == len(BODY)
+    assert open(dest, "rb").read() == BODY
@@ -0,0 +1,97 @@
+import json
+import time
+
+import grpc
+import pytest
+
+import services.state_store as state_store
+from activities.inbox_state import PENDING_PREFIX, claim_files, filter_new_files, lease_active, mark_downloaded
+from models.voice2action import FileRef
+from tests.fakes import FakeStateClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeStateClient()
+    monkeypatch.setattr(state_store, "_client", fake)
+    return fake
+
+
+def _lease(owner, expires):
+    return json.dumps({"owner": owner, "expires": expires})
+
+
+def test_claim_absent_keys_first_owner_wins(client):
+    store = state_store.StateStore()
+    assert store.claim(["a", "b"], "poll-1", 60) == ["a", "b"]
+    assert store.claim(["a", "b", "c"], "poll-2", 60) == ["c"]
+    assert json.loads(client.value("a"))["owner"] == "poll-1"
+
+
+def test_claim_retry_by_same_owner_keeps_keys(client):
+    store = state_store.StateStore()
+    store.claim(["a"], "poll-1", 60)
+    assert store.claim(["a"], "poll-1", 60) == ["a"]
+
+
+def test_claim_takes_over_expired_lease(client):
+    client.put("a", _lease("crashed", time.time() - 1))
+    assert state_store.StateStore().claim(["a"], "poll-2", 60) == ["a"]
+    assert json.loads(client.value("a"))["owner"] == "poll-2"
+
+
+def test_claim_never_takes_over_active_or_legacy_marker(client):
+    client.put("a", _lease("poll-1", time.time() + 60))
+    client.put("b", "1")
+    assert state_store.StateStore().claim(["a", "b"], "poll-2", 60) == []
+
+
+def test_claim_loses_race_on_insert(client):
+    # Another poll inserts the key between our read and our conditional write
+    def competitor(key):
+        client.before_save = None
+        client.put(key, _lease("poll-1", time.time() + 60))
+
+    client.before_save = competitor
+    assert state_store.StateStore().claim(["a"], "poll-2", 60) == []
+    assert json.loads(client.value("a"))["owner"] == "poll-1"
+
+
+def test_claim_loses_race_on_expired_takeover(client):
+    client.put("a", _lease("crashed", time.time() - 1))
+
+    def competitor(key):
+        client.before_save = None
+        client.put(key, _lease("poll-1", time.time() + 60))
+
+    client.before_save = competitor
+    assert state_store.StateStore().claim(["a"], "poll-2", 60) == []
+
+
+def test_claim_raises_on_sidecar_failure(client):
+    client.fail_with = grpc.StatusCode.UNAVAILABLE
+    with pytest.raises(grpc.RpcError):
+        state_store.StateStore().claim(["a"], "poll-1", 60)
+
+
+def test_lease_active():
+    now = 1000.0
+    assert not lease_active(None, now)
+    assert lease_active("1", now)
+    assert lease_active(_lease("x", now + 1), now)
+    assert not lease_active(_lease("x", now - 1), now)
+    assert lease_active(_lease("x", 0), now)  # never expires
+
+
+def test_claim_files_and_filter_new_files(client):
+    store = state_store.StateStore()
+    assert claim_files(store, ["f1", "f2"], "poll-1") == ["f1", "f2"]
+    client.put(PENDING_PREFIX + "f2", _lease("crashed", time.time() - 1))
+    mark_downloaded(store, "f1")
+    files = [FileRef(id=i, name=f"{i}.wav") for i in ("f1", "f2", "f3")]
+    client.put(PENDING_PREFIX + "f3", _lease("poll-9", time.time() + 60))
+    held = []
+    new, downloaded, pending = filter_new_files(store, files, held)
+    assert [f.id for f in new] == ["f2"]
+    assert (downloaded, pending) == (1, 1)
+    assert [f.id for f in held] == ["f3"]
@@ -0,0 +1,33 @@
+import os
+
+from services.local_inbox import link_or_copy, move_file_to_local_archive
+
+
+def test_link_or_copy_hard_links_on_same_filesystem(tmp_path):
+    src = tmp_path / "inbox.wav"
+    src.write_bytes(b"audio")
+    dst = tmp_path / "work.wav"
+    dst.write_bytes(b"stale")
+    assert link_or_copy(str(src), str(dst)) == "hardlink"
+    assert os.path.samefile(src, dst)
+
+
+def test_link_or_copy_copy_mode(tmp_path):
+    src = tmp_path / "inbox.wav"
+    src.write_bytes(b"audio")
+    dst = tmp_path / "work.wav"
+    assert link_or_copy(str(src), str(dst), mode="copy") == "copy"
+    assert not os.path.samefile(src, dst)
+    assert dst.read_bytes() == b"audio"
+
+
+def test_archive_renames_hard_linked_work_file(tmp_path):
+    inbox, archive, work = tmp_path / "inbox", tmp_path / "archive", tmp_path / "work"
+    for d in (inbox, archive, work):
+        d.mkdir()
+    (inbox / "memo.wav").write_bytes(b"audio")
+    link_or_copy(str(inbox / "memo.wav"), str(work / "memo.wav"))
+    dst = move_file_to_local_archive("memo.wav", str(inbox), str(archive), work_path=str(work / "memo.wav"))
+    assert dst == str(archive / "memo.wav")
+    assert not (inbox / "memo.wav").exists() and not (work / "memo.wav").exists()
+    assert (archive / "memo.wav").read_bytes() == b"audio"
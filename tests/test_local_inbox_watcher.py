@@ -0,0 +1,41 @@
+import time
+
+from services.local_inbox_watcher import LocalInboxWatcher
+
+
+def _watcher(folder, **kwargs):
+    return LocalInboxWatcher(str(folder), on_files=lambda names: None, settle_seconds=0, **kwargs)
+
+
+def _ready(watcher):
+    watcher._scan()
+    watcher._tick()  # records size/mtime
+    return watcher._tick()
+
+
+def test_settled_audio_files_are_reported_once(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    watcher = _watcher(tmp_path)
+    assert _ready(watcher) == ["a.wav"]
+    assert _ready(watcher) == []
+
+
+def test_file_left_in_inbox_is_reported_again_after_retry_seconds(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"x")
+    watcher = _watcher(tmp_path, retry_seconds=0.05)
+    assert _ready(watcher) == ["a.wav"]
+    assert _ready(watcher) == []
+    time.sleep(0.06)
+    assert _ready(watcher) == ["a.wav"]
+
+
+def test_archived_file_is_forgotten_so_a_reupload_is_seen(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"x")
+    watcher = _watcher(tmp_path, retry_seconds=0)
+    assert _ready(watcher) == ["a.wav"]
+    path.unlink()
+    assert _ready(watcher) == []
+    path.write_bytes(b"xy")
+    assert _ready(watcher) == ["a.wav"]
@@ -0,0 +1,49 @@
+import logging
+
+import httpx
+
+import services.onedrive as onedrive
+from services.http_client import HttpClient
+
+BASE = "https://graph.microsoft.com/v1.0/me"
+
+
+def _service(handler):
+    svc = onedrive.OneDriveService.__new__(onedrive.OneDriveService)
+    svc.base_url = BASE
+    svc.logger = logging.getLogger("onedrive")
+    svc.http = HttpClient()
+    svc.http._client = httpx.Client(transport=httpx.MockTransport(handler))
+    svc._headers = lambda: {"Authorization": "Bearer t"}
+    return svc
+
+
+def _item(item_id="f1", url="https://dl.example/f1?tempauth=x"):
+    return {"id": item_id, "name": "memo.wav", "file": {}, "@microsoft.graph.downloadUrl": url}
+
+
+def test_listed_urls_stay_out_of_file_refs_and_are_used_once(tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, content=b"audio")
+
+    svc = _service(handler)
+    onedrive._remember_download_urls([_item()])
+    assert "tempauth" not in svc._to_file_ref(_item()).model_dump_json()
+    svc.download_item("f1", str(tmp_path / "a.wav"))
+    svc.download_item("f1", str(tmp_path / "b.wav"))
+    assert seen == ["https://dl.example/f1?tempauth=x", f"{BASE}/drive/items/f1/content"]
+
+
+def test_rejected_listed_url_falls_back_to_the_content_endpoint(tmp_path):
+    def handler(request):
+        if request.url.host == "dl.example":
+            return httpx.Response(401)
+        assert request.headers["authorization"] == "Bearer t"
+        return httpx.Response(200, content=b"audio")
+
+    svc = _service(handler)
+    onedrive._remember_download_urls([_item("f2", "https://dl.example/f2")])
+    assert svc.download_item("f2", str(tmp_path / "c.wav"))["bytes"] == 5
@@ -0,0 +1,72 @@
+import json
+import time
+
+import pytest
+
+import services.onedrive as onedrive
+import services.state_store as state_store
+from activities.inbox_state import DELTA_PREFIX, PENDING_PREFIX
+from activities.onedrive_inbox import list_onedrive_inbox, mark_files_pending
+from models.voice2action import FileRef
+from tests.fakes import FakeStateClient
+
+
+class FakeOneDrive:
+    """Delta listing that reports nothing new: only the pending index can bring a file back."""
+
+    changes: list = []
+    removed: list = []
+    inbox: list = []
+
+    def __init__(self):
+        self.session = type("S", (), {"has_cached_account": staticmethod(lambda: True)})()
+
+    def list_folder_changes(self, delta_link, folder_id, removed=None):
+        if removed is not None:
+            removed.update(self.removed)
+        return list(self.changes), delta_link + "+1"
+
+    def latest_delta_link(self, folder):
+        return "delta-0"
+
+    def resolve_folder_id(self, folder):
+        return "folder"
+
+    def list_folder(self, folder):
+        return list(self.inbox)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeStateClient()
+    monkeypatch.setattr(state_store, "_client", fake)
+    monkeypatch.setattr(onedrive, "OneDriveService", FakeOneDrive)
+    FakeOneDrive.changes, FakeOneDrive.removed, FakeOneDrive.inbox = [], [], []
+    return fake
+
+
+def _poll(owner):
+    listed = list_onedrive_inbox(None, {"inbox_folder": "/Inbox", "incremental": True})
+    ids = [f["id"] for f in listed["files"]]
+    claimed = mark_files_pending(None, {"file_ids": ids, "owner": owner, "checkpoint": listed["checkpoint"]})
+    return claimed["claimed"]
+
+
+def test_delta_listing_reclaims_file_after_lease_lapses(client):
+    FakeOneDrive.inbox = [FileRef(id="f1", name="memo.wav")]
+    assert _poll("poll-1") == ["f1"]  # first run: full scan
+    # poll-1 crashes; while its lease holds, delta polls do not hand the file out again
+    assert _poll("poll-2") == []
+    pending_key = PENDING_PREFIX + "f1"
+    client.put(pending_key, json.dumps({"owner": "poll-1", "expires": time.time() - 1}))
+    assert _poll("poll-3") == ["f1"]
+
+
+def test_delta_listing_drops_removed_files_from_pending_index(client):
+    FakeOneDrive.inbox = [FileRef(id="f1", name="memo.wav")]
+    _poll("poll-1")
+    FakeOneDrive.removed = ["f1"]
+    client.put(PENDING_PREFIX + "f1", json.dumps({"owner": "poll-1", "expires": time.time() - 1}))
+    assert _poll("poll-2") == []
+    cursor = json.loads(client.value(DELTA_PREFIX + "/Inbox"))
+    assert cursor["pending"] == {}
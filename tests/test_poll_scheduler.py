@@ -0,0 +1,31 @@
+from services.poll_scheduler import AdaptivePollScheduler, PollOutcome, combine_outcomes, shard_events
+
+
+def test_combine_outcomes_unknown_when_any_shard_unknown():
+    assert combine_outcomes([PollOutcome("COMPLETED", files=1), None]) is None
+    assert combine_outcomes([]) is None
+
+
+def test_combine_outcomes_sums_and_reports_first_failure():
+    combined = combine_outcomes([
+        PollOutcome("COMPLETED", files=2),
+        PollOutcome("FAILED", files=1, failed=1),
+    ])
+    assert combined == PollOutcome("FAILED", files=3, failed=1)
+
+
+def test_shard_events_one_per_shard_with_distinct_instance_ids():
+    events = shard_events({"offline_mode": True}, "voice2action-poll-1", 3)
+    assert [e["shard_index"] for e in events] == [0, 1, 2]
+    assert len({e["poll_instance_id"] for e in events}) == 3
+    assert shard_events({}, "voice2action-poll-1", 1) == [{"poll_instance_id": "voice2action-poll-1"}]
+
+
+def test_adaptive_scheduler_backs_off_when_empty_and_speeds_up_with_files():
+    scheduler = AdaptivePollScheduler(base_interval=30, min_interval=5, max_interval=120)
+    assert scheduler.next_delay(PollOutcome("COMPLETED", files=3)) == 5
+    assert scheduler.next_delay(PollOutcome("COMPLETED")) == 30
+    assert scheduler.next_delay(PollOutcome("COMPLETED")) == 60
+    assert scheduler.next_delay(PollOutcome("FAILED")) == 120
+    assert scheduler.next_delay(PollOutcome("COMPLETED")) == 120
+    assert scheduler.next_delay(None) == 30
@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+pytest.importorskip("dapr.clients")
+from activities.publish_intent_orchestrator import build_intent_task, publish_intent_plan_activity  # noqa: E402
+
+
+def test_build_intent_task_carries_fields_and_trims_excerpt():
+    task = build_intent_task("wf-1", "/t/a.json", "word " * 200)
+    fields = json.loads(task.split(": ", 1)[1])
+    assert fields["correlation_id"] == "wf-1"
+    assert fields["transcription_path"] == "/t/a.json"
+    assert fields["excerpt"].endswith(" ...")
+
+
+def test_publish_requires_correlation_id_and_transcription_path():
+    with pytest.raises(ValueError):
+        publish_intent_plan_activity(None, {"correlation_id": "wf-1"})
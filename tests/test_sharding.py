@@ -0,0 +1,25 @@
+from services.sharding import HashRing, get_ring, owned, shard_suffix
+
+IDS = [f"file-{i}" for i in range(2000)]
+
+
+def test_every_file_has_exactly_one_owner():
+    ring = get_ring(4)
+    owners = [[s for s in range(4) if owned(f, s, 4)] for f in IDS]
+    assert all(len(o) == 1 and o[0] == ring.shard_of(f) for f, o in zip(IDS, owners))
+    # Virtual nodes keep the split reasonably even
+    sizes = [len(v) for v in ring.partition(IDS).values()]
+    assert min(sizes) > len(IDS) / 4 * 0.6
+
+
+def test_growing_the_ring_only_moves_files_to_the_new_shard():
+    before, after = HashRing(3), HashRing(4)
+    moved = [f for f in IDS if before.shard_of(f) != after.shard_of(f)]
+    assert all(after.shard_of(f) == 3 for f in moved)
+    assert len(moved) < len(IDS) / 4 * 1.5
+
+
+def test_unsharded_owns_everything_and_has_no_suffix():
+    assert owned("anything", None, 4) and owned("anything", 0, 1)
+    assert shard_suffix(None, 4) == "" and shard_suffix(0, 1) == ""
+    assert shard_suffix(2, 4) == "-s2of4"
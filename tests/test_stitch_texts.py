@@ -0,0 +1,16 @@
+from services.chunked_transcription import stitch_texts
+
+
+def test_drops_words_repeated_across_an_overlapping_boundary():
+    assert stitch_texts(["call the office today", "Office, today. Then email Bob"]) == (
+        "call the office today Then email Bob"
+    )
+
+
+def test_keeps_repeats_when_chunks_do_not_overlap():
+    assert stitch_texts(["yes yes", "yes no"], overlapped=[False, False]) == "yes yes yes no"
+
+
+def test_overlap_search_is_bounded_and_skips_empty_chunks():
+    assert stitch_texts(["a b c", "", "c d"], max_overlap_words=1) == "a b c d"
+    assert stitch_texts(["a b c", "b c d"], max_overlap_words=1) == "a b c b c d"
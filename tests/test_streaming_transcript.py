@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import activities.transcribe_audio as transcribe_mod
+from models.voice2action import TranscriptionResult
+
+
+def _partial_transcript(path):
+    path.write_text(TranscriptionResult(text="lead", partial=True).model_dump_json(), encoding="utf-8")
+    return str(path)
+
+
+def test_remainder_failure_writes_terminal_error_state(tmp_path, monkeypatch):
+    json_path = _partial_transcript(tmp_path / "a.json")
+
+    def fail(req, **kwargs):
+        raise RuntimeError("upload rejected")
+
+    monkeypatch.setattr(transcribe_mod, "transcribe_with_chunking", fail)
+    with pytest.raises(RuntimeError):
+        transcribe_mod.transcribe_remainder_activity(
+            None, {"transcription_path": json_path, "rest_path": str(tmp_path / "rest.wav")}
+        )
+    data = json.loads((tmp_path / "a.json").read_text(encoding="utf-8"))
+    assert data["partial"] is False
+    assert "upload rejected" in data["error"]
+    assert data["text"] == "lead"
+
+
+def test_read_transcription_flags_incomplete_transcripts(tmp_path):
+    facilitator = pytest.importorskip("services.intent_orchestrator.agent_facilitator")
+    read = facilitator.retrieve_transcription.func
+
+    path = tmp_path / "t.json"
+    path.write_text(json.dumps({"text": "lead", "partial": True}), encoding="utf-8")
+    assert read(str(path)).startswith("[Transcript incomplete: still being transcribed")
+
+    path.write_text(json.dumps({"text": "lead", "partial": False, "error": "boom"}), encoding="utf-8")
+    text = read(str(path))
+    assert text.startswith("[Transcript incomplete: boom") and text.endswith("lead")
+
+    path.write_text(json.dumps({"text": "full"}), encoding="utf-8")
+    assert read(str(path)) == "full"
+
+
+def test_lead_activity_falls_back_to_full_transcription_when_decoding_fails(tmp_path, monkeypatch):
+    audio = tmp_path / "memo.mp3"
+    audio.write_bytes(b"mp3")
+
+    def no_ffprobe(*args, **kwargs):
+        raise FileNotFoundError("ffprobe")
+
+    monkeypatch.setattr(transcribe_mod, "TranscriptionCache", lambda: type("Off", (), {"enabled": False})())
+    monkeypatch.setattr(transcribe_mod, "split_lead", no_ffprobe)
+    monkeypatch.setattr(transcribe_mod, "transcribe_with_chunking", lambda req, **kw: TranscriptionResult(text="whole"))
+    out = transcribe_mod.transcribe_leading_segment_activity(None, {"audio_path": str(audio)})
+    assert out["complete"] is True and out["text"] == "whole"
+    data = json.loads((tmp_path / "memo.json").read_text(encoding="utf-8"))
+    assert data["text"] == "whole" and not data.get("partial")
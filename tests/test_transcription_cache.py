@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import services.state_store as state_store
+import services.transcription_cache as cache_mod
+from models.voice2action import TranscriptionResult
+from services.state_store import StateStore
+from services.transcription_cache import CACHE_PREFIX, INDEX_KEY, TranscriptionCache
+from tests.fakes import FakeStateClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeStateClient()
+    monkeypatch.setattr(state_store, "_client", fake)
+    return fake
+
+
+def _result(n):
+    return TranscriptionResult(text="x" * n)
+
+
+def _size(n):
+    return len(_result(n).model_dump_json(exclude_none=True).encode("utf-8"))
+
+
+def test_evicts_least_recently_used_to_stay_within_the_byte_budget(client):
+    cache = TranscriptionCache(StateStore(), max_bytes=_size(100) * 2)
+    cache.put("a", _result(100))
+    cache.put("b", _result(100))
+    assert cache.get("a") is not None  # a is now more recent than b
+    cache.put("c", _result(100))
+    assert client.value(CACHE_PREFIX + "b") is None
+    assert set(json.loads(client.value(INDEX_KEY))) == {"a", "c"}
+    assert cache.get("b") is None
+
+
+def test_concurrent_index_update_is_retried_not_overwritten(client):
+    store = StateStore()
+    cache = TranscriptionCache(store, max_bytes=10_000)
+    cache.put("a", _result(10))
+    other = TranscriptionCache(StateStore(), max_bytes=10_000)
+
+    def competing_put(key):
+        # Another replica updates the index between our read and our write, once
+        if key == INDEX_KEY and client.before_save is not None:
+            client.before_save = None
+            other.put("b", _result(10))
+
+    client.before_save = competing_put
+    cache.put("c", _result(10))
+    assert set(json.loads(client.value(INDEX_KEY))) == {"a", "b", "c"}
+
+
+def test_hits_misses_and_evictions_are_counted(client, monkeypatch):
+    counters = cache_mod._Counters()
+    monkeypatch.setattr(cache_mod, "counters", counters)
+    cache = TranscriptionCache(StateStore(), max_bytes=_size(10))
+    cache.put("a", _result(10))
+    cache.get("a")
+    cache.get("missing")
+    cache.put("b", _result(10))
+    assert counters.snapshot() == {"hits": 1, "misses": 1, "evictions": 1}
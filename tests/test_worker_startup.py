@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("dapr.clients")
+import dapr.clients  # noqa: E402
+
+from services.workflow import worker  # noqa: E402
+
+
+def test_connect_dapr_client_retries_then_gives_up(monkeypatch):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError("sidecar not ready")
+
+    monkeypatch.setattr(dapr.clients, "DaprClient", fail)
+    monkeypatch.setattr(worker, "sleep", lambda s: None)
+    with pytest.raises(RuntimeError):
+        worker.connect_dapr_client(attempts=3)
+    assert len(calls) == 3
+
+
+def test_connect_dapr_client_returns_once_connected(monkeypatch):
+    results = iter([RuntimeError("not yet"), "client"])
+
+    def flaky():
+        r = next(results)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+    monkeypatch.setattr(dapr.clients, "DaprClient", flaky)
+    monkeypatch.setattr(worker, "sleep", lambda s: None)
+    assert worker.connect_dapr_client(attempts=3) == "client"
@@ -1,21 +1,30 @@
 from __future__ import annotations
 
 from typing import List, Optional
-from dapr.ext.workflow import DaprWorkflowContext
+from dapr.ext.workflow import DaprWorkflowContext, when_any
+import hashlib
 import os
 import logging
-from models.voice2action import ListInboxRequest, FileRef, DownloadRequest, MarkPendingRequest
+from models.voice2action import ListInboxRequest, FileRef, DownloadRequest, MarkPendingBatchRequest
 from activities.onedrive_inbox import (
     list_onedrive_inbox,
-    mark_file_pending,
+    mark_files_pending,
     download_onedrive_file,
 )
 
-from activities.transcribe_audio import transcribe_audio_activity
+from activities.preprocess_audio import preprocess_audio_activity
+from activities.transcribe_audio import (
+    transcribe_audio_activity,
+    transcribe_leading_segment_activity,
+    transcribe_remainder_activity,
+)
+from activities.fast_intent import fast_intent_activity
 from activities.publish_intent_orchestrator import publish_intent_plan_activity
+from activities.work_folder import enforce_work_folder_retention_activity, release_work_files_activity
 from activities.archive_recording import (
     archive_recording_local_activity,
     archive_recording_onedrive_activity,
+    archive_recordings_onedrive_batch_activity,
 )
 
 logger = logging.getLogger("voice2action")
@@ -49,7 +58,9 @@ def voice2action_poll_orchestrator(ctx: DaprWorkflowContext, input: Optional[dic
     offline_mode = bool(cfg.get("offline_mode", False))
     inbox_folder = cfg.get("inbox_folder")
     terms_file = cfg.get("terms_file")
-    wf_log(ctx, "voice2action_poll: polling folder=%s", inbox_folder)
+    # W3C traceparent from the schedule handler; activities open their spans under it
+    trace_parent = cfg.get("trace_parent")
+    wf_log(ctx, "voice2action_poll: polling folder=%s shard=%s/%s", inbox_folder, cfg.get("shard_index"), cfg.get("shard_count") or 1)
     try:
         if offline_mode:
             from activities.local_inbox import list_local_inbox_activity
@@ -58,45 +69,194 @@ def voice2action_poll_orchestrator(ctx: DaprWorkflowContext, input: Optional[dic
             activity_fn = list_onedrive_inbox
         files_result = yield ctx.call_activity(
             activity=activity_fn,
-            input=ListInboxRequest(inbox_folder=inbox_folder).model_dump(),
+            input={
+                **ListInboxRequest(
+                    inbox_folder=inbox_folder,
+                    incremental=bool(cfg.get("incremental_listing", False)),
+                    file_names=cfg.get("files"),
+                    shard_index=cfg.get("shard_index"),
+                    shard_count=int(cfg.get("shard_count") or 1),
+                ).model_dump(),
+                "trace_parent": trace_parent,
+            },
         )
-        wf_log(ctx, "voice2action_poll: files_result=%s", files_result)
+        if files_result.get("error"):
+            wf_log(ctx, "voice2action_poll: listing failed: %s", files_result["error"])
         files = [FileRef.model_validate(f) for f in files_result.get("files", [])]
         wf_log(ctx, "voice2action_poll: %d new files detected", len(files))
-        for f in files:
-            wf_log(ctx, "voice2action_poll: scheduling file id=%s name=%s", f.id, f.name)
+        if not files:
+            wf_log(ctx, "voice2action_poll: completed cycle, files=0")
+            return {"polled": True, "files": 0, "results": []}
+        # One batched claim for the whole poll; only files this poll won are processed
+        try:
+            claim_result = yield ctx.call_activity(
+                activity=mark_files_pending,
+                input={
+                    **MarkPendingBatchRequest(
+                        file_ids=[f.id for f in files],
+                        owner=ctx.instance_id,
+                        checkpoint=files_result.get("checkpoint"),
+                    ).model_dump(),
+                    "trace_parent": trace_parent,
+                },
+            )
+        except Exception as e:
+            wf_log_exception(ctx, "Exception in mark_files_pending", e)
+            raise
+        claimed = set(claim_result.get("claimed") or [])
+        if len(claimed) < len(files):
+            wf_log(ctx, "voice2action_poll: %d files claimed by another poll", len(files) - len(claimed))
+        files = [f for f in files if f.id in claimed]
+        if not files:
+            wf_log(ctx, "voice2action_poll: completed cycle, files=0")
+            return {"polled": True, "files": 0, "results": []}
+        child_config = {
+            "offline_mode": offline_mode,
+            "inbox_folder": inbox_folder,
+            "archive_folder": cfg.get("archive_folder"),
+            "download_folder": cfg.get("download_folder"),
+            "terms_file": terms_file,
+            "chunk_seconds": cfg.get("chunk_seconds"),
+            "transcription_workers": cfg.get("transcription_workers"),
+            "batch_archive": bool(cfg.get("batch_archive", False)),
+            "preprocess_audio": bool(cfg.get("preprocess_audio", False)),
+            "fast_intent": bool(cfg.get("fast_intent", False)),
+            "stream_transcription": bool(cfg.get("stream_transcription", False)),
+            "stream_lead_seconds": cfg.get("stream_lead_seconds"),
+            "local_handoff": cfg.get("local_handoff"),
+            "release_work_files": bool(cfg.get("release_work_files", True)),
+            "trace_parent": trace_parent,
+        }
+        # Fan-out/fan-in: keep at most max_parallel_files children in flight (1 = sequential)
+        max_parallel = max(1, int(cfg.get("max_parallel_files") or 1))
+        results = yield from _fan_out_per_file(ctx, files, child_config, max_parallel)
+        if child_config["batch_archive"] and not offline_mode:
+            yield from _archive_batch(ctx, results, inbox_folder, cfg.get("archive_folder"), trace_parent)
+            if child_config["release_work_files"]:
+                yield from _release_batch(ctx, results, trace_parent)
+        if cfg.get("download_folder") and (cfg.get("work_max_transcript_bytes") or cfg.get("work_max_age_seconds")):
             try:
                 yield ctx.call_activity(
-                    activity=mark_file_pending,
-                    input=MarkPendingRequest(file_id=f.id).model_dump(),
-                )
-            except Exception as e:
-                wf_log_exception(ctx, f"Exception in mark_file_pending for file id={f.id}", e)
-                raise
-            try:
-                yield ctx.call_child_workflow(
-                    voice2action_per_file_orchestrator,
+                    activity=enforce_work_folder_retention_activity,
                     input={
-                        "file": f.model_dump(),
-                        "config": {
-                            "offline_mode": offline_mode,
-                            "inbox_folder": inbox_folder,
-                            "archive_folder": cfg.get("archive_folder"),
-                            "download_folder": cfg.get("download_folder"),
-                            "terms_file": terms_file,
-                        },
+                        "download_folder": cfg.get("download_folder"),
+                        "max_transcript_bytes": cfg.get("work_max_transcript_bytes"),
+                        "max_age_seconds": cfg.get("work_max_age_seconds"),
+                        "min_interval_seconds": cfg.get("work_sweep_interval_seconds"),
+                        "trace_parent": trace_parent,
                     },
                 )
             except Exception as e:
-                wf_log_exception(ctx, f"Exception in call_child_workflow for file id={f.id}", e)
-                raise
-        wf_log(ctx, "voice2action_poll: completed cycle, files=%d", len(files))
-        return {"polled": True, "files": len(files)}
+                # Retention is housekeeping; never fail the poll cycle for it
+                wf_log_exception(ctx, "Exception in enforce_work_folder_retention_activity", e)
+        failed = sum(1 for r in results if not r.get("ok"))
+        wf_log(ctx, "voice2action_poll: completed cycle, files=%d failed=%d", len(files), failed)
+        return {"polled": True, "files": len(files), "failed": failed, "results": results}
     except Exception as e:
         wf_log_exception(ctx, "Exception in voice2action_poll_orchestrator", e)
         raise
 
 
+def child_instance_id(parent_instance_id: str, f: FileRef) -> str:
+    """
+    Per-file child workflow id: the poll instance plus a digest of the file id and its version
+    (OneDrive eTag, local size/mtime), so a re-uploaded or reclaimed file never maps onto the
+    id of an earlier, already completed child.
+    """
+    digest = hashlib.sha256(f"{f.id}\n{f.etag or ''}".encode("utf-8")).hexdigest()[:16]
+    return f"{parent_instance_id}-file-{digest}"
+
+
+def _fan_out_per_file(ctx: DaprWorkflowContext, files: List[FileRef], config: dict, max_parallel: int):
+    """Run per-file child workflows with a sliding in-flight window.
+
+    Uses when_any so one failing child does not abort its siblings; returns one
+    result dict per file in input order.
+    """
+    results: dict = {}
+    in_flight: dict = {}
+
+    def _collect(task):
+        f = in_flight.pop(task)
+        try:
+            results[f.id] = {"file_id": f.id, "name": f.name, "ok": True, "result": task.get_result()}
+        except Exception as e:
+            wf_log_exception(ctx, f"Exception in call_child_workflow for file id={f.id}", e)
+            results[f.id] = {"file_id": f.id, "name": f.name, "ok": False, "error": str(e)}
+
+    for f in files:
+        if len(in_flight) >= max_parallel:
+            done = yield when_any(list(in_flight.keys()))
+            _collect(done)
+        wf_log(ctx, "voice2action_poll: scheduling file id=%s name=%s", f.id, f.name)
+        task = ctx.call_child_workflow(
+            voice2action_per_file_orchestrator,
+            input={"file": f.model_dump(), "config": config},
+            instance_id=child_instance_id(ctx.instance_id, f),
+        )
+        in_flight[task] = f
+    while in_flight:
+        done = yield when_any(list(in_flight.keys()))
+        _collect(done)
+    return [results[f.id] for f in files]
+
+
+def _archive_batch(ctx: DaprWorkflowContext, results: List[dict], inbox_folder, archive_folder, trace_parent=None):
+    """Archive every successfully processed file of the cycle with one batch activity."""
+    pending = [r for r in results if r.get("ok") and (r.get("result") or {}).get("archive_input")]
+    if not pending:
+        return
+    wf_log(ctx, "voice2action_poll: archiving %d files in batch", len(pending))
+    batch_result = yield ctx.call_activity(
+        activity=archive_recordings_onedrive_batch_activity,
+        input={
+            "files": [
+                {
+                    "file_id": r["result"]["archive_input"]["file_id"],
+                    "file_name": r["result"]["archive_input"]["file_name"],
+                }
+                for r in pending
+            ],
+            "inbox_folder": inbox_folder,
+            "archive_folder": archive_folder,
+            "trace_parent": trace_parent,
+        },
+    )
+    by_id = {a.get("file_id"): a for a in batch_result.get("results", [])}
+    for r in pending:
+        r["result"]["archive"] = by_id.get(r["file_id"])
+
+
+def _release_batch(ctx: DaprWorkflowContext, results: List[dict], trace_parent=None):
+    """Delete work-folder audio of the files the batch archive moved."""
+    artifacts = {
+        r["file_id"]: r["result"].get("work_files") or []
+        for r in results
+        if r.get("ok") and ((r.get("result") or {}).get("archive") or {}).get("status") == "archived"
+    }
+    if not any(artifacts.values()):
+        return
+    try:
+        yield ctx.call_activity(
+            activity=release_work_files_activity,
+            input={"artifacts": artifacts, "trace_parent": trace_parent},
+        )
+    except Exception as e:
+        wf_log_exception(ctx, "Exception in release_work_files_activity", e)
+
+
+def _complete_transcription(ctx: DaprWorkflowContext, transcription_result: dict, transcribe_input: dict):
+    """Transcribe the remainder of a streamed transcription; complete results pass through."""
+    if transcription_result.get("complete", True):
+        return transcription_result
+    result = yield ctx.call_activity(
+        activity=transcribe_remainder_activity,
+        input={**transcription_result, **transcribe_input},
+    )
+    wf_log(ctx, "voice2action_per_file: transcription done id=%s", transcribe_input.get("file_id"))
+    return result
+
+
 # Per-file orchestrator: download the file (idempotent)
 
 def voice2action_per_file_orchestrator(ctx: DaprWorkflowContext, input):
@@ -109,6 +269,7 @@ def voice2action_per_file_orchestrator(ctx: DaprWorkflowContext, input):
         archive_folder = cfg.get("archive_folder")
         download_folder = cfg.get("download_folder")
         terms_file = cfg.get("terms_file")
+        trace_parent = cfg.get("trace_parent")
         wf_log(ctx, "voice2action_per_file: downloading id=%s name=%s", file.id, file.name)
         if offline_mode:
             from activities.local_inbox import prepare_local_file_activity
@@ -120,45 +281,123 @@ def voice2action_per_file_orchestrator(ctx: DaprWorkflowContext, input):
             input={
                 **DownloadRequest(file=file, download_folder=download_folder).model_dump(),
                 "src_folder": inbox_folder,
+                "handoff": cfg.get("local_handoff"),
+                "trace_parent": trace_parent,
             },
         )
         # download_result contains the local path under 'path'
         audio_path = download_result.get('path')
         # Derive MIME type from file extension (.mp3 -> audio/mpeg, .wav -> audio/x-wav)
         mime_type = 'audio/mpeg' if file.name.lower().endswith('.mp3') else 'audio/x-wav'
+        if cfg.get("preprocess_audio"):
+            wf_log(ctx, "voice2action_per_file: preprocessing id=%s path=%s", file.id, audio_path)
+            preprocess_result = yield ctx.call_activity(
+                activity=preprocess_audio_activity,
+                input={
+                    "audio_path": audio_path,
+                    "mime_type": mime_type,
+                    "file_id": file.id,
+                    "trace_parent": trace_parent,
+                },
+            )
+            # Transcription cache stays keyed by the original download's hash (preprocessing is deterministic)
+            audio_path = preprocess_result.get("path") or audio_path
+            mime_type = preprocess_result.get("mime_type") or mime_type
         wf_log(ctx, "voice2action_per_file: transcribing id=%s path=%s", file.id, audio_path)
-        transcription_result = yield ctx.call_activity(
-            activity=transcribe_audio_activity,
-            input={
-                "audio_path": audio_path,
-                "mime_type": mime_type,
-                "terms_file": terms_file,
-            },
+        transcribe_input = {
+            "audio_path": audio_path,
+            "mime_type": mime_type,
+            "terms_file": terms_file,
+            "chunk_seconds": cfg.get("chunk_seconds"),
+            "transcription_workers": cfg.get("transcription_workers"),
+            "audio_sha256": download_result.get("sha256"),
+            "file_id": file.id,
+            "trace_parent": trace_parent,
+        }
+        if cfg.get("stream_transcription"):
+            # Only the leading segment (where the intent is) before publishing; the rest follows
+            transcription_result = yield ctx.call_activity(
+                activity=transcribe_leading_segment_activity,
+                input={**transcribe_input, "lead_seconds": cfg.get("stream_lead_seconds")},
+            )
+        else:
+            transcription_result = yield ctx.call_activity(
+                activity=transcribe_audio_activity,
+                input=transcribe_input,
+            )
+        wf_log(
+            ctx,
+            "voice2action_per_file: transcription %s id=%s",
+            "done" if transcription_result.get("complete", True) else "lead done",
+            file.id,
         )
-        wf_log(ctx, "voice2action_per_file: transcription done id=%s", file.id)
         # Build archive input; inbox folder depends on mode
         archive_input = {
             "file_id": file.id,
             "file_name": file.name,
             "inbox_folder": inbox_folder,
             "archive_folder": archive_folder,
+            "trace_parent": trace_parent,
         }
-        # Publish intent plan first (fire-and-forget via pub/sub), then archive sequentially
-        _ = yield ctx.call_activity(
-            activity=publish_intent_plan_activity,
-            input={
-                "correlation_id": file.id,
-                "transcription_text": transcription_result.get("text"),
-                "transcription_path": transcription_result.get("transcription_path"),
-                "audio_path": audio_path,
-                "file_name": file.name,
-            },
-        )
+        if offline_mode:
+            # A hard-linked hand-off is renamed into the archive instead of moving the inbox file again
+            archive_input["work_path"] = download_result.get("path")
+        # Work-folder audio is no longer needed once published and archived (the JSON transcript stays for the agents)
+        work_files = sorted({p for p in (download_result.get("path"), audio_path) if p})
+        intent_result = None
+        if cfg.get("fast_intent"):
+            # The fast path mails / files the whole transcript, so a streamed one is completed first
+            transcription_result = yield from _complete_transcription(ctx, transcription_result, transcribe_input)
+            # One structured LLM call handles the common intents; escalate only when unsure
+            intent_result = yield ctx.call_activity(
+                activity=fast_intent_activity,
+                input={
+                    "correlation_id": file.id,
+                    "transcription_text": transcription_result.get("text"),
+                    "file_name": file.name,
+                    "file_created_at": file.created_at,
+                    "trace_parent": trace_parent,
+                },
+            )
+            wf_log(ctx, "voice2action_per_file: fast intent id=%s result=%s", file.id, intent_result)
+        # Otherwise publish intent plan (fire-and-forget via pub/sub), then archive sequentially
+        if not (intent_result and intent_result.get("handled")):
+            _ = yield ctx.call_activity(
+                activity=publish_intent_plan_activity,
+                input={
+                    "correlation_id": file.id,
+                    "transcription_text": transcription_result.get("text"),
+                    "transcription_path": transcription_result.get("transcription_path"),
+                    "audio_path": audio_path,
+                    "file_name": file.name,
+                    "file_created_at": file.created_at,
+                    "trace_parent": trace_parent,
+                },
+            )
+        # Streaming: the intent is on its way; transcribe the rest and complete the transcript file
+        transcription_result = yield from _complete_transcription(ctx, transcription_result, transcribe_input)
+        if cfg.get("batch_archive") and not offline_mode:
+            # Poll orchestrator archives all files of the cycle in Graph $batch requests
+            return {
+                "ok": True,
+                "transcription": transcription_result,
+                "archive": None,
+                "archive_input": archive_input,
+                "work_files": work_files,
+            }
         archive_activity = archive_recording_local_activity if offline_mode else archive_recording_onedrive_activity
         archive_result = yield ctx.call_activity(
             activity=archive_activity,
             input=archive_input,
         )
+        if cfg.get("release_work_files", True):
+            try:
+                yield ctx.call_activity(
+                    activity=release_work_files_activity,
+                    input={"artifacts": {file.id: work_files}, "trace_parent": trace_parent},
+                )
+            except Exception as e:
+                wf_log_exception(ctx, "Exception in release_work_files_activity", e)
         return {"ok": True, "transcription": transcription_result, "archive": archive_result}
     except Exception as e:
         wf_log_exception(ctx, "Exception in voice2action_per_file_orchestrator", e)